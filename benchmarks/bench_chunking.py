@@ -0,0 +1,140 @@
+"""
+Chunking strategy comparison: recursive (1000/150) vs structured
+parent/child.
+
+A synthetic corpus of documents with markdown headings, form-feed page
+breaks, a table per page and one unique "fact" per section is chunked with
+both strategies, then:
+
+  chunk_ms        wall time to chunk the whole corpus
+  chunks          number of vectors that would be stored
+  embedded_chars  characters sent to the embedding model (overlap included)
+  index_mb        vectors (float32 × dim) + stored chunk text
+  embed_s         time to embed every chunk (skipped with --no-embed)
+  hit@k           share of queries whose prompt context — top-k chunks, or
+                  their parent sections for the structured strategy —
+                  contains the answer
+  context_chars   mean prompt context size at k
+
+Retrieval is plain dense top-k (no MMR / reranker) so only chunking varies.
+
+Usage:
+    python -m benchmarks.bench_chunking --docs 30 --pages-per-doc 6 --k 4
+"""
+
+import argparse
+import json
+import os
+import random
+import time
+import uuid
+
+import numpy as np
+from langchain_core.documents import Document
+
+from benchmarks.stats import VOCAB
+from src.utils.chunking import build_sections, recursive_chunks, split_children
+
+
+def make_corpus(docs: int, pages: int, sections_per_page: int, words: int, seed: int):
+    rng     = random.Random(seed)
+    corpus  = []
+    queries = []
+    for d in range(docs):
+        body = []
+        for p in range(pages):
+            blocks = []
+            for s in range(sections_per_page):
+                code = uuid.UUID(int=rng.getrandbits(128)).hex[:8]
+                blocks.append(f"## Project {d}-{p}-{s}")
+                blocks.append(" ".join(rng.choice(VOCAB) for _ in range(words)))
+                blocks.append(f"The reference code for project {d}-{p}-{s} is {code}.")
+                blocks.append(" ".join(rng.choice(VOCAB) for _ in range(words)))
+                queries.append((f"What is the reference code for project {d}-{p}-{s}?", code))
+            rows = "\n".join(f"| {rng.choice(VOCAB)} | {rng.randint(1, 9999)} |" for _ in range(8))
+            blocks.append(f"| item | amount |\n| --- | --- |\n{rows}")
+            body.append("\n\n".join(blocks))
+        corpus.append(Document(page_content="\f".join(body), metadata={"source": f"doc_{d}.md"}))
+    rng.shuffle(queries)
+    return corpus, queries
+
+
+def chunk(strategy: str, corpus):
+    """Returns (embedded chunks, context text per chunk) — the prompt text."""
+    start = time.perf_counter()
+    if strategy == "recursive":
+        chunks   = recursive_chunks(corpus)
+        contexts = [c.page_content for c in chunks]
+    else:
+        chunks, contexts = [], []
+        for doc in corpus:
+            sections = build_sections([doc])
+            children = split_children(sections)
+            chunks.extend(children)
+            contexts.extend(sections[c.metadata["section_idx"]].text for c in children)
+    return chunks, contexts, time.perf_counter() - start
+
+
+def bench(strategy: str, corpus, queries, embeddings, args) -> dict:
+    chunks, contexts, chunk_s = chunk(strategy, corpus)
+    embedded_chars = sum(len(c.page_content) for c in chunks)
+    stored_chars   = embedded_chars if strategy == "recursive" else embedded_chars + sum(
+        len(s.text) for doc in corpus for s in build_sections([doc])
+    )
+    report = {
+        "strategy":       strategy,
+        "chunk_ms":       round(chunk_s * 1000, 2),
+        "chunks":         len(chunks),
+        "embedded_chars": embedded_chars,
+        "index_mb":       round((len(chunks) * args.dim * 4 + stored_chars) / 2**20, 2),
+    }
+    if embeddings is None:
+        return report
+
+    t0      = time.perf_counter()
+    vectors = np.asarray(embeddings.embed_documents([c.page_content for c in chunks]), dtype=np.float32)
+    report["embed_s"] = round(time.perf_counter() - t0, 2)
+
+    sample  = queries[:args.queries]
+    qvecs   = np.asarray(embeddings.embed_documents([q for q, _ in sample]), dtype=np.float32)
+    top     = np.argsort(-(qvecs @ vectors.T), axis=1)[:, :args.k]
+    hits, context_chars = 0, 0
+    for (_, code), row in zip(sample, top):
+        context = "\n\n".join(dict.fromkeys(contexts[i] for i in row))
+        hits          += code in context
+        context_chars += len(context)
+
+    report[f"hit@{args.k}"]  = round(hits / len(sample), 3)
+    report["context_chars"] = round(context_chars / len(sample))
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=20)
+    parser.add_argument("--pages-per-doc", type=int, default=5)
+    parser.add_argument("--sections-per-page", type=int, default=3)
+    parser.add_argument("--words", type=int, default=120, help="filler words on each side of a fact")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--no-embed", action="store_true", help="size/timing only, no retrieval quality")
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args()
+
+    corpus, queries = make_corpus(args.docs, args.pages_per_doc, args.sections_per_page, args.words, args.seed)
+
+    embeddings = None
+    if not args.no_embed:
+        from langchain_huggingface import HuggingFaceEmbeddings
+        embeddings = HuggingFaceEmbeddings(
+            model_name=os.getenv("EMBEDDING_MODEL_NAME", "sentence-transformers/all-MiniLM-L6-v2"),
+            encode_kwargs={"normalize_embeddings": True},
+        )
+
+    results = [bench(strategy, corpus, queries, embeddings, args) for strategy in ("recursive", "structured")]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
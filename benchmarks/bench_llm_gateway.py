@@ -0,0 +1,100 @@
+"""
+LLM gateway throughput and backpressure against the fake LLM server.
+
+Fires --requests calls with --concurrency callers through an LLMGateway and
+reports throughput, latency percentiles, how many calls the gateway shed
+with LLMRateLimitedError, and its retry counters.  Run the fake server with
+a quota lower than the offered load to watch the limiter and retries work:
+
+    python -m benchmarks.fake_llm --port 9100 --rpm 120 --error-rate 0.05 &
+    GROQ_API_KEY=fake python -m benchmarks.bench_llm_gateway \\
+        --base-url http://127.0.0.1:9100 --rpm 100 --requests 200 --concurrency 32
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+
+from benchmarks.stats import percentiles
+from src.utils.llm_gateway import LLMError, LLMGateway, LLMRateLimitedError
+
+
+async def _one(gateway: LLMGateway, stream: bool, deadline: float, results: dict) -> None:
+    start = time.perf_counter()
+    try:
+        if stream:
+            first = None
+            async for _ in gateway.astream("Summarise the document.", deadline_seconds=deadline):
+                if first is None:
+                    first = time.perf_counter() - start
+            results["ttft"].append(first or 0.0)
+        else:
+            await gateway.ainvoke("Summarise the document.", deadline_seconds=deadline)
+        results["latency"].append(time.perf_counter() - start)
+    except LLMRateLimitedError:
+        results["shed"] += 1
+    except LLMError as exc:
+        results["errors"][type(exc).__name__] = results["errors"].get(type(exc).__name__, 0) + 1
+
+
+async def run(args) -> dict:
+    gateway = LLMGateway(
+        model="fake",
+        base_url=args.base_url,
+        requests_per_min=args.rpm,
+        burst=args.burst,
+        max_concurrency=args.max_concurrency,
+        deadline_seconds=args.deadline,
+    )
+    results = {"latency": [], "ttft": [], "shed": 0, "errors": {}}
+    queue: asyncio.Queue = asyncio.Queue()
+    for _ in range(args.requests):
+        queue.put_nowait(None)
+
+    async def worker() -> None:
+        while not queue.empty():
+            queue.get_nowait()
+            await _one(gateway, args.stream, args.deadline, results)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - start
+
+    async with httpx.AsyncClient() as client:
+        server = (await client.get(f"{args.base_url}/stats")).json()
+    await gateway.aclose()
+
+    return {
+        "requests":        args.requests,
+        "concurrency":     args.concurrency,
+        "elapsed_s":       round(elapsed, 3),
+        "throughput_rps":  round(len(results["latency"]) / elapsed, 2),
+        "completed":       len(results["latency"]),
+        "shed_429":        results["shed"],
+        "errors":          results["errors"],
+        "latency_ms":      percentiles(results["latency"]),
+        "ttft_ms":         percentiles(results["ttft"]) if args.stream else None,
+        "gateway_stats":   gateway.stats,
+        "server_counters": server,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:9100")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--rpm", type=float, default=600)
+    parser.add_argument("--burst", type=int, default=10)
+    parser.add_argument("--max-concurrency", type=int, default=8)
+    parser.add_argument("--deadline", type=float, default=30)
+    parser.add_argument("--stream", action="store_true")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Listing latency vs. table size.
+
+For each size N a fresh user is seeded with N files, N sessions and an
+N-message transcript (see benchmarks/seed.py), then we time:
+
+  first_page   the first keyset page of files / sessions / messages
+  deep_page    a page starting from the middle of the data (keyset cursor)
+  unpaginated  the old "return every row" query, for comparison
+
+With the composite indexes in place the two keyset columns stay flat from
+10 to 100k rows while the unpaginated column grows linearly.
+
+Usage:
+    SQL_ECHO=false python -m benchmarks.bench_pagination --sizes 10,1000,100000
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from sqlalchemy import select
+
+from benchmarks.seed import seed_user
+from src.database.config import AsyncSessionLocal, engine
+from src.models.chat import ChatMessage, ChatSession
+from src.models.files import FileInputModel
+from src.utils.pagination import (
+    encode_cursor,
+    files_page_stmt,
+    messages_page_stmt,
+    session_key,
+    sessions_page_stmt,
+)
+
+
+async def _time_ms(db, stmt, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        (await db.execute(stmt)).scalars().all()
+        samples.append((time.perf_counter() - start) * 1000)
+    return round(statistics.median(samples), 3)
+
+
+async def _middle_row(db, stmt):
+    """Row halfway through the result — used only to build a deep cursor."""
+    return (await db.execute(stmt)).scalars().first()
+
+
+async def bench_size(rows: int, page_size: int, repeat: int, unpaginated: bool) -> dict:
+    ids  = await seed_user(rows)
+    uid  = ids["user_id"]
+    sid  = ids["session_id"]
+    half = rows // 2
+
+    async with AsyncSessionLocal() as db:
+        mid_file = await _middle_row(
+            db, select(FileInputModel).where(FileInputModel.user_id == uid)
+            .order_by(FileInputModel.id.desc()).offset(half).limit(1)
+        )
+        mid_session = await _middle_row(
+            db, select(ChatSession).where(ChatSession.user_id == uid)
+            .order_by(ChatSession.updated_at.desc(), ChatSession.id.desc()).offset(half).limit(1)
+        )
+        mid_message = await _middle_row(
+            db, select(ChatMessage).where(ChatMessage.session_id == sid)
+            .order_by(ChatMessage.id).offset(half).limit(1)
+        )
+
+        report = {
+            "rows": rows,
+            "files": {
+                "first_page_ms": await _time_ms(db, files_page_stmt(uid, None, page_size), repeat),
+                "deep_page_ms":  await _time_ms(
+                    db, files_page_stmt(uid, encode_cursor(mid_file.id), page_size), repeat
+                ),
+            },
+            "sessions": {
+                "first_page_ms": await _time_ms(db, sessions_page_stmt(uid, None, page_size), repeat),
+                "deep_page_ms":  await _time_ms(
+                    db, sessions_page_stmt(uid, encode_cursor(*session_key(mid_session)), page_size), repeat
+                ),
+            },
+            "messages": {
+                "first_page_ms": await _time_ms(db, messages_page_stmt(sid, None, page_size), repeat),
+                "deep_page_ms":  await _time_ms(
+                    db, messages_page_stmt(sid, encode_cursor(mid_message.id), page_size), repeat
+                ),
+            },
+        }
+
+        if unpaginated:
+            report["files"]["unpaginated_ms"] = await _time_ms(
+                db, select(FileInputModel).where(FileInputModel.user_id == uid), repeat
+            )
+            report["sessions"]["unpaginated_ms"] = await _time_ms(
+                db, select(ChatSession).where(ChatSession.user_id == uid)
+                .order_by(ChatSession.updated_at.desc()), repeat
+            )
+            report["messages"]["unpaginated_ms"] = await _time_ms(
+                db, select(ChatMessage).where(ChatMessage.session_id == sid)
+                .order_by(ChatMessage.id), repeat
+            )
+
+    return report
+
+
+async def run(sizes: list[int], page_size: int, repeat: int, unpaginated: bool) -> list[dict]:
+    results = [await bench_size(n, page_size, repeat, unpaginated) for n in sizes]
+    await engine.dispose()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10,100,1000,10000,100000")
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--no-unpaginated", action="store_true",
+                        help="skip the legacy full-table queries (slow at 100k)")
+    args = parser.parse_args()
+
+    sizes   = [int(s) for s in args.sizes.split(",")]
+    results = asyncio.run(run(sizes, args.page_size, args.repeat, not args.no_unpaginated))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Allocation cost of retrieval results: (Document, score) tuples vs
+RetrievedChunks.
+
+For N queries × k chunks of synthetic search hits, both representations
+are built and rendered into prompt context + sources, the way a batch or
+high-QPS request does:
+
+  tuples     list of (Document, score) → the previous
+             _build_context_and_sources (metadata dict lookups, a
+             "file:chunk" string key per chunk, per-chunk f-string joined
+             with its text) → SourceSchema-style dict per source, rebuilt
+  columnar   RetrievedChunks.from_hits → render() (one pass, parts joined
+             once, tuple keys, sources built once)
+
+Reported per representation: peak traced memory (KiB), blocks still
+allocated while the results are alive, and median wall time.
+
+Usage:
+    python -m benchmarks.bench_retrieved --queries 500 --k 8
+"""
+
+import argparse
+import gc
+import json
+import random
+import statistics
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Tuple
+
+from langchain_core.documents import Document
+
+from benchmarks.stats import VOCAB
+from src.utils.retrieved import RetrievedChunks
+from src.vectorstore import SearchHit
+
+
+def make_hits(queries: int, k: int, words: int, seed: int) -> List[List[SearchHit]]:
+    rng = random.Random(seed)
+    return [
+        [
+            SearchHit(
+                id=f"{rng.getrandbits(64):016x}",
+                score=rng.random(),
+                document=Document(
+                    page_content=" ".join(rng.choice(VOCAB) for _ in range(words)),
+                    metadata={
+                        "file_id":    f"{rng.randrange(50):032x}",
+                        "file_name":  f"doc_{rng.randrange(50)}.pdf",
+                        "chunk_idx":  rng.randrange(500),
+                        "section_id": rng.randrange(10_000),
+                        "user_id":    1,
+                        "kind":       "text",
+                        "page":       rng.randrange(40),
+                    },
+                ),
+            )
+            for _ in range(k)
+        ]
+        for _ in range(queries)
+    ]
+
+
+def _old_context_and_sources(docs_with_scores: List[Tuple[Document, float]]) -> Tuple[str, List[Dict]]:
+    """The pre-RetrievedChunks _build_context_and_sources, verbatim."""
+    context_parts = []
+    sources       = []
+    seen          = set()
+
+    for doc, score in docs_with_scores:
+        meta      = doc.metadata
+        file_name = meta.get("file_name", "unknown")
+        file_id   = meta.get("file_id", "")
+        chunk_idx = meta.get("chunk_idx", 0)
+
+        context_parts.append(
+            f"[Source: {file_name}, chunk {chunk_idx}, score {score:.3f}]\n"
+            f"{doc.page_content}"
+        )
+        key = f"{file_id}:{chunk_idx}"
+        if key not in seen:
+            seen.add(key)
+            sources.append({"file_name": file_name, "file_id": file_id, "chunk_idx": chunk_idx})
+
+    return "\n\n---\n\n".join(context_parts), sources
+
+
+def tuples(batches: List[List[SearchHit]]) -> list:
+    out = []
+    for hits in batches:
+        pairs            = [(hit.document, hit.score) for hit in hits]
+        context, sources = _old_context_and_sources(pairs)
+        out.append((pairs, context, [dict(**s) for s in sources]))
+    return out
+
+
+def columnar(batches: List[List[SearchHit]]) -> list:
+    out = []
+    for hits in batches:
+        chunks           = RetrievedChunks.from_hits(hits, (hit.score for hit in hits))
+        context, sources = chunks.render()
+        out.append((chunks, context, sources))
+    return out
+
+
+def measure(fn: Callable[[list], list], batches: list, repeat: int) -> dict:
+    gc.collect()
+    tracemalloc.start()
+    result = fn(batches)
+    snapshot = tracemalloc.take_snapshot()
+    _, peak  = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    blocks = sum(stat.count for stat in snapshot.statistics("filename"))
+    del result
+
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(batches)
+        samples.append((time.perf_counter() - start) * 1000)
+
+    return {
+        "peak_kib": round(peak / 1024, 1),
+        "blocks":   blocks,
+        "ms":       round(statistics.median(samples), 3),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=8)
+    parser.add_argument("--words", type=int, default=60, help="words per chunk")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=3)
+    args = parser.parse_args()
+
+    batches = make_hits(args.queries, args.k, args.words, args.seed)
+    report  = {
+        "queries":  args.queries,
+        "k":        args.k,
+        "tuples":   measure(tuples, batches, args.repeat),
+        "columnar": measure(columnar, batches, args.repeat),
+    }
+    report["peak_saving"] = round(1 - report["columnar"]["peak_kib"] / report["tuples"]["peak_kib"], 3)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
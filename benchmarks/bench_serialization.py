@@ -0,0 +1,165 @@
+"""
+Response serialisation cost: the old path vs the orjson path.
+
+For a session transcript of N messages (and a /files/list page and a
+/rag/query answer with S sources) we time building + rendering the
+response body:
+
+  pydantic_json     what FastAPI did before: build the response model
+                    (SourceSchema(**s) per source), dump it, re-validate it
+                    against response_model, dump to JSON-able Python and
+                    render with the stdlib JSONResponse
+  pydantic_orjson   the same model round-trips, rendered with ORJSONResponse
+                    (only default_response_class changed)
+  orjson_direct     plain dicts rendered with ORJSONResponse — what the
+                    endpoints return now
+
+Reported: median ms per response and body size.  Only pydantic, FastAPI
+and orjson are needed; no database or models are loaded.
+
+Usage:
+    python -m benchmarks.bench_serialization --messages 100,1000,10000
+"""
+
+import argparse
+import json
+import random
+import statistics
+import time
+from typing import Callable, List, Optional
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from pydantic import BaseModel
+
+from benchmarks.stats import VOCAB
+from src.schemas.chat import MessageSchema, SessionSchema
+
+
+# Mirrors of the answer / file-list schemas: importing the rag router would
+# load the embedding and re-ranker models, and src.schemas.files pulls in
+# the database engine.
+class FileResponse(BaseModel):
+    id:        int
+    file_id:   str
+    file_name: str
+
+
+class FileListResponse(BaseModel):
+    success:     bool
+    files:       List[FileResponse]
+    total:       int
+    next_cursor: Optional[str] = None
+
+
+class SourceSchema(BaseModel):
+    file_name: str
+    file_id:   str
+    chunk_idx: int
+
+
+class RAGQueryResponse(BaseModel):
+    success: bool
+    query:   str
+    answer:  str
+    sources: List[SourceSchema] = []
+
+
+def _text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(VOCAB) for _ in range(words))
+
+
+def _fastapi_round_trip(model_cls, instance: BaseModel) -> dict:
+    """Approximates fastapi.routing.serialize_response for a returned model."""
+    validated = model_cls.model_validate(instance.model_dump())
+    return validated.model_dump(mode="json")
+
+
+def _median_ms(fn: Callable[[], bytes], repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return round(statistics.median(samples), 3)
+
+
+def bench_session(messages: int, words: int, repeat: int, rng: random.Random) -> dict:
+    rows = [
+        {"id": i, "role": "user" if i % 2 else "assistant", "content": _text(rng, words)}
+        for i in range(messages)
+    ]
+
+    def pydantic_body() -> dict:
+        session = SessionSchema(
+            id=1, title="Evaluation", next_message_cursor="abc",
+            messages=[MessageSchema(**row) for row in rows],
+        )
+        return _fastapi_round_trip(SessionSchema, session)
+
+    def direct_body() -> dict:
+        return {"id": 1, "title": "Evaluation", "messages": [dict(row) for row in rows], "next_message_cursor": "abc"}
+
+    return _report("session", messages, pydantic_body, direct_body, repeat)
+
+
+def bench_files(files: int, repeat: int, rng: random.Random) -> dict:
+    rows = [{"id": i, "file_id": f"{rng.getrandbits(128):032x}", "file_name": f"report_{i}.pdf"} for i in range(files)]
+
+    def pydantic_body() -> dict:
+        page = FileListResponse(success=True, files=rows, total=len(rows), next_cursor="abc")
+        return _fastapi_round_trip(FileListResponse, page)
+
+    def direct_body() -> dict:
+        return {"success": True, "files": [dict(row) for row in rows], "total": len(rows), "next_cursor": "abc"}
+
+    return _report("files", files, pydantic_body, direct_body, repeat)
+
+
+def bench_answer(sources: int, repeat: int, rng: random.Random) -> dict:
+    answer = _text(rng, 300)
+    rows   = [{"file_name": f"doc_{i}.pdf", "file_id": f"{i:032x}", "chunk_idx": i} for i in range(sources)]
+
+    def pydantic_body() -> dict:
+        response = RAGQueryResponse(
+            success=True, query="q", answer=answer, sources=[SourceSchema(**s) for s in rows],
+        )
+        return _fastapi_round_trip(RAGQueryResponse, response)
+
+    def direct_body() -> dict:
+        return {"success": True, "query": "q", "answer": answer, "sources": rows}
+
+    return _report("answer", sources, pydantic_body, direct_body, repeat)
+
+
+def _report(payload: str, size: int, pydantic_body, direct_body, repeat: int) -> dict:
+    return {
+        "payload":         payload,
+        "size":            size,
+        "bytes":           len(ORJSONResponse(direct_body()).body),
+        "pydantic_json":   _median_ms(lambda: JSONResponse(pydantic_body()).body, repeat),
+        "pydantic_orjson": _median_ms(lambda: ORJSONResponse(pydantic_body()).body, repeat),
+        "orjson_direct":   _median_ms(lambda: ORJSONResponse(direct_body()).body, repeat),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", default="100,1000,10000", help="comma-separated transcript lengths")
+    parser.add_argument("--words", type=int, default=80, help="words per message")
+    parser.add_argument("--files", type=int, default=100, help="files per /files/list page")
+    parser.add_argument("--sources", type=int, default=20, help="sources per answer")
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=5)
+    args = parser.parse_args()
+
+    rng     = random.Random(args.seed)
+    results = [bench_session(int(n), args.words, args.repeat, rng) for n in args.messages.split(",")]
+    results.append(bench_files(args.files, args.repeat, rng))
+    results.append(bench_answer(args.sources, args.repeat, rng))
+    for row in results:
+        row["speedup"] = round(row["pydantic_json"] / max(row["orjson_direct"], 1e-6), 1)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
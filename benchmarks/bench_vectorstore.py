@@ -0,0 +1,101 @@
+"""
+Vector-store backend comparison.
+
+Inserts N random unit vectors (as chunks spread over a few synthetic files)
+into each requested backend, then measures:
+
+  insert_per_s   chunks inserted per second (batched like index_file_task)
+  search_ms      p50/p95/p99 single-query latency at k=--k
+  delete_ms      delete-by-file latency
+  count          chunks reported after inserting
+
+No embedding model is loaded — vectors are random — so this isolates the
+store itself.  Milvus must be reachable at MILVUS_URI for that backend.
+
+Usage:
+    python -m benchmarks.bench_vectorstore --backends faiss,milvus --rows 20000
+"""
+
+import argparse
+import json
+import tempfile
+import time
+
+import numpy as np
+from langchain_core.documents import Document
+
+from benchmarks.stats import percentiles
+from src.vectorstore import create_vector_store
+from src.vectorstore.faiss_store import FaissVectorStore
+
+
+def _corpus(rows: int, dim: int, files: int, seed: int):
+    rng     = np.random.default_rng(seed)
+    vectors = rng.standard_normal((rows, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    chunks  = [
+        Document(
+            page_content=f"synthetic chunk {i} " + "lorem ipsum " * 40,
+            metadata={"file_id": f"bench-file-{i % files}", "file_name": f"doc_{i % files}.pdf", "chunk_idx": i},
+        )
+        for i in range(rows)
+    ]
+    return chunks, vectors
+
+
+def bench_backend(backend: str, user_id: int, chunks, vectors, args) -> dict:
+    store = FaissVectorStore(tempfile.mkdtemp(prefix="bench_faiss_")) if backend == "faiss" \
+        else create_vector_store(backend)
+
+    start = time.perf_counter()
+    for offset in range(0, len(chunks), args.batch):
+        store.add(user_id, chunks[offset:offset + args.batch], vectors[offset:offset + args.batch])
+    insert_s = time.perf_counter() - start
+
+    rng     = np.random.default_rng(args.seed + 1)
+    samples = []
+    for _ in range(args.queries):
+        query = vectors[rng.integers(len(vectors))]
+        t0 = time.perf_counter()
+        store.search(user_id, query, k=args.k)
+        samples.append(time.perf_counter() - t0)
+
+    count = store.count(user_id)
+    t0    = time.perf_counter()
+    store.delete_by_file(user_id, "bench-file-0")
+    delete_s = time.perf_counter() - t0
+    store.close()
+
+    return {
+        "backend":      backend,
+        "rows":         len(chunks),
+        "insert_per_s": round(len(chunks) / insert_s, 1),
+        "search_ms":    percentiles(samples),
+        "delete_ms":    round(delete_s * 1000, 2),
+        "count":        count,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", default="faiss")
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--files", type=int, default=20)
+    parser.add_argument("--batch", type=int, default=64)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=12)
+    parser.add_argument("--user-id", type=int, default=990_001, help="collection user_{id} used for the run")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    chunks, vectors = _corpus(args.rows, args.dim, args.files, args.seed)
+    results = [
+        bench_backend(backend.strip(), args.user_id, chunks, vectors, args)
+        for backend in args.backends.split(",")
+    ]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Per-worker memory and throughput scaling of the model-bound request path,
+for the two ways of running N worker processes:
+
+  prefork      what serve.py does: the parent loads the embedding model and
+               CrossEncoder, gc.freeze()s, then forks N workers that share
+               the weights copy-on-write
+  independent  what `uvicorn --workers N` does: every worker (spawned, not
+               forked) loads its own copy of both models
+
+Each worker runs the CPU part of a /rag/retrieve request in a loop — embed
+one query, re-rank --candidates chunks — with cores / N torch threads, for
+--seconds after all workers are ready.  For each N in --workers:
+
+  rps          requests/sec summed over workers
+  efficiency   rps / (N × rps at N=1), 1.0 = linear scaling
+  rss_mb       resident set per worker (counts shared pages in full)
+  uss_mb       memory unique to a worker — what each extra worker costs
+  pss_mb       total proportional set size of all workers (+ the prefork
+               parent): the real footprint
+
+Only sentence-transformers and psutil are needed; no database, vector
+store or LLM.  Model names come from EMBEDDING_MODEL_NAME /
+RERANKER_MODEL_NAME as in the app.
+
+Usage:
+    python -m benchmarks.bench_workers --workers 1,2,4,8 --seconds 20
+"""
+
+import argparse
+import gc
+import json
+import multiprocessing as mp
+import os
+import random
+import time
+from typing import List, Optional
+
+import psutil
+from dotenv import load_dotenv
+
+from benchmarks.stats import VOCAB
+
+load_dotenv()
+
+EMBEDDING_MODEL_NAME = os.getenv("EMBEDDING_MODEL_NAME", "sentence-transformers/all-MiniLM-L6-v2")
+RERANKER_MODEL_NAME  = os.getenv("RERANKER_MODEL_NAME", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+
+# Set in the prefork parent before forking; None in spawned workers.
+_MODELS: Optional[tuple] = None
+
+
+def _load_models() -> tuple:
+    from sentence_transformers import CrossEncoder, SentenceTransformer
+    return SentenceTransformer(EMBEDDING_MODEL_NAME), CrossEncoder(RERANKER_MODEL_NAME)
+
+
+def _memory(pid: int) -> dict:
+    info = psutil.Process(pid).memory_full_info()
+    return {"rss": info.rss, "uss": info.uss, "pss": getattr(info, "pss", 0)}
+
+
+def _worker(threads: int, candidates: int, seconds: float, seed: int, ready, results) -> None:
+    import torch
+
+    gc.enable()
+    torch.set_num_threads(threads)
+    embedder, reranker = _MODELS or _load_models()
+
+    rng    = random.Random(seed)
+    chunks = [" ".join(rng.choice(VOCAB) for _ in range(120)) for _ in range(candidates)]
+
+    def request() -> None:
+        query = " ".join(rng.choice(VOCAB) for _ in range(8))
+        embedder.encode([query], normalize_embeddings=True)
+        reranker.predict([(query, chunk) for chunk in chunks])
+
+    request()                   # warm-up: first-call allocations
+    ready.wait()
+    done, deadline = 0, time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        request()
+        done += 1
+    results.put({"pid": os.getpid(), "rps": done / seconds, **_memory(os.getpid())})
+    # Stay alive until the parent has sampled PSS across all workers.
+    ready.wait()
+
+
+def run(mode: str, workers: int, candidates: int, seconds: float, seed: int) -> dict:
+    ctx     = mp.get_context("fork" if mode == "prefork" else "spawn")
+    ready   = ctx.Barrier(workers + 1)
+    results = ctx.Queue()
+    threads = max(1, (os.cpu_count() or 1) // workers)
+
+    procs = [
+        ctx.Process(target=_worker, args=(threads, candidates, seconds, seed + i, ready, results))
+        for i in range(workers)
+    ]
+    for proc in procs:
+        proc.start()
+    ready.wait()                # everyone loaded and warmed up
+    rows = [results.get() for _ in procs]
+
+    pss = sum(_memory(proc.pid)["pss"] for proc in procs)
+    if mode == "prefork":
+        pss += _memory(os.getpid())["pss"]
+    ready.wait()                # release the workers
+    for proc in procs:
+        proc.join()
+
+    mb = 2 ** 20
+    return {
+        "mode":    mode,
+        "workers": workers,
+        "threads": threads,
+        "rps":     round(sum(r["rps"] for r in rows), 2),
+        "rss_mb":  round(sum(r["rss"] for r in rows) / len(rows) / mb, 1),
+        "uss_mb":  round(sum(r["uss"] for r in rows) / len(rows) / mb, 1),
+        "pss_mb":  round(pss / mb, 1),
+    }
+
+
+def main() -> None:
+    global _MODELS
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", default=None, help="comma-separated worker counts (default 1,2,4,… up to cores)")
+    parser.add_argument("--modes", default="prefork,independent")
+    parser.add_argument("--candidates", type=int, default=12, help="chunks re-ranked per request")
+    parser.add_argument("--seconds", type=float, default=15)
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args()
+
+    cores = os.cpu_count() or 1
+    if args.workers:
+        counts = [int(n) for n in args.workers.split(",")]
+    else:
+        counts = sorted({min(2 ** i, cores) for i in range(cores.bit_length() + 1)})
+    os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+
+    results: List[dict] = []
+    for mode in args.modes.split(","):
+        if mode == "prefork":
+            # Same sequence as serve.py: load, freeze, fork.
+            gc.disable()
+            _MODELS = _load_models()
+            gc.freeze()
+        for workers in counts:
+            results.append(run(mode, workers, args.candidates, args.seconds, args.seed))
+        if mode == "prefork":
+            _MODELS = None
+            gc.unfreeze()
+            gc.enable()
+            gc.collect()
+
+    for row in results:
+        base = next(r for r in results if r["mode"] == row["mode"] and r["workers"] == counts[0])
+        row["efficiency"] = round(row["rps"] / (base["rps"] * row["workers"] / base["workers"]), 2)
+    print(json.dumps({"cores": cores, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
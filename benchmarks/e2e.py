@@ -0,0 +1,315 @@
+"""
+End-to-end RAG benchmark.
+
+Spins up the real app (uvicorn subprocess) against local stand-ins:
+
+  LLM      benchmarks/fake_llm.py           (subprocess, OpenAI-compatible)
+  vectors  embedded FAISS, or Milvus Lite   (--vector-backend / --milvus-uri)
+  DB       SQLite via aiosqlite by default  (--database-url for asyncpg)
+
+then seeds a synthetic corpus and drives the public API under concurrent
+load:
+
+  1. POST /files/upload-multiple  — the whole corpus, in --upload-batch files
+     per request; indexing completion is observed on /files/status/stream
+  2. POST /rag/query              — --queries requests at --concurrency
+  3. POST /rag/stream             — same, measuring TTFB and time-to-first-token
+
+and prints one JSON report: throughput, p50/p95/p99 latencies, TTFB/TTFT,
+indexing pages/sec and the app process' peak RSS.  Compare reports across
+commits to catch regressions in index_file_task or _get_docs_with_scores.
+
+Usage:
+    pip install -r benchmarks/requirements.txt
+    python -m benchmarks.e2e --docs 50 --pages-per-doc 10 --queries 200 --concurrency 16
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+import httpx
+import psutil
+
+from benchmarks.stats import VOCAB, percentiles
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Processes
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _free_port() -> int:
+    import socket
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _spawn(args: list[str], env: dict) -> subprocess.Popen:
+    return subprocess.Popen([sys.executable, *args], env=env)
+
+
+async def _wait_ready(url: str, timeout: float = 300) -> None:
+    """The app loads embedding/reranker models on import, so allow a while."""
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                await client.get(url, timeout=2)
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.5)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+
+class RSSSampler(threading.Thread):
+    """Polls a process tree's resident set size; keeps the peak."""
+
+    def __init__(self, pid: int, interval: float = 0.1) -> None:
+        super().__init__(daemon=True)
+        self.proc     = psutil.Process(pid)
+        self.interval = interval
+        self.peak     = 0
+        self._halt    = threading.Event()
+
+    def run(self) -> None:
+        while not self._halt.is_set():
+            try:
+                procs = [self.proc, *self.proc.children(recursive=True)]
+                self.peak = max(self.peak, sum(p.memory_info().rss for p in procs))
+            except psutil.Error:
+                pass
+            self._halt.wait(self.interval)
+
+    def stop(self) -> None:
+        self._halt.set()
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Corpus
+# ─────────────────────────────────────────────────────────────────────────────
+
+def make_corpus(docs: int, pages: int, words_per_page: int, seed: int) -> tuple[list[tuple[str, bytes]], list[str]]:
+    """
+    Synthetic .txt documents; pages are separated by form feeds.  Each page
+    carries one unique "fact" sentence, and those facts become the queries.
+    """
+    rng     = random.Random(seed)
+    files   = []
+    queries = []
+    for d in range(docs):
+        body = []
+        for p in range(pages):
+            code = uuid.UUID(int=rng.getrandbits(128)).hex[:8]
+            fact = f"The reference code for project {d}-{p} is {code}."
+            filler = " ".join(rng.choice(VOCAB) for _ in range(words_per_page))
+            body.append(f"{filler}\n\n{fact}\n\n{filler}")
+            queries.append(f"What is the reference code for project {d}-{p}?")
+        files.append((f"bench_doc_{d}.txt", "\f".join(body).encode()))
+    rng.shuffle(queries)
+    return files, queries
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Load phases
+# ─────────────────────────────────────────────────────────────────────────────
+
+async def _login(client: httpx.AsyncClient) -> dict:
+    username = f"bench_{uuid.uuid4().hex[:10]}"
+    password = "Bench#Pass1"
+    await client.post("/users/register", json={"username": username, "password": password})
+    token = (await client.post("/users/login", json={"username": username, "password": password})).json()
+    return {"Authorization": f"Bearer {token['access_token']}"}
+
+
+async def _wait_indexed(client: httpx.AsyncClient, headers: dict) -> dict:
+    """Follow /files/status/stream until nothing is pending/processing."""
+    indexed = failed = 0
+    async with client.stream(
+        "GET", "/files/status/stream", params={"close_when_idle": "true"},
+        headers=headers, timeout=None,
+    ) as response:
+        async for line in response.aiter_lines():
+            if line.startswith("data: "):
+                event = json.loads(line[6:])
+                if event["status"] == "indexed":
+                    indexed += 1
+                elif event["status"] == "failed":
+                    failed += 1
+    return {"indexed": indexed, "failed": failed}
+
+
+async def phase_upload(client, headers, files, batch: int, concurrency: int) -> dict:
+    latencies = []
+    sem       = asyncio.Semaphore(concurrency)
+
+    async def upload(group):
+        async with sem:
+            t0 = time.perf_counter()
+            r  = await client.post(
+                "/files/upload-multiple",
+                files=[("files", (name, data, "text/plain")) for name, data in group],
+                headers=headers,
+            )
+            r.raise_for_status()
+            latencies.append(time.perf_counter() - t0)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(upload(files[i:i + batch]) for i in range(0, len(files), batch)))
+    uploaded = time.perf_counter() - start
+    outcome  = await _wait_indexed(client, headers)
+    total    = time.perf_counter() - start
+    return {"upload_latency_ms": percentiles(latencies), "upload_s": round(uploaded, 3),
+            "indexing_s": round(total, 3), **outcome}
+
+
+async def phase_query(client, headers, queries, concurrency: int) -> dict:
+    latencies, errors = [], 0
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(q):
+        nonlocal errors
+        async with sem:
+            t0 = time.perf_counter()
+            r  = await client.post("/rag/query", json={"query": q}, headers=headers, timeout=120)
+            if r.status_code == 200:
+                latencies.append(time.perf_counter() - t0)
+            else:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(q) for q in queries))
+    elapsed = time.perf_counter() - start
+    return {"requests": len(queries), "errors": errors, "throughput_rps": round(len(latencies) / elapsed, 2),
+            "latency_ms": percentiles(latencies)}
+
+
+async def phase_stream(client, headers, queries, concurrency: int) -> dict:
+    ttfb, ttft, total, errors = [], [], [], 0
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(q):
+        nonlocal errors
+        async with sem:
+            t0 = time.perf_counter()
+            first_byte = first_token = None
+            async with client.stream("POST", "/rag/stream", json={"query": q},
+                                     headers=headers, timeout=120) as r:
+                if r.status_code != 200:
+                    errors += 1
+                    return
+                async for line in r.aiter_lines():
+                    now = time.perf_counter() - t0
+                    if first_byte is None:
+                        first_byte = now
+                    if first_token is None and line == "event: token":
+                        first_token = now
+            ttfb.append(first_byte or 0.0)
+            ttft.append(first_token or 0.0)
+            total.append(time.perf_counter() - t0)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(q) for q in queries))
+    elapsed = time.perf_counter() - start
+    return {"requests": len(queries), "errors": errors, "throughput_rps": round(len(total) / elapsed, 2),
+            "ttfb_ms": percentiles(ttfb), "ttft_ms": percentiles(ttft), "latency_ms": percentiles(total)}
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Orchestration
+# ─────────────────────────────────────────────────────────────────────────────
+
+async def run(args) -> dict:
+    workdir  = tempfile.mkdtemp(prefix="rag_bench_")
+    llm_port = _free_port()
+    app_port = _free_port()
+
+    env = {
+        **os.environ,
+        "DATABASE_URL":         args.database_url or f"sqlite+aiosqlite:///{workdir}/bench.db",
+        "SQL_ECHO":             "false",
+        "UPLOAD_DIRECTORY":     os.path.join(workdir, "uploads"),
+        "VECTOR_BACKEND":       args.vector_backend,
+        "FAISS_INDEX_DIR":      os.path.join(workdir, "faiss"),
+        "GROQ_BASE_URL":        f"http://127.0.0.1:{llm_port}",
+        "GROQ_API_KEY":         "fake",
+        "LLM_REQUESTS_PER_MIN": str(args.llm_rpm),
+        "LLM_BURST":            str(args.concurrency),
+        "LLM_MAX_CONCURRENCY":  str(args.concurrency),
+    }
+    if args.milvus_uri:
+        env["MILVUS_URI"] = args.milvus_uri
+
+    fake_llm = _spawn(["-m", "benchmarks.fake_llm", "--port", str(llm_port),
+                       "--ttft-ms", str(args.llm_ttft_ms), "--token-ms", str(args.llm_token_ms)], env)
+    app = _spawn(["-m", "uvicorn", "src.app:app", "--port", str(app_port), "--log-level", "warning"], env)
+    sampler = RSSSampler(app.pid)
+
+    try:
+        base = f"http://127.0.0.1:{app_port}"
+        await _wait_ready(f"http://127.0.0.1:{llm_port}/stats")
+        await _wait_ready(f"{base}/openapi.json")
+        sampler.start()
+
+        files, queries = make_corpus(args.docs, args.pages_per_doc, args.words_per_page, args.seed)
+        queries = (queries * (args.queries // max(1, len(queries)) + 1))[:args.queries]
+
+        async with httpx.AsyncClient(base_url=base, timeout=120) as client:
+            headers = await _login(client)
+            upload  = await phase_upload(client, headers, files, args.upload_batch, args.concurrency)
+            query   = await phase_query(client, headers, queries, args.concurrency)
+            stream  = await phase_stream(client, headers, queries, args.concurrency)
+    finally:
+        sampler.stop()
+        app.terminate()
+        fake_llm.terminate()
+        app.wait(30)
+        fake_llm.wait(30)
+
+    pages = args.docs * args.pages_per_doc
+    return {
+        "config": {k: v for k, v in vars(args).items() if k != "output"},
+        "indexing": {**upload, "pages": pages,
+                     "pages_per_s": round(pages / upload["indexing_s"], 2) if upload["indexing_s"] else None},
+        "query":  query,
+        "stream": stream,
+        "peak_rss_mb": round(sampler.peak / 2**20, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=20)
+    parser.add_argument("--pages-per-doc", type=int, default=5)
+    parser.add_argument("--words-per-page", type=int, default=300)
+    parser.add_argument("--upload-batch", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--vector-backend", default="faiss", choices=["faiss", "milvus"])
+    parser.add_argument("--milvus-uri", default=None, help="e.g. ./bench_milvus.db for Milvus Lite")
+    parser.add_argument("--database-url", default=None, help="default: a fresh SQLite file")
+    parser.add_argument("--llm-ttft-ms", type=float, default=150)
+    parser.add_argument("--llm-token-ms", type=float, default=10)
+    parser.add_argument("--llm-rpm", type=float, default=100_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=None, help="also write the JSON report here")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    text   = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+Fake Groq / OpenAI-compatible chat-completions server.
+
+Lets the LLM gateway, streaming endpoints and the benchmark suite run
+offline with realistic timing and failure behaviour:
+
+  • configurable time-to-first-token and per-token delay
+  • a requests-per-minute quota enforced with 429 + Retry-After
+  • a concurrency limit (requests over it get 429 immediately)
+  • a random 5xx error rate
+
+Implements POST /openai/v1/chat/completions (streaming and non-streaming)
+and answers HEAD / so connection warm-up works.
+
+Usage:
+    python -m benchmarks.fake_llm --port 9100 --rpm 600 --ttft-ms 150
+    GROQ_BASE_URL=http://127.0.0.1:9100 GROQ_API_KEY=fake uvicorn src.app:app
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+from collections import deque
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+WORDS = (
+    "the document states that revenue grew in the third quarter while costs "
+    "remained flat and the board approved the plan with minor changes"
+).split()
+
+
+class FakeLLMState:
+    def __init__(self, rpm: int, max_concurrency: int, ttft_ms: float,
+                 token_ms: float, tokens: int, error_rate: float) -> None:
+        self.rpm             = rpm
+        self.max_concurrency = max_concurrency
+        self.ttft            = ttft_ms / 1000
+        self.token_delay     = token_ms / 1000
+        self.tokens          = tokens
+        self.error_rate      = error_rate
+        self.in_flight       = 0
+        self.window: deque   = deque()
+        self.counters        = {"ok": 0, "rate_limited": 0, "overloaded": 0, "errors": 0}
+
+    def admit(self) -> Response | None:
+        now = time.monotonic()
+        while self.window and now - self.window[0] > 60:
+            self.window.popleft()
+        if self.rpm and len(self.window) >= self.rpm:
+            self.counters["rate_limited"] += 1
+            retry_after = max(0.1, 60 - (now - self.window[0]))
+            return JSONResponse(
+                {"error": {"message": "Rate limit reached", "type": "requests"}},
+                status_code=429,
+                headers={"retry-after": f"{retry_after:.2f}"},
+            )
+        if self.in_flight >= self.max_concurrency:
+            self.counters["overloaded"] += 1
+            return JSONResponse(
+                {"error": {"message": "Too many concurrent requests"}},
+                status_code=429,
+                headers={"retry-after": "1"},
+            )
+        if random.random() < self.error_rate:
+            self.counters["errors"] += 1
+            return JSONResponse({"error": {"message": "Internal error"}}, status_code=503)
+        self.window.append(now)
+        return None
+
+
+def create_app(state: FakeLLMState) -> FastAPI:
+    app = FastAPI(title="Fake LLM")
+
+    @app.head("/")
+    async def warm() -> Response:
+        return Response(status_code=200)
+
+    @app.get("/stats")
+    async def stats() -> dict:
+        return {**state.counters, "in_flight": state.in_flight}
+
+    @app.post("/openai/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body     = await request.json()
+        rejected = state.admit()
+        if rejected is not None:
+            return rejected
+
+        model   = body.get("model", "fake")
+        call_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+        words   = [random.choice(WORDS) for _ in range(state.tokens)]
+
+        if not body.get("stream"):
+            state.in_flight += 1
+            try:
+                await asyncio.sleep(state.ttft + state.token_delay * state.tokens)
+            finally:
+                state.in_flight -= 1
+            state.counters["ok"] += 1
+            return {
+                "id": call_id, "object": "chat.completion", "created": created, "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": " ".join(words)},
+                    "finish_reason": "stop",
+                }],
+                "usage": {"prompt_tokens": 100, "completion_tokens": len(words), "total_tokens": 100 + len(words)},
+            }
+
+        def chunk(delta: dict, finish: str | None = None) -> str:
+            payload = {
+                "id": call_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish}],
+            }
+            return f"data: {json.dumps(payload)}\n\n"
+
+        async def stream():
+            state.in_flight += 1
+            try:
+                yield chunk({"role": "assistant", "content": ""})
+                await asyncio.sleep(state.ttft)
+                for i, word in enumerate(words):
+                    yield chunk({"content": word if i == 0 else f" {word}"})
+                    await asyncio.sleep(state.token_delay)
+                yield chunk({}, finish="stop")
+                yield "data: [DONE]\n\n"
+                state.counters["ok"] += 1
+            finally:
+                state.in_flight -= 1
+
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--rpm", type=int, default=0, help="requests per minute quota (0 = unlimited)")
+    parser.add_argument("--max-concurrency", type=int, default=64)
+    parser.add_argument("--ttft-ms", type=float, default=150)
+    parser.add_argument("--token-ms", type=float, default=10)
+    parser.add_argument("--tokens", type=int, default=60)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    state = FakeLLMState(args.rpm, args.max_concurrency, args.ttft_ms,
+                         args.token_ms, args.tokens, args.error_rate)
+    uvicorn.run(create_app(state), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Seed a synthetic user with N files, N chat sessions and N messages in one
+session, straight into the database at DATABASE_URL.
+
+Rows are bulk-inserted in batches through SQLAlchemy Core, so seeding 100k
+rows of each kind takes seconds rather than minutes.
+
+Usage:
+    python -m benchmarks.seed --rows 100000
+"""
+
+import argparse
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import insert
+
+from src.database import init_db
+from src.database.config import AsyncSessionLocal
+from src.models.chat import ChatMessage, ChatSession, MessageRole
+from src.models.files import FileInputModel, IndexingStatus
+from src.models.users import User
+
+BATCH_SIZE = 5_000
+
+
+async def _insert_batched(db, table, rows) -> None:
+    for start in range(0, len(rows), BATCH_SIZE):
+        await db.execute(insert(table), rows[start:start + BATCH_SIZE])
+
+
+async def seed_user(rows: int, username: str | None = None) -> dict:
+    """
+    Create a fresh user holding `rows` files, `rows` sessions and one
+    session with `rows` messages.  Returns the ids the benchmarks need.
+    """
+    await init_db()
+    username = username or f"bench_{uuid.uuid4().hex[:12]}"
+    now      = datetime.now(timezone.utc)
+
+    async with AsyncSessionLocal() as db:
+        # Seeded users are never meant to log in — "!" is not a valid hash.
+        user = User(username=username, password="!")
+        db.add(user)
+        await db.commit()
+        await db.refresh(user)
+
+        await _insert_batched(db, FileInputModel.__table__, [
+            {
+                "file_name":       f"doc_{i}.pdf",
+                "file_id":         str(uuid.uuid4()),
+                "user_id":         user.id,
+                "indexing_status": IndexingStatus.INDEXED,
+            }
+            for i in range(rows)
+        ])
+
+        await _insert_batched(db, ChatSession.__table__, [
+            {
+                "user_id":    user.id,
+                "title":      f"Session {i}",
+                "created_at": now - timedelta(seconds=i),
+                "updated_at": now - timedelta(seconds=i),
+            }
+            for i in range(rows)
+        ])
+
+        transcript = ChatSession(user_id=user.id, title="Long transcript")
+        db.add(transcript)
+        await db.commit()
+        await db.refresh(transcript)
+
+        await _insert_batched(db, ChatMessage.__table__, [
+            {
+                "session_id": transcript.id,
+                "role":       MessageRole.USER if i % 2 == 0 else MessageRole.ASSISTANT,
+                "content":    f"Message {i} " + "lorem ipsum " * 20,
+                "created_at": now,
+            }
+            for i in range(rows)
+        ])
+        await db.commit()
+
+    return {"user_id": user.id, "username": username, "session_id": transcript.id, "rows": rows}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000)
+    parser.add_argument("--username", default=None)
+    args = parser.parse_args()
+    print(asyncio.run(seed_user(args.rows, args.username)))
+
+
+if __name__ == "__main__":
+    main()
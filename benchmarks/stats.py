@@ -0,0 +1,23 @@
+"""Small helpers shared by the benchmark scripts."""
+
+from typing import Dict, Sequence
+
+# Filler words for synthetic benchmark documents.
+VOCAB = (
+    "contract invoice revenue quarter board approval liability clause renewal "
+    "payment schedule delivery warranty termination audit compliance budget "
+    "forecast supplier customer region policy insurance deadline milestone"
+).split()
+
+
+def percentiles(samples_s: Sequence[float]) -> Dict[str, float]:
+    """p50/p95/p99/max of a list of durations in seconds, reported in ms."""
+    if not samples_s:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+    ordered = sorted(samples_s)
+
+    def pick(q: float) -> float:
+        idx = min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))
+        return round(ordered[idx] * 1000, 2)
+
+    return {"p50": pick(0.50), "p95": pick(0.95), "p99": pick(0.99), "max": pick(1.0)}
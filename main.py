@@ -1,4 +1,6 @@
 import uvicorn
 
+# Development server (single process, auto-reload).  For production use
+# serve.py, which pre-forks workers that share the loaded models.
 if __name__ == "__main__":
     uvicorn.run("src.app:app", host="127.0.0.1", port=8000, reload=True)
\ No newline at end of file
@@ -0,0 +1,235 @@
+"""
+Production entry point: pre-forked uvicorn workers sharing model weights.
+
+main.py is for development (one process, auto-reload).  Running uvicorn
+with --workers N would import the app — and load the embedding model and
+the CrossEncoder — once per worker.  serve.py instead:
+
+  1. imports src.app in the parent, which loads both models once
+     (src/utils/rag.py), and runs the schema setup (init_db) once, so
+     workers don't race each other creating tables;
+  2. gc.freeze()s everything allocated so far, so the cyclic collector
+     never touches — and un-shares — those pages in the workers;
+  3. binds the listening socket, then forks WEB_WORKERS children.  They
+     inherit the model weights copy-on-write and each runs a uvicorn
+     server on the shared socket (the kernel spreads connections);
+  4. supervises: a worker that exits is replaced, with backoff if it keeps
+     dying at startup; SIGTERM / SIGINT is forwarded to every worker,
+     which drains (src/utils/lifecycle.py) before the parent exits.
+
+The parent must not carry thread pools, open connections or an event
+loop across the fork — none of them survive it.  So the models are only
+loaded, never run, in the parent; init_db runs in a loop that is closed,
+with its connections disposed, before forking; and each worker resets the
+engine's pool and any cached vector-store client anyway.  Every worker
+limits torch to WORKER_TORCH_THREADS intra-op threads (default: cores /
+workers) so N workers don't oversubscribe the CPU.
+
+Per-worker state stays per worker: rate-limit buckets, the fair
+schedulers and /metrics.
+
+Usage:
+    python serve.py --workers 4 --host 0.0.0.0 --port 8000
+
+Memory per worker and 1 → N throughput: python -m benchmarks.bench_workers
+"""
+
+import argparse
+import asyncio
+import gc
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+from typing import Dict
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger("serve")
+
+SERVE_HOST           = os.getenv("SERVE_HOST", "0.0.0.0")
+SERVE_PORT           = int(os.getenv("SERVE_PORT", "8000"))
+WEB_WORKERS          = int(os.getenv("WEB_WORKERS", str(os.cpu_count() or 1)))
+WORKER_TORCH_THREADS = int(os.getenv("WORKER_TORCH_THREADS", "0"))
+# Must exceed STREAM_DRAIN_SECONDS so open SSE streams can finish cleanly.
+GRACEFUL_TIMEOUT     = float(os.getenv("GRACEFUL_TIMEOUT", "30"))
+
+# A worker that exits sooner than this after starting counts as a crash
+# loop; its replacement is delayed (doubling, up to _MAX_BACKOFF).
+_MIN_UPTIME  = 5.0
+_MAX_BACKOFF = 30.0
+
+
+def _bind(host: str, port: int) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock   = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _run_worker(app, sock: socket.socket, torch_threads: int) -> None:
+    """Body of a forked child; never returns."""
+    import torch
+    import uvicorn
+
+    from src.database.config import engine
+    from src.vectorstore import get_vector_store
+
+    # The parent's handlers only forward signals; uvicorn installs its own.
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    gc.enable()
+
+    torch.set_num_threads(torch_threads)
+    # Connections must never be shared across fork (none exist yet, but
+    # make sure), and a client created in the parent holds dead channels.
+    engine.sync_engine.dispose(close=False)
+    get_vector_store.cache_clear()
+
+    config = uvicorn.Config(
+        app,
+        lifespan="on",
+        timeout_graceful_shutdown=int(GRACEFUL_TIMEOUT),
+        log_level=os.getenv("LOG_LEVEL", "info").lower(),
+    )
+    server = uvicorn.Server(config)
+    code   = 1
+    try:
+        server.run(sockets=[sock])
+        # Server.run returns quietly when the lifespan startup fails.
+        code = 0 if server.started else 3
+    except BaseException:
+        logger.exception("Worker %d crashed", os.getpid())
+    finally:
+        os._exit(code)
+
+
+class Supervisor:
+    """Forks the workers and keeps WEB_WORKERS of them running."""
+
+    def __init__(self, app, sock: socket.socket, workers: int, torch_threads: int) -> None:
+        self.app           = app
+        self.sock          = sock
+        self.workers       = workers
+        self.torch_threads = torch_threads
+        self.stopping      = False
+        # pid → (slot, start time)
+        self._children: Dict[int, tuple] = {}
+        self._backoff:  Dict[int, float] = {}
+        # slot → monotonic time it is due to be restarted (crash backoff)
+        self._respawn_at: Dict[int, float] = {}
+
+    def _spawn(self, slot: int) -> None:
+        pid = os.fork()
+        if pid == 0:
+            _run_worker(self.app, self.sock, self.torch_threads)
+        self._children[pid] = (slot, time.monotonic())
+        logger.info("Started worker %d (pid %d)", slot, pid)
+
+    def _signal(self, signum, frame) -> None:
+        if not self.stopping:
+            logger.info("Received %s, stopping %d worker(s)", signal.Signals(signum).name, len(self._children))
+            self.stopping = True
+        for pid in list(self._children):
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                pass
+
+    def _reap(self) -> None:
+        while self._children:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+            if pid == 0:
+                return
+            slot, started = self._children.pop(pid)
+            if self.stopping:
+                continue
+            uptime = time.monotonic() - started
+            delay  = 0.0
+            if uptime < _MIN_UPTIME:
+                delay = min(_MAX_BACKOFF, max(1.0, self._backoff.get(slot, 0.5) * 2))
+            self._backoff[slot] = delay
+            logger.warning(
+                "Worker %d (pid %d) exited with status %d after %.1fs; restarting in %.1fs",
+                slot, pid, os.waitstatus_to_exitcode(status), uptime, delay,
+            )
+            # Restarted from run(), so one crash-looping slot never stalls
+            # reaping the others or reacting to a signal.
+            self._respawn_at[slot] = time.monotonic() + delay
+
+    def _respawn_due(self) -> None:
+        now = time.monotonic()
+        for slot, due in list(self._respawn_at.items()):
+            if due <= now:
+                del self._respawn_at[slot]
+                self._spawn(slot)
+
+    def run(self) -> None:
+        signal.signal(signal.SIGTERM, self._signal)
+        signal.signal(signal.SIGINT, self._signal)
+        for slot in range(self.workers):
+            self._spawn(slot)
+
+        while not self.stopping:
+            self._reap()
+            if not self.stopping:
+                self._respawn_due()
+            time.sleep(0.2)
+
+        deadline = time.monotonic() + GRACEFUL_TIMEOUT + 5
+        while self._children and time.monotonic() < deadline:
+            self._reap()
+            time.sleep(0.2)
+        for pid in list(self._children):
+            logger.warning("Worker pid %d did not stop in time, killing it", pid)
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+        self.sock.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=SERVE_HOST)
+    parser.add_argument("--port", type=int, default=SERVE_PORT)
+    parser.add_argument("--workers", type=int, default=WEB_WORKERS)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s[%(process)d] %(levelname)s %(message)s")
+    if not hasattr(os, "fork"):
+        sys.exit("serve.py needs fork(); on this platform use `uvicorn src.app:app --workers N`")
+
+    # Tokenizers warn (and disable parallelism) when forked after first use.
+    os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+
+    # Recommended for fork-after-load: no collections in the parent, freeze
+    # whatever exists right before forking, re-enable in each child.
+    gc.disable()
+    started = time.monotonic()
+    from src.app import app
+    from src.database import init_db
+    from src.database.config import engine
+
+    async def prepare_db() -> None:
+        await init_db()
+        await engine.dispose()
+
+    asyncio.run(prepare_db())
+    gc.freeze()
+    logger.info("Loaded app and models in %.1fs (%d objects frozen)", time.monotonic() - started, gc.get_freeze_count())
+
+    torch_threads = WORKER_TORCH_THREADS or max(1, (os.cpu_count() or 1) // args.workers)
+    sock = _bind(args.host, args.port)
+    logger.info("Listening on %s:%d with %d worker(s), %d torch thread(s) each",
+                args.host, args.port, args.workers, torch_threads)
+    Supervisor(app, sock, args.workers, torch_threads).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,63 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from src.database import init_db
+from src.database.config import engine
 from src.routers.user import user_router
-from src.routers.files import file_router
+from src.routers.files import file_router, requeue_pending_files
 from src.routers.rag import rag_router
+from src.routers.metrics import metrics_router
+from src.utils.lifecycle import drain_middleware, lifecycle
+from src.utils.message_writer import message_writer
+from src.utils.rag import llm_gateway
+from src.utils.reconcile import reconcile_job
+from src.utils.reembed import reembed_job
+from src.utils.scheduler import index_scheduler, retrieval_scheduler
+from src.utils.status_events import status_broker
+from src.utils.telemetry import setup_telemetry, shutdown_telemetry, telemetry_middleware
+from src.vectorstore import get_vector_store
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
-app = FastAPI(title="AnyDoc RAG Backend")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    setup_telemetry(engine)
+    await init_db()
+    await status_broker.start()
+    await message_writer.start()
+    lifecycle.install_signal_handlers()
+    await requeue_pending_files()
+    reconcile_job.start(requeue=requeue_pending_files)
+    reembed_job.start()
+
+    yield
+
+    # Stop taking work, let streams and indexing finish (or requeue them),
+    # then flush and close everything in dependency order.
+    lifecycle.begin_drain()
+    await reconcile_job.stop()
+    await reembed_job.stop()
+    await lifecycle.wait_for_streams()
+    await lifecycle.drain_indexing()
+    retrieval_scheduler.shutdown()
+    index_scheduler.shutdown()
+    await message_writer.stop()
+    await status_broker.stop()
+    await llm_gateway.aclose()
+    if get_vector_store.cache_info().currsize:
+        get_vector_store().close()
+    await engine.dispose()
+    shutdown_telemetry()
+
+
+# orjson for every JSON response; hot endpoints also return ORJSONResponse
+# directly to skip response-model re-validation.
+app = FastAPI(title="AnyDoc RAG Backend", lifespan=lifespan, default_response_class=ORJSONResponse)
 
 # CORS Configuration
 CORS_ORIGINS = os.getenv("CORS_ORIGINS", "http://localhost:3000,http://localhost:8080").split(",")
@@ -26,7 +74,10 @@ app.add_middleware(
 app.include_router(user_router)
 app.include_router(file_router)
 app.include_router(rag_router)
+app.include_router(metrics_router)
+
+# Per-request server span + http.server.duration histogram.
+app.middleware("http")(telemetry_middleware)
 
-@app.on_event("startup")
-async def on_startup():
-    await init_db()
\ No newline at end of file
+# 503 + Retry-After for new requests once a restart has begun.
+app.middleware("http")(drain_middleware)
@@ -1,7 +1,60 @@
+from sqlalchemy import func, inspect, update
+from sqlalchemy.schema import CreateColumn
+
 from src.database.config import engine, Base
-from src.models import users  
+from src.models import users
 from src.models import files
+from src.models import chat
+from src.models import sections
+from src.models import embedding
+from src.models.chat import ChatSession
+
+
+def _create_missing_indexes(sync_conn) -> None:
+    """
+    create_all() only emits CREATE INDEX for tables it creates itself, so
+    indexes added to models after a table already exists would never be
+    built.  Create any that are missing on existing tables.
+    """
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(sync_conn, checkfirst=True)
+
+
+def _add_missing_columns(sync_conn) -> None:
+    """
+    Additive migration: create_all() never alters an existing table, so
+    nullable columns added to a model later are added here with
+    ALTER TABLE … ADD COLUMN.  Anything else needs a real migration.
+    """
+    inspector = inspect(sync_conn)
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing or not column.nullable:
+                continue
+            ddl = CreateColumn(column).compile(dialect=sync_conn.dialect)
+            sync_conn.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {ddl}")
+
+
+def _backfill_session_updated_at(sync_conn) -> None:
+    """
+    Sessions created before updated_at existed have it NULL, and NULLs
+    can't be compared against a keyset cursor, so /rag/sessions would never
+    page past them.  Fill them in from created_at.
+    """
+    sync_conn.execute(
+        update(ChatSession)
+        .where(ChatSession.updated_at.is_(None))
+        .values(updated_at=func.coalesce(ChatSession.created_at, func.current_timestamp()))
+    )
+
 
 async def init_db():
     async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
\ No newline at end of file
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(_add_missing_columns)
+        await conn.run_sync(_create_missing_indexes)
+        await conn.run_sync(_backfill_session_updated_at)
@@ -1,5 +1,5 @@
 from datetime import datetime, timezone
-from sqlalchemy import Column, Integer, String, ForeignKey, Text, DateTime, Enum
+from sqlalchemy import Column, Integer, String, ForeignKey, Text, DateTime, Enum, Index
 from sqlalchemy.orm import relationship
 import enum
 
@@ -17,6 +17,10 @@ class ChatSession(Base):
     Each session maintains its own message history for multi-turn RAG.
     """
     __tablename__ = "chat_sessions"
+    __table_args__ = (
+        # Keyset pagination for GET /rag/sessions: (user_id, updated_at, id)
+        Index("ix_chat_sessions_user_updated", "user_id", "updated_at", "id"),
+    )
 
     id         = Column(Integer, autoincrement=True, primary_key=True, index=True)
     user_id    = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -36,6 +40,10 @@ class ChatMessage(Base):
     A single turn (user or assistant) inside a ChatSession.
     """
     __tablename__ = "chat_messages"
+    __table_args__ = (
+        # History loads and message pagination: WHERE session_id = ? ORDER BY id
+        Index("ix_chat_messages_session_id_id", "session_id", "id"),
+    )
 
     id         = Column(Integer, autoincrement=True, primary_key=True, index=True)
     session_id = Column(Integer, ForeignKey("chat_sessions.id"), nullable=False)
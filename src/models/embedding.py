@@ -0,0 +1,51 @@
+import enum
+from datetime import datetime, timezone
+
+from sqlalchemy import BigInteger, Column, DateTime, Enum, ForeignKey, Integer, String, Text
+
+from src.database.config import Base
+
+
+class EmbeddingStatus(str, enum.Enum):
+    ACTIVE    = "active"
+    MIGRATING = "migrating"
+
+
+class EmbeddingState(Base):
+    """
+    Which embedding model (and collection version) serves a user, plus the
+    progress of a migration to another one.  Users without a row are on
+    the base model (EMBEDDING_MODEL_NAME, unversioned collections).
+
+    The switchover is the single-row UPDATE that moves target_* into
+    active_*, so queries flip from one collection to the other at once.
+    """
+    __tablename__ = "embedding_states"
+
+    user_id        = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    status         = Column(
+        Enum(EmbeddingStatus),
+        nullable=False,
+        default=EmbeddingStatus.ACTIVE,
+        server_default=EmbeddingStatus.ACTIVE.value,
+    )
+    active_model   = Column(String(255), nullable=False)
+    active_version = Column(String(64), nullable=False, default="")
+    target_model   = Column(String(255), nullable=True)
+    target_version = Column(String(64), nullable=True)
+    # Collection version replaced by the last switchover; dropped once
+    # EMBEDDING_RETAIN_SECONDS have passed (kept until then for rollback).
+    previous_version = Column(String(64), nullable=True)
+
+    # ── Migration progress ───────────────────────────────────────────────────
+    # Keyset cursor: files.id of the last file re-embedded.
+    cursor_id       = Column(Integer, nullable=False, default=0)
+    total_files     = Column(Integer, nullable=False, default=0)
+    migrated_files  = Column(Integer, nullable=False, default=0)
+    migrated_chunks = Column(BigInteger, nullable=False, default=0)
+    error           = Column(Text, nullable=True)
+    started_at      = Column(DateTime(timezone=True), nullable=True)
+    finished_at     = Column(DateTime(timezone=True), nullable=True)
+    updated_at      = Column(DateTime(timezone=True),
+                             default=lambda: datetime.now(timezone.utc),
+                             onupdate=lambda: datetime.now(timezone.utc))
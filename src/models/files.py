@@ -1,5 +1,5 @@
 import enum
-from sqlalchemy import Column, Integer, String, ForeignKey, Enum, Text
+from sqlalchemy import Column, DateTime, Integer, String, ForeignKey, Enum, Index, Text
 from sqlalchemy.orm import relationship
 from src.database.config import Base
 
@@ -13,6 +13,10 @@ class IndexingStatus(str, enum.Enum):
 
 class FileInputModel(Base):
     __tablename__ = "files"
+    __table_args__ = (
+        # Keyset pagination for GET /files/list: WHERE user_id = ? ORDER BY id DESC
+        Index("ix_files_user_id_id", "user_id", "id"),
+    )
 
     id              = Column(Integer, autoincrement=True, primary_key=True, index=True)
     file_name       = Column(String(255), nullable=False)
@@ -25,10 +29,22 @@ class FileInputModel(Base):
         server_default=IndexingStatus.PENDING.value,
     )
     indexing_error  = Column(Text, nullable=True)
+    # Set when a worker claims the file; a PROCESSING row whose start is
+    # older than INDEX_STALE_SECONDS belonged to a worker that died.
+    indexing_started_at = Column(DateTime(timezone=True), nullable=True)
+    # Resume checkpoint: how many leading chunks are durably in the vector
+    # store, and a digest of the chunk ids they were split into.  A retry
+    # whose split yields the same digest continues from indexed_chunks.
+    indexed_chunks  = Column(Integer, nullable=True)
+    chunks_digest   = Column(String(32), nullable=True)
 
     # ── Task 9: duplicate detection ──────────────────────────────────────────
     # SHA-256 hex digest of raw file bytes. Indexed for fast lookups.
     # Scoped per-user — two users CAN independently upload the same file.
     file_hash       = Column(String(64), nullable=True, index=True)
 
+    # Key of the uploaded bytes in the storage backend (src/utils/storage.py).
+    # NULL only for rows uploaded before the column existed.
+    storage_key     = Column(String(255), nullable=True)
+
     user = relationship("User", back_populates="files")
\ No newline at end of file
@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, Text, Index
+from src.database.config import Base
+
+
+class DocumentSection(Base):
+    """
+    A parent section produced by structure-aware chunking (heading-delimited
+    text, or a whole table).  Only its small child chunks are embedded; the
+    section itself is fetched by id when building the prompt.
+    """
+    __tablename__ = "document_sections"
+    __table_args__ = (
+        Index("ix_document_sections_file_id_idx", "file_id", "section_idx", unique=True),
+    )
+
+    id          = Column(Integer, autoincrement=True, primary_key=True)
+    file_id     = Column(String, ForeignKey("files.file_id", ondelete="CASCADE"), nullable=False)
+    user_id     = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    section_idx = Column(Integer, nullable=False)
+    kind        = Column(String(16), nullable=False, default="text")
+    heading     = Column(String(512), nullable=True)
+    page        = Column(Integer, nullable=True)
+    content     = Column(Text, nullable=False)
@@ -10,4 +10,5 @@ class User(Base):
     password = Column(String(255), nullable=False)
     task_id = Column(Integer, nullable=True)
     
-    files = relationship("FileInputModel", back_populates="user")
\ No newline at end of file
+    files = relationship("FileInputModel", back_populates="user")
+    chat_sessions = relationship("ChatSession", back_populates="user")
\ No newline at end of file
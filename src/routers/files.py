@@ -9,48 +9,100 @@ Medium-priority additions
            saving.  If the same user has already uploaded an identical file, the
            request is rejected with 409 Conflict and the existing file_id is
            returned so the client can reference it immediately.
+
+Indexing status push
+────────────────────
+  GET /files/status/stream streams status transitions and progress for all
+  of the user's in-flight files as Server-Sent Events (see
+  src/utils/status_events.py), so clients no longer poll per file.
+
+Restarts
+────────
+  Indexing runs as a lifecycle-tracked task rather than a BackgroundTask,
+  so shutdown can wait for it or requeue it.  On startup
+  requeue_pending_files() resumes every PENDING file and any PROCESSING
+  file whose worker died (indexing_started_at older than
+  INDEX_STALE_SECONDS).
+
+Embedding models
+────────────────
+  GET /files/embedding-status reports which embedding model serves the
+  user and how far a background migration to a new one has got.  Deletes
+  remove a file's chunks from every collection version it may be in.
+
+Reindex
+───────
+  POST /files/{file_id}/reindex requeues a FAILED (or any settled) file.
+  Indexing checkpoints after every batch, so it continues from the last
+  committed batch instead of starting over; ?force=true rebuilds from
+  scratch.
 """
 
+import asyncio
 import hashlib
+import logging
 import os
 import uuid
-from typing import Annotated, List
+from datetime import datetime, timedelta, timezone
+from typing import Annotated, AsyncIterator, List, Optional
 
 from dotenv import load_dotenv
-from fastapi import APIRouter, BackgroundTasks, Depends, File, HTTPException, UploadFile, status
-from sqlalchemy import select
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, UploadFile, status
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from sqlalchemy import delete, func, or_, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.database.config import get_db
+from src.database.config import AsyncSessionLocal, get_db
 from src.models.files import FileInputModel, IndexingStatus
+from src.models.sections import DocumentSection
+from src.models.embedding import EmbeddingState
 from src.schemas.files import (
+    EmbeddingStatusResponse,
     FileDeleteResponse,
     FileListResponse,
+    FileReindexResponse,
     FileStatusResponse,
     FileUploadResponse,
     MultipleFileUploadResponse,
 )
 from src.utils.auth_dependencies import get_current_user_id
+from src.utils.embedding_spaces import stored_versions
+from src.utils.pagination import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    file_key,
+    files_count_stmt,
+    files_page_stmt,
+    split_page,
+)
+from src.utils.lifecycle import lifecycle
 from src.utils.rag import delete_file_vectors, index_file_task
+from src.utils.rate_limit import rate_limit, rate_limiter
+from src.utils.reembed import progress
+from src.utils.sse import format_sse
+from src.utils.status_events import status_broker
+from src.utils.storage import get_storage, storage_key
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 file_router = APIRouter(prefix="/files", tags=["Files"])
 
 _raw_ext           = os.getenv("ALLOWED_EXTENSIONS", ".pdf,.txt,.docx,.md")
 ALLOWED_EXTENSIONS = [e.strip() for e in _raw_ext.split(",")]
 MAX_FILE_SIZE      = int(os.getenv("MAX_FILE_SIZE", str(50 * 1024 * 1024)))
-UPLOAD_DIRECTORY   = os.getenv("UPLOAD_DIRECTORY", "uploads")
+STATUS_KEEPALIVE   = float(os.getenv("STATUS_KEEPALIVE_SECONDS", "15"))
+INDEX_STALE_SECONDS = float(os.getenv("INDEX_STALE_SECONDS", "3600"))
+
+_IN_FLIGHT = (IndexingStatus.PENDING, IndexingStatus.PROCESSING)
+_TERMINAL  = {IndexingStatus.INDEXED.value, IndexingStatus.FAILED.value}
 
 
 # ─────────────────────────────────────────────────────────────────────────────
 # Internal helpers
 # ─────────────────────────────────────────────────────────────────────────────
 
-def _disk_path(file_id: str, file_ext: str) -> str:
-    return os.path.join(UPLOAD_DIRECTORY, f"{file_id}{file_ext}")
-
-
 def _sha256(content: bytes) -> str:
     """Return the SHA-256 hex digest of raw bytes."""
     return hashlib.sha256(content).hexdigest()
@@ -70,8 +122,11 @@ async def _check_duplicate(
             (FileInputModel.file_hash == file_hash) &
             (FileInputModel.user_id == user_id)
         )
+        .limit(1)
     )
-    return result.scalar_one_or_none()
+    # first(), not one_or_none(): rows duplicated before this check was
+    # reliable must not turn every later upload into a 500.
+    return result.scalars().first()
 
 
 async def _get_owned_file(
@@ -113,6 +168,84 @@ def _validate_size(content: bytes) -> None:
         )
 
 
+async def _resolve_key(file: FileInputModel) -> str | None:
+    """
+    The file's storage key.  Rows uploaded before storage_key existed are
+    looked up once (all extensions checked concurrently, off the loop) and
+    the caller persists what was found.
+    """
+    if file.storage_key:
+        return file.storage_key
+    storage    = get_storage()
+    candidates = [storage_key(file.file_id, ext) for ext in ALLOWED_EXTENSIONS]
+    found      = await asyncio.gather(*(storage.exists(key) for key in candidates))
+    key        = next((key for key, hit in zip(candidates, found) if hit), None)
+    file.storage_key = key
+    return key
+
+
+async def requeue_pending_files() -> int:
+    """
+    Startup: resume indexing interrupted by a restart.
+
+    PROCESSING rows older than INDEX_STALE_SECONDS (or with no start time,
+    from before the column existed) are reset to PENDING, keeping their
+    indexing checkpoint; every PENDING file is then spawned again and
+    resumes from its last committed batch.  The conditional claim in
+    index_file_task keeps two workers starting at once from indexing the
+    same file twice.
+    """
+    stale_before = datetime.now(timezone.utc) - timedelta(seconds=INDEX_STALE_SECONDS)
+    async with AsyncSessionLocal() as db:
+        stale = (await db.execute(
+            select(FileInputModel.user_id, FileInputModel.file_id).where(
+                (FileInputModel.indexing_status == IndexingStatus.PROCESSING) &
+                or_(
+                    FileInputModel.indexing_started_at.is_(None),
+                    FileInputModel.indexing_started_at < stale_before,
+                )
+            )
+        )).all()
+        if stale:
+            await db.execute(
+                update(FileInputModel)
+                .where(
+                    FileInputModel.file_id.in_([file_id for _, file_id in stale]),
+                    FileInputModel.indexing_status == IndexingStatus.PROCESSING,
+                )
+                .values(
+                    indexing_status=IndexingStatus.PENDING,
+                    indexing_started_at=None,
+                    # No checkpoint means the chunks written so far can't be
+                    # trusted; 0 makes the next run drop them first.
+                    indexed_chunks=func.coalesce(FileInputModel.indexed_chunks, 0),
+                )
+            )
+            await db.commit()
+
+        pending = (await db.execute(
+            select(FileInputModel).where(FileInputModel.indexing_status == IndexingStatus.PENDING)
+        )).scalars().all()
+
+        missing = 0
+        for file in pending:
+            key = await _resolve_key(file)
+            if key is None:
+                missing += 1
+                file.indexing_status = IndexingStatus.FAILED
+                file.indexing_error  = "Uploaded file missing from storage"
+                continue
+            lifecycle.spawn_indexing(
+                file.file_id, index_file_task(key, file.user_id, file.file_id, file.file_name),
+            )
+        await db.commit()
+
+    requeued = len(pending) - missing
+    if stale or requeued:
+        logger.info("Requeued %d file(s) for indexing (%d stale)", requeued, len(stale))
+    return requeued
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 # Upload — single
 # ─────────────────────────────────────────────────────────────────────────────
@@ -123,17 +256,16 @@ def _validate_size(content: bytes) -> None:
     status_code=status.HTTP_201_CREATED,
 )
 async def upload_single_file(
-    background_tasks: BackgroundTasks,
     file: Annotated[UploadFile, File(description="One file to upload")],
     db: AsyncSession = Depends(get_db),
-    user_id: int = Depends(get_current_user_id),
+    user_id: int = Depends(rate_limit("upload")),
 ):
     """
     Upload a single file.
 
     • Validates extension and size.
     • Task 9: Rejects with 409 if the same user already uploaded this exact file.
-    • Saves to disk, records in Postgres with PENDING status.
+    • Saves to storage, records in Postgres with PENDING status.
     • Queues background RAG indexing (Feature 5).
     """
     file_ext = _validate_extension(file.filename)
@@ -154,13 +286,11 @@ async def upload_single_file(
             },
         )
 
-    # ── Save to disk ──────────────────────────────────────────────────────────
-    file_id   = str(uuid.uuid4())
-    file_path = _disk_path(file_id, file_ext)
-    os.makedirs(UPLOAD_DIRECTORY, exist_ok=True)
-
-    with open(file_path, "wb") as f:
-        f.write(content)
+    # ── Save to storage ───────────────────────────────────────────────────────
+    file_id = str(uuid.uuid4())
+    key     = storage_key(file_id, file_ext)
+    storage = get_storage()
+    await storage.put(key, content)
 
     # ── Record in DB ──────────────────────────────────────────────────────────
     db_file = FileInputModel(
@@ -168,6 +298,7 @@ async def upload_single_file(
         file_id=file_id,
         user_id=user_id,
         file_hash=file_hash,
+        storage_key=key,
         indexing_status=IndexingStatus.PENDING,
     )
     db.add(db_file)
@@ -177,19 +308,17 @@ async def upload_single_file(
         await db.refresh(db_file)
     except Exception as e:
         await db.rollback()
-        try:
-            os.remove(file_path)
-        except OSError:
-            pass
+        await storage.delete(key)
         raise HTTPException(status_code=500, detail=f"DB error: {e}")
 
-    background_tasks.add_task(index_file_task, file_path, user_id, file_id, file.filename)
+    await status_broker.publish(user_id, file_id, IndexingStatus.PENDING.value, file_name=file.filename, progress=0.0)
+    lifecycle.spawn_indexing(file_id, index_file_task(key, user_id, file_id, file.filename))
 
     return FileUploadResponse(
         success=True,
         file_id=file_id,
         file_name=file.filename,
-        message="Uploaded successfully. Poll /files/status/{file_id} to track indexing.",
+        message="Uploaded successfully. Subscribe to /files/status/stream to track indexing.",
     )
 
 
@@ -203,7 +332,6 @@ async def upload_single_file(
     status_code=status.HTTP_201_CREATED,
 )
 async def upload_multiple_files(
-    background_tasks: BackgroundTasks,
     files: Annotated[List[UploadFile], File(description="One or more files to upload")],
     db: AsyncSession = Depends(get_db),
     user_id: int = Depends(get_current_user_id),
@@ -214,9 +342,15 @@ async def upload_multiple_files(
     Each file is independently validated.
     Task 9: Duplicate files are reported in the `failed` list (not silently skipped).
     """
+    # One upload token per file, charged before any file is read.
+    rate_limiter.check(user_id, "upload", cost=len(files))
+
     uploaded_files: list[dict] = []
     failed_files:   list[dict] = []
-    os.makedirs(UPLOAD_DIRECTORY, exist_ok=True)
+    # Hashes accepted earlier in this request — not yet visible to
+    # _check_duplicate, which only sees committed rows.
+    accepted: dict[str, str] = {}
+    storage = get_storage()
 
     for file in files:
         try:
@@ -232,33 +366,35 @@ async def upload_multiple_files(
 
             # ── Task 9: per-file duplicate check ─────────────────────────────
             file_hash = _sha256(content)
-            duplicate = await _check_duplicate(file_hash, user_id, db)
-            if duplicate:
+            existing  = accepted.get(file_hash)
+            if existing is None:
+                duplicate = await _check_duplicate(file_hash, user_id, db)
+                existing  = duplicate.file_id if duplicate else None
+            if existing:
                 failed_files.append({
                     "file_name": file.filename,
                     "error":     "Duplicate — already uploaded",
-                    "existing_file_id": duplicate.file_id,
+                    "existing_file_id": existing,
                 })
                 continue
 
-            file_id   = str(uuid.uuid4())
-            file_path = _disk_path(file_id, file_ext)
-
-            with open(file_path, "wb") as f:
-                f.write(content)
+            # Written as soon as it is accepted, so only one file's bytes
+            # are held at a time.
+            file_id = str(uuid.uuid4())
+            key     = storage_key(file_id, file_ext)
+            await storage.put(key, content)
+            del content
 
             db.add(FileInputModel(
                 file_name=file.filename,
                 file_id=file_id,
                 user_id=user_id,
                 file_hash=file_hash,
+                storage_key=key,
                 indexing_status=IndexingStatus.PENDING,
             ))
-            uploaded_files.append({
-                "file_id":   file_id,
-                "file_name": file.filename,
-                "file_path": file_path,
-            })
+            accepted[file_hash] = file_id
+            uploaded_files.append({"file_id": file_id, "file_name": file.filename, "storage_key": key})
 
         except Exception as e:
             failed_files.append({"file_name": file.filename, "error": str(e)})
@@ -268,16 +404,15 @@ async def upload_multiple_files(
             await db.commit()
         except Exception as e:
             await db.rollback()
-            for uf in uploaded_files:
-                try:
-                    os.remove(uf["file_path"])
-                except OSError:
-                    pass
+            await storage.delete_many(uf["storage_key"] for uf in uploaded_files)
             raise HTTPException(status_code=500, detail=f"DB commit failed: {e}")
 
         for uf in uploaded_files:
-            background_tasks.add_task(
-                index_file_task, uf["file_path"], user_id, uf["file_id"], uf["file_name"]
+            await status_broker.publish(
+                user_id, uf["file_id"], IndexingStatus.PENDING.value, file_name=uf["file_name"], progress=0.0,
+            )
+            lifecycle.spawn_indexing(
+                uf["file_id"], index_file_task(uf["storage_key"], user_id, uf["file_id"], uf["file_name"])
             )
 
     return MultipleFileUploadResponse(
@@ -293,13 +428,97 @@ async def upload_multiple_files(
 # Indexing status  (Feature 5)
 # ─────────────────────────────────────────────────────────────────────────────
 
+def _status_frame(event: dict) -> str:
+    payload = {k: v for k, v in event.items() if k != "user_id"}
+    return format_sse(payload, event="status")
+
+
+@file_router.get("/status/stream")
+async def stream_indexing_status(
+    request: Request,
+    close_when_idle: bool = Query(
+        False, description="End the stream once none of your files are pending or processing",
+    ),
+    user_id: int = Depends(get_current_user_id),
+):
+    """
+    Push indexing progress for all of the user's in-flight files as
+    Server-Sent Events, replacing per-file polling.
+
+    SSE protocol:
+      event: status
+      data: {"file_id":..., "file_name":..., "status": "processing", "progress": 0.4, "error": null}
+
+    The stream opens with one event per file that is currently PENDING or
+    PROCESSING, then pushes every transition as it happens (uploads publish
+    PENDING once their row commits).  A comment line is sent every
+    STATUS_KEEPALIVE_SECONDS so proxies keep the connection open.
+
+    With close_when_idle and nothing in flight yet, the stream waits one
+    keep-alive interval for a first event before closing, so a client that
+    subscribes just before its upload commits still sees it through.
+    """
+    async def event_generator() -> AsyncIterator[str]:
+        # Subscribe before taking the snapshot so no transition falls in between.
+        with status_broker.subscribe(user_id) as queue:
+            async with AsyncSessionLocal() as db:
+                result = await db.execute(
+                    select(FileInputModel).where(
+                        (FileInputModel.user_id == user_id) &
+                        (FileInputModel.indexing_status.in_(_IN_FLIGHT))
+                    )
+                )
+                snapshot = result.scalars().all()
+
+            in_flight: set[str] = set()
+            for f in snapshot:
+                in_flight.add(f.file_id)
+                yield _status_frame({
+                    "file_id":   f.file_id,
+                    "file_name": f.file_name,
+                    "status":    f.indexing_status.value,
+                    "progress":  None,
+                    "error":     f.indexing_error,
+                })
+
+            awaiting_first = close_when_idle and not in_flight
+            while awaiting_first or not (close_when_idle and not in_flight):
+                if await request.is_disconnected() or lifecycle.draining:
+                    # On restart the client reconnects and gets a fresh snapshot.
+                    return
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=STATUS_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    if awaiting_first:
+                        return
+                    yield ": keep-alive\n\n"
+                    continue
+
+                awaiting_first = False
+
+                if event["status"] in _TERMINAL:
+                    in_flight.discard(event["file_id"])
+                else:
+                    in_flight.add(event["file_id"])
+                yield _status_frame(event)
+
+    return StreamingResponse(
+        event_generator(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control":     "no-cache",
+            "X-Accel-Buffering": "no",
+        },
+    )
+
+
 @file_router.get("/status/{file_id}", response_model=FileStatusResponse)
 async def get_indexing_status(
     file_id: str,
     db: AsyncSession = Depends(get_db),
     user_id: int = Depends(get_current_user_id),
 ):
-    """Poll this after upload to track indexing progress."""
+    """One-off status check; prefer /files/status/stream for live progress."""
     file = await _get_owned_file(file_id, user_id, db)
     return FileStatusResponse(
         file_id=file.file_id,
@@ -309,20 +528,107 @@ async def get_indexing_status(
     )
 
 
+@file_router.get("/embedding-status", response_model=EmbeddingStatusResponse)
+async def get_embedding_status(
+    db: AsyncSession = Depends(get_db),
+    user_id: int = Depends(get_current_user_id),
+):
+    """
+    The embedding model the user's documents are searched with, and the
+    progress of a migration to a new one (src/utils/reembed.py).
+    """
+    return progress(user_id, await db.get(EmbeddingState, user_id))
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Reindex
+# ─────────────────────────────────────────────────────────────────────────────
+
+@file_router.post(
+    "/{file_id}/reindex",
+    response_model=FileReindexResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def reindex_file(
+    file_id: str,
+    force: bool = Query(False, description="Discard the checkpoint and rebuild every chunk"),
+    db: AsyncSession = Depends(get_db),
+    user_id: int = Depends(rate_limit("upload")),
+):
+    """
+    Queue a file for indexing again — typically after FAILED.
+
+    The run resumes after the last batch the previous one committed
+    (files.indexed_chunks), as long as the document still splits into the
+    same chunks; otherwise, or with force=true, it starts over and drops
+    the old chunks first.  Reindexing an INDEXED file without force is
+    therefore a cheap no-op unless chunking changed.
+    """
+    file = await _get_owned_file(file_id, user_id, db)
+    if file.indexing_status == IndexingStatus.PROCESSING:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="File is being indexed right now")
+
+    key = await _resolve_key(file)
+    if key is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Uploaded file is missing from storage; upload it again",
+        )
+
+    values = dict(indexing_status=IndexingStatus.PENDING, indexing_error=None, indexing_started_at=None)
+    if force:
+        values.update(indexed_chunks=0, chunks_digest=None)
+    elif file.indexed_chunks is None:
+        # Never checkpointed: any chunks it has predate checkpoints, drop them.
+        values["indexed_chunks"] = 0
+    resume_from = 0 if force else file.indexed_chunks or 0
+
+    requeued = await db.execute(
+        update(FileInputModel)
+        .where(
+            FileInputModel.file_id == file_id,
+            FileInputModel.indexing_status != IndexingStatus.PROCESSING,
+        )
+        .values(**values)
+    )
+    if requeued.rowcount == 0:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="File is being indexed right now")
+    await db.commit()
+
+    await status_broker.publish(
+        user_id, file_id, IndexingStatus.PENDING.value, file_name=file.file_name, progress=0.0,
+    )
+    lifecycle.spawn_indexing(file_id, index_file_task(key, user_id, file_id, file.file_name))
+
+    return FileReindexResponse(
+        success=True,
+        file_id=file_id,
+        resume_from=resume_from,
+        message="Reindexing queued. Subscribe to /files/status/stream to track progress.",
+    )
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 # List
 # ─────────────────────────────────────────────────────────────────────────────
 
-@file_router.get("/list", response_model=FileListResponse)
+@file_router.get("/list", responses={200: {"model": FileListResponse}})
 async def list_user_files(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="`next_cursor` from the previous page"),
     db: AsyncSession = Depends(get_db),
     user_id: int = Depends(get_current_user_id),
 ):
-    result = await db.execute(
-        select(FileInputModel).where(FileInputModel.user_id == user_id)
-    )
-    files = result.scalars().all()
-    return FileListResponse(success=True, files=files, total=len(files))
+    """List the user's files, newest first, one keyset page at a time."""
+    result = await db.execute(files_page_stmt(user_id, cursor, limit))
+    files, next_cursor = split_page(result.scalars().all(), limit, file_key)
+    total = (await db.execute(files_count_stmt(user_id))).scalar_one()
+    return ORJSONResponse({
+        "success":     True,
+        "files":       [{"id": f.id, "file_id": f.file_id, "file_name": f.file_name} for f in files],
+        "total":       total,
+        "next_cursor": next_cursor,
+    })
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -338,28 +644,38 @@ async def delete_file(
     """
     Delete a file completely:
       1. Removes the file from disk.
-      2. Task 8: Deletes all vector chunks from the user's Milvus collection.
-      3. Removes the record from Postgres.
+      2. Task 8: Deletes all vector chunks from the user's vector collection.
+      3. Removes the record (and its parent sections) from Postgres.
 
-    Steps 1 and 2 are attempted even if the other fails — we always clean up
-    as much as possible before removing the DB record.
+    Steps 1 and 2 run concurrently, off the event loop, and each is
+    attempted even if the other fails — we always clean up as much as
+    possible before removing the DB record.
     """
     file = await _get_owned_file(file_id, user_id, db)
 
-    # ── 1. Remove from disk ───────────────────────────────────────────────────
-    for ext in ALLOWED_EXTENSIONS:
-        candidate = _disk_path(file_id, ext)
-        if os.path.exists(candidate):
-            os.remove(candidate)
-            logger.info("Removed file from disk: %s", candidate)
-            break
-
-    # ── 2. Task 8: Remove vectors from Milvus ────────────────────────────────
-    deleted_vectors = delete_file_vectors(user_id=user_id, file_id=file_id)
-    logger.info("Removed %d vector(s) from Milvus for file_id=%s", deleted_vectors, file_id)
+    async def remove_upload() -> None:
+        key = await _resolve_key(file)
+        if key is not None and await get_storage().delete(key):
+            logger.info("Removed uploaded file: %s", key)
+
+    # ── 1 + 2. Remove the upload and (Task 8) its vectors ───────────────────
+    # Every embedding version: mid-migration the file may be in two.
+    versions = await stored_versions(user_id)
+    removed, deleted_vectors = await asyncio.gather(
+        remove_upload(),
+        asyncio.to_thread(delete_file_vectors, user_id, file_id, versions),
+        return_exceptions=True,
+    )
+    if isinstance(removed, Exception):
+        logger.error("Failed to remove upload for file_id=%s: %s", file_id, removed)
+    if isinstance(deleted_vectors, Exception):
+        logger.error("Failed to remove vectors for file_id=%s: %s", file_id, deleted_vectors)
+        deleted_vectors = 0
+    logger.info("Removed %d vector(s) from the vector store for file_id=%s", deleted_vectors, file_id)
 
     # ── 3. Remove from Postgres ───────────────────────────────────────────────
     try:
+        await db.execute(delete(DocumentSection).where(DocumentSection.file_id == file_id))
         await db.delete(file)
         await db.commit()
     except Exception as e:
@@ -370,7 +686,3 @@ async def delete_file(
         success=True,
         message=f"File '{file.file_name}' and its {deleted_vectors} vector(s) deleted successfully",
     )
-
-
-import logging
-logger = logging.getLogger(__name__)
\ No newline at end of file
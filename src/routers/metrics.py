@@ -0,0 +1,19 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from src.utils.reembed import migration_summary
+from src.utils.telemetry import render_prometheus
+
+metrics_router = APIRouter(tags=["Metrics"])
+
+
+@metrics_router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def prometheus_metrics():
+    """Prometheus scrape endpoint — stage, DB and HTTP latency histograms."""
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+@metrics_router.get("/metrics/embedding-migration")
+async def embedding_migration():
+    """Embedding-model migration across all users: users per model, files and chunks done, chunks/sec."""
+    return await migration_summary()
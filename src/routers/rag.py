@@ -7,32 +7,84 @@ Medium-priority additions
            POST /rag/sessions/{id}/stream      — session-aware streaming query
 
 Both streaming endpoints use FastAPI's StreamingResponse with Server-Sent Events
-(SSE).  The LLM tokens stream in real-time; sources arrive in a final event
-before the [DONE] sentinel.
+(SSE).  Sources are sent as soon as re-ranking finishes, then the LLM tokens
+stream in real-time until the done event.  Framing is handled by
+src/utils/sse.py.
 
 SSE event format
 ────────────────
-  data: <token text>\\n\\n          — one per LLM token
-  data: [SOURCES] <json array>\\n\\n — citations, sent after all tokens
-  data: [DONE]\\n\\n                 — signals end of stream
+  event: sources  data: <json array>    — citations, sent before generation
+  event: token    data: <text>          — LLM output, coalesced into small runs;
+                                          newlines are kept as multi-line data
+  event: error    data: <json object>   — LLM failure after retries ({"detail", "retry_after"})
+  event: timings  data: <json object>   — per-stage ms, only if include_timings
+  event: done     data: [DONE]          — signals end of stream
+
+Every event carries a sequential `id:`.
+
+Retrieval only
+──────────────
+  POST /rag/retrieve returns ranked chunks without calling the LLM; it
+  accepts query text, a precomputed query vector, or both.
+
+Batch queries
+─────────────
+  POST /rag/query/batch streams one NDJSON line per question as each
+  answer completes (see batch_query).
 """
 
-import json
+import asyncio
+import math
+import os
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.responses import StreamingResponse
-from pydantic import BaseModel, Field
+import orjson
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pydantic import BaseModel, Field, field_validator, model_validator
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import AsyncIterator, List
+from typing import AsyncIterator, Dict, List, Optional, Union
 
 from src.database.config import get_db
-from src.models.chat import ChatMessage, ChatSession, MessageRole
+from src.models.chat import ChatMessage, ChatSession
+from src.schemas.chat import CreateSessionRequest, SessionListResponse, SessionSchema
 from src.utils.auth_dependencies import get_current_user, get_current_user_id
-from src.utils.rag import generate_answer, stream_answer
+from src.utils.embedding_spaces import active_space
+from src.utils.lifecycle import lifecycle
+from src.utils.llm_gateway import LLMError, LLMRateLimitedError, LLMTimeoutError
+from src.utils.message_writer import merge_history, message_writer
+from src.utils.pagination import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    message_key,
+    messages_page_stmt,
+    session_key,
+    sessions_page_stmt,
+    split_page,
+)
+from src.utils.rag import (
+    BATCH_LLM_CONCURRENCY,
+    HISTORY_WINDOW,
+    RERANK_EXPAND_BELOW,
+    RERANK_SKIP_MARGIN,
+    RETRIEVAL_FETCH_K,
+    RETRIEVAL_MAX_FETCH_K,
+    RETRIEVAL_TOP_K,
+    RetrievalOptions,
+    answer_batch,
+    generate_answer,
+    retrieve_chunks,
+    stream_answer,
+)
+from src.utils.rate_limit import rate_limit
+from src.utils.sse import DONE, ERROR, TOKEN, StreamEvent, coalesce_tokens, encode_sse
+from src.vectorstore import FILTERABLE_METADATA, SearchFilter, get_vector_store
 
 rag_router = APIRouter(prefix="/rag", tags=["RAG"])
 
+BATCH_MAX_QUERIES = int(os.getenv("BATCH_MAX_QUERIES", "500"))
+
 
 # ─────────────────────────────────────────────────────────────────────────────
 # Schemas
@@ -44,9 +96,48 @@ class SourceSchema(BaseModel):
     chunk_idx: int
 
 
-class RAGQueryRequest(BaseModel):
-    query:      str  = Field(..., min_length=1)
-    use_scores: bool = Field(False)
+class RetrievalParams(BaseModel):
+    """Adaptive retrieval knobs shared by every query request."""
+    use_scores:    bool            = Field(False, description="Skip re-ranking when dense scores already separate the top_k")
+    top_k:         int             = Field(RETRIEVAL_TOP_K, ge=1, le=50)
+    fetch_k:       int             = Field(RETRIEVAL_FETCH_K, ge=1, le=500)
+    max_fetch_k:   int             = Field(RETRIEVAL_MAX_FETCH_K, ge=1, le=500,
+                                           description="Upper bound when fetch_k is expanded for weak matches")
+    rerank_margin: Optional[float] = Field(None, ge=0,
+                                           description=f"Dense margin used by use_scores (default {RERANK_SKIP_MARGIN})")
+    expand_below:  Optional[float] = Field(RERANK_EXPAND_BELOW,
+                                           description="Widen the search while the best re-rank score is below this; null disables")
+    file_ids:      Optional[List[str]] = Field(None, max_length=500,
+                                               description="Only search chunks of these files")
+    metadata_filter: Dict[str, Union[str, int, float, bool, List[Union[str, int, float, bool]]]] = Field(
+        default_factory=dict,
+        description=f"Equality (or any-of, for lists) on: {', '.join(FILTERABLE_METADATA)}",
+    )
+
+    @field_validator("metadata_filter")
+    @classmethod
+    def _known_metadata_keys(cls, value: dict) -> dict:
+        unknown = set(value) - set(FILTERABLE_METADATA)
+        if unknown:
+            raise ValueError(f"Cannot filter on: {', '.join(sorted(unknown))}")
+        return value
+
+    def retrieval_options(self) -> RetrievalOptions:
+        fetch_k = max(self.fetch_k, self.top_k)
+        margin  = self.rerank_margin if self.rerank_margin is not None else RERANK_SKIP_MARGIN
+        return RetrievalOptions(
+            top_k=self.top_k,
+            fetch_k=fetch_k,
+            max_fetch_k=max(self.max_fetch_k, fetch_k),
+            skip_margin=margin if self.use_scores else None,
+            expand_below=self.expand_below,
+            filter=SearchFilter(file_ids=self.file_ids, metadata=self.metadata_filter) or None,
+        )
+
+
+class RAGQueryRequest(RetrievalParams):
+    query: str = Field(..., min_length=1)
+    include_timings: bool = Field(False, description="Streaming only: emit a per-stage `timings` event")
 
 
 class RAGQueryResponse(BaseModel):
@@ -56,30 +147,51 @@ class RAGQueryResponse(BaseModel):
     sources: List[SourceSchema] = []
 
 
-class CreateSessionRequest(BaseModel):
-    title: str = Field("New Chat", min_length=1, max_length=255)
+class RAGBatchRequest(RetrievalParams):
+    queries:     List[str] = Field(..., min_length=1, max_length=BATCH_MAX_QUERIES)
+    concurrency: int       = Field(BATCH_LLM_CONCURRENCY, ge=1, le=32,
+                                   description="Concurrent LLM calls for this batch")
+
+    @field_validator("queries")
+    @classmethod
+    def _non_empty_queries(cls, value: List[str]) -> List[str]:
+        if any(not q.strip() for q in value):
+            raise ValueError("Queries must not be empty")
+        return value
 
 
-class MessageSchema(BaseModel):
-    id:      int
-    role:    str
-    content: str
+class RetrieveRequest(RetrievalParams):
+    query:           Optional[str]         = Field(None, min_length=1)
+    query_vector:    Optional[List[float]] = Field(None, min_length=1, max_length=4096,
+                                                   description="Precomputed query embedding; skips embedding")
+    expand_sections: bool                  = Field(False, description="Return parent sections instead of child chunks")
 
-    class Config:
-        from_attributes = True
+    @model_validator(mode="after")
+    def _query_or_vector(self) -> "RetrieveRequest":
+        if self.query is None and self.query_vector is None:
+            raise ValueError("Provide `query`, `query_vector`, or both")
+        return self
 
 
-class SessionSchema(BaseModel):
-    id:       int
-    title:    str
-    messages: List[MessageSchema] = []
+class RetrievedChunkSchema(BaseModel):
+    text:      str
+    score:     float
+    scorer:    str   = Field(..., description='"dense" (cosine) or "rerank" (CrossEncoder logit); scales differ')
+    file_id:   str
+    file_name: str
+    chunk_idx: int
+    metadata:  Dict
+
 
-    class Config:
-        from_attributes = True
+class RetrieveResponse(BaseModel):
+    success: bool
+    query:   Optional[str]
+    chunks:  List[RetrievedChunkSchema] = []
 
 
-class SessionQueryRequest(BaseModel):
+class SessionQueryRequest(RetrievalParams):
     query: str = Field(..., min_length=1)
+    include_timings: bool = Field(False, description="Streaming only: emit a per-stage `timings` event")
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -107,12 +219,75 @@ async def _get_owned_session(
 
 
 async def _load_history(session_id: int, db: AsyncSession) -> list[dict]:
-    result = await db.execute(
-        select(ChatMessage)
+    """
+    Only the last HISTORY_WINDOW turns ever reach the prompt, so read just
+    those (newest-first via ix_chat_messages_session_id_id, then reversed),
+    plus any turns still queued in the message writer (snapshotted first —
+    see merge_history).
+    """
+    pending = message_writer.pending(session_id)
+    result  = await db.execute(
+        select(ChatMessage.role, ChatMessage.content, ChatMessage.created_at)
         .where(ChatMessage.session_id == session_id)
-        .order_by(ChatMessage.id)
+        .order_by(ChatMessage.id.desc())
+        .limit(HISTORY_WINDOW)
     )
-    return [{"role": m.role.value, "content": m.content} for m in result.scalars().all()]
+    stored = list(reversed(result.all()))
+    return merge_history(stored, pending)[-HISTORY_WINDOW:]
+
+
+async def _retrieval_options(body: RetrievalParams, user_id: int) -> RetrievalOptions:
+    """
+    body.retrieval_options(), after checking that the user's collection can
+    carry every metadata_filter key.  Old fixed-schema Milvus collections
+    can't, and a filter on such a key would match nothing — a 422 says
+    why instead of an empty "nothing found" answer.
+    """
+    if body.metadata_filter:
+        space   = await active_space(user_id)
+        missing = await asyncio.to_thread(
+            get_vector_store().unsupported_metadata, user_id, list(body.metadata_filter), space.version,
+        )
+        if missing:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=(
+                    f"Your document collection predates metadata filtering and doesn't carry: "
+                    f"{', '.join(sorted(missing))}"
+                ),
+            )
+    return body.retrieval_options()
+
+
+def _llm_http_error(exc: LLMError) -> HTTPException:
+    """Map gateway failures to 429 / 504 / 503 instead of a blanket 500."""
+    if isinstance(exc, LLMRateLimitedError):
+        return HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=f"RAG error: {exc}",
+            headers={"Retry-After": str(max(1, math.ceil(exc.retry_after)))},
+        )
+    if isinstance(exc, LLMTimeoutError):
+        return HTTPException(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail=f"RAG error: {exc}")
+    return HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=f"RAG error: {exc}")
+
+
+def _query_response(query: str, result_data: Dict) -> ORJSONResponse:
+    """
+    Serialise an answer straight from generate_answer's plain dicts — they
+    already have RAGQueryResponse's shape, so no per-source model rebuild.
+
+    Routes that return hand-built responses like this one document their
+    shape with `responses=` rather than response_model: FastAPI never
+    validates or filters a returned Response, so response_model would only
+    claim checks that don't happen.
+    """
+    return ORJSONResponse({
+        "success": True,
+        "query":   query,
+        "answer":  result_data["answer"],
+        "sources": result_data["sources"],
+    })
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -129,36 +304,43 @@ async def create_session(
     db.add(session)
     await db.commit()
     await db.refresh(session)
-    return session
+    return SessionSchema(id=session.id, title=session.title)
 
 
-@rag_router.get("/sessions", response_model=List[SessionSchema])
+@rag_router.get("/sessions", responses={200: {"model": SessionListResponse}})
 async def list_sessions(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="`next_cursor` from the previous page"),
     db: AsyncSession = Depends(get_db),
     user_id: int = Depends(get_current_user_id),
 ):
-    result = await db.execute(
-        select(ChatSession)
-        .where(ChatSession.user_id == user_id)
-        .order_by(ChatSession.updated_at.desc())
-    )
-    return result.scalars().all()
+    """List the user's sessions, most recently active first, one keyset page at a time."""
+    result = await db.execute(sessions_page_stmt(user_id, cursor, limit))
+    sessions, next_cursor = split_page(result.scalars().all(), limit, session_key)
+    return ORJSONResponse({
+        "sessions":    [{"id": s.id, "title": s.title, "updated_at": s.updated_at} for s in sessions],
+        "next_cursor": next_cursor,
+    })
 
 
-@rag_router.get("/sessions/{session_id}", response_model=SessionSchema)
+@rag_router.get("/sessions/{session_id}", responses={200: {"model": SessionSchema}})
 async def get_session(
     session_id: int,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="`next_message_cursor` from the previous page"),
     db: AsyncSession = Depends(get_db),
     user_id: int = Depends(get_current_user_id),
 ):
+    """Return a session with one page of its messages, oldest first."""
     session = await _get_owned_session(session_id, user_id, db)
-    result  = await db.execute(
-        select(ChatMessage)
-        .where(ChatMessage.session_id == session_id)
-        .order_by(ChatMessage.id)
-    )
-    session.messages = result.scalars().all()
-    return session
+    result  = await db.execute(messages_page_stmt(session_id, cursor, limit))
+    messages, next_cursor = split_page(result.scalars().all(), limit, message_key)
+    return ORJSONResponse({
+        "id":       session.id,
+        "title":    session.title,
+        "messages": [{"id": m.id, "role": m.role.value, "content": m.content} for m in messages],
+        "next_message_cursor": next_cursor,
+    })
 
 
 @rag_router.delete("/sessions/{session_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -168,6 +350,7 @@ async def delete_session(
     user_id: int = Depends(get_current_user_id),
 ):
     session = await _get_owned_session(session_id, user_id, db)
+    message_writer.discard(session_id)
     await db.delete(session)
     await db.commit()
 
@@ -176,86 +359,173 @@ async def delete_session(
 # Non-streaming queries
 # ─────────────────────────────────────────────────────────────────────────────
 
-@rag_router.post("/sessions/{session_id}/query", response_model=RAGQueryResponse)
+@rag_router.post("/sessions/{session_id}/query", responses={200: {"model": RAGQueryResponse}})
 async def session_query(
     session_id: int,
     body: SessionQueryRequest,
     db: AsyncSession = Depends(get_db),
-    user_id: int = Depends(get_current_user_id),
+    user_id: int = Depends(rate_limit("query")),
 ):
-    """Multi-turn query — loads history, answers, persists both turns."""
+    """Multi-turn query — loads history, answers, queues both turns for the batched writer."""
     await _get_owned_session(session_id, user_id, db)
+    options = await _retrieval_options(body, user_id)
     history = await _load_history(session_id, db)
 
     try:
-        result_data = generate_answer(query=body.query, user_id=user_id, chat_history=history)
+        result_data = await generate_answer(
+            query=body.query,
+            user_id=user_id,
+            chat_history=history,
+            options=options,
+        )
+    except LLMError as e:
+        raise _llm_http_error(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"RAG error: {e}")
 
-    db.add(ChatMessage(session_id=session_id, role=MessageRole.USER,      content=body.query))
-    db.add(ChatMessage(session_id=session_id, role=MessageRole.ASSISTANT, content=result_data["answer"]))
-    await db.commit()
+    await message_writer.submit(session_id, body.query, result_data["answer"])
 
-    return RAGQueryResponse(
-        success=True,
-        query=body.query,
-        answer=result_data["answer"],
-        sources=[SourceSchema(**s) for s in result_data["sources"]],
-    )
+    return _query_response(body.query, result_data)
 
 
-@rag_router.post("/query", response_model=RAGQueryResponse)
+@rag_router.post("/query", responses={200: {"model": RAGQueryResponse}})
 async def stateless_query(
     body: RAGQueryRequest,
-    user_id: int = Depends(get_current_user_id),
+    user_id: int = Depends(rate_limit("query")),
 ):
     """One-off query with no session history."""
+    options = await _retrieval_options(body, user_id)
     try:
-        result_data = generate_answer(query=body.query, user_id=user_id, chat_history=None)
+        result_data = await generate_answer(
+            query=body.query,
+            user_id=user_id,
+            chat_history=None,
+            options=options,
+        )
+    except LLMError as e:
+        raise _llm_http_error(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"RAG error: {e}")
 
-    return RAGQueryResponse(
-        success=True,
-        query=body.query,
-        answer=result_data["answer"],
-        sources=[SourceSchema(**s) for s in result_data["sources"]],
-    )
+    return _query_response(body.query, result_data)
+
+
+@rag_router.post("/retrieve", responses={200: {"model": RetrieveResponse}})
+async def retrieve(
+    body: RetrieveRequest,
+    user_id: int = Depends(rate_limit("query")),
+):
+    """
+    Ranked chunks with scores and metadata — retrieval only, no LLM call.
+
+    Send `query_vector` (from the same embedding model) to skip embedding;
+    with a vector alone chunks are ranked by dense similarity, add `query`
+    to have them re-ranked as well.  The payload can be large, so it is
+    serialised straight to JSON with orjson rather than re-validated.
+    """
+    options = await _retrieval_options(body, user_id)
+    try:
+        chunks = await retrieve_chunks(
+            user_id,
+            query=body.query,
+            query_vector=body.query_vector,
+            options=options,
+            expand_sections=body.expand_sections,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"RAG error: {e}")
+
+    return ORJSONResponse({"success": True, "query": body.query, "chunks": chunks})
+
+
+# Event name for one batch answer while it passes through track_stream.
+_RESULT = "result"
+
+
+@rag_router.post("/query/batch")
+async def batch_query(
+    body: RAGBatchRequest,
+    user_id: int = Depends(rate_limit("batch")),
+):
+    """
+    Answer many independent questions in one call (evaluation runs).
+
+    Retrieval is batched — one embedding call, one multi-vector search and
+    one re-ranker batch for all queries — and LLM calls run `concurrency`
+    at a time.  Results stream back as NDJSON, one line per query in
+    completion order; `index` is the query's position in the request:
+      {"index": 3, "query": "...", "answer": "...", "sources": [...]}
+      {"index": 7, "query": "...", "error": "...", "retry_after": 2.0}
+
+    If the worker starts draining (src/utils/lifecycle.py), the stream ends
+    at the drain deadline with one last line naming the queries it never
+    answered, so the client can resubmit just those elsewhere:
+      {"error": "...", "retry_after": 1, "unanswered": [0, 4, 9]}
+    """
+    options = await _retrieval_options(body, user_id)
+
+    async def results() -> AsyncIterator[StreamEvent]:
+        async for result in answer_batch(
+            body.queries,
+            user_id,
+            options=options,
+            concurrency=body.concurrency,
+        ):
+            yield StreamEvent(_RESULT, result)
+
+    async def lines() -> AsyncIterator[bytes]:
+        answered: set[int] = set()
+        async for event in lifecycle.track_stream(results()):
+            if event.event == _RESULT:
+                answered.add(event.data["index"])
+                yield orjson.dumps(event.data) + b"\n"
+            elif event.event == ERROR:
+                unanswered = [i for i in range(len(body.queries)) if i not in answered]
+                yield orjson.dumps({**event.data, "unanswered": unanswered}) + b"\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
 
 
 # ─────────────────────────────────────────────────────────────────────────────
 # Task 6 — Streaming endpoints
 # ─────────────────────────────────────────────────────────────────────────────
 
+_SSE_HEADERS = {
+    # Disable buffering so tokens arrive at the client in real-time
+    "Cache-Control":     "no-cache",
+    "X-Accel-Buffering": "no",
+}
+
+
 @rag_router.post("/stream")
 async def stateless_stream(
     body: RAGQueryRequest,
-    user_id: int = Depends(get_current_user_id),
+    user_id: int = Depends(rate_limit("query")),
 ):
     """
     Stateless streaming query.  Returns tokens as Server-Sent Events.
 
     SSE protocol:
-      data: <token>\\n\\n
-      data: [SOURCES] [{"file_name":..., "file_id":..., "chunk_idx":...}, ...]\\n\\n
-      data: [DONE]\\n\\n
+      event: sources  data: [{"file_name":..., "file_id":..., "chunk_idx":...}, ...]
+      event: token    data: <text>
+      event: timings  data: {"embed_ms":..., "search_ms":..., ...}   (include_timings only)
+      event: done     data: [DONE]
     """
-    async def event_generator() -> AsyncIterator[str]:
-        async for chunk in stream_answer(
-            query=body.query,
-            user_id=user_id,
-            chat_history=None,
-        ):
-            yield chunk
+    options = await _retrieval_options(body, user_id)
+    events  = stream_answer(
+        query=body.query,
+        user_id=user_id,
+        chat_history=None,
+        include_timings=body.include_timings,
+        options=options,
+    )
 
     return StreamingResponse(
-        event_generator(),
+        encode_sse(lifecycle.track_stream(coalesce_tokens(events))),
         media_type="text/event-stream",
-        headers={
-            # Disable buffering so tokens arrive at the client in real-time
-            "Cache-Control":    "no-cache",
-            "X-Accel-Buffering": "no",
-        },
+        headers=_SSE_HEADERS,
     )
 
 
@@ -264,66 +534,46 @@ async def session_stream(
     session_id: int,
     body: SessionQueryRequest,
     db: AsyncSession = Depends(get_db),
-    user_id: int = Depends(get_current_user_id),
+    user_id: int = Depends(rate_limit("query")),
 ):
     """
     Session-aware streaming query.
 
-    - Loads the full conversation history before streaming.
-    - After the stream is exhausted, persists both turns to the DB so the
-      next query in this session sees them.
+    - Loads the recent conversation history before streaming.
+    - When the answer is complete, hands both turns to the batched message
+      writer and sends `done` straight away — the DB write happens off the
+      response path (skipped if the LLM call failed).
 
     SSE protocol: same as /rag/stream
     """
     await _get_owned_session(session_id, user_id, db)
+    options = await _retrieval_options(body, user_id)
     history = await _load_history(session_id, db)
 
-    # Collect the full answer while streaming so we can persist it afterward
-    answer_parts: list[str] = []
-    sources_data: list[dict] = []
+    async def persisting_events() -> AsyncIterator[StreamEvent]:
+        # Collect the answer from the token events themselves so it can be
+        # persisted once the stream completes.
+        answer_parts: list[str] = []
+        failed = False
 
-    async def event_generator() -> AsyncIterator[str]:
-        async for chunk in stream_answer(
+        async for event in stream_answer(
             query=body.query,
             user_id=user_id,
             chat_history=history,
+            include_timings=body.include_timings,
+            options=options,
         ):
-            # Intercept the [SOURCES] event to capture citation data
-            if chunk.startswith("data: [SOURCES]"):
-                try:
-                    payload = chunk.removeprefix("data: [SOURCES] ").strip()
-                    sources_data.extend(json.loads(payload))
-                except Exception:
-                    pass
-            elif chunk.startswith("data: [DONE]"):
-                # Persist both turns once streaming is complete
-                full_answer = "".join(answer_parts)
-                db.add(ChatMessage(
-                    session_id=session_id,
-                    role=MessageRole.USER,
-                    content=body.query,
-                ))
-                db.add(ChatMessage(
-                    session_id=session_id,
-                    role=MessageRole.ASSISTANT,
-                    content=full_answer,
-                ))
-                try:
-                    await db.commit()
-                except Exception:
-                    await db.rollback()
-            elif not chunk.startswith("data: ["):
-                # Regular token — strip the "data: " prefix and collect
-                token = chunk.removeprefix("data: ").rstrip("\n")
-                answer_parts.append(token)
-
-            yield chunk
+            if event.event == TOKEN:
+                answer_parts.append(event.data)
+            elif event.event == ERROR:
+                failed = True
+            elif event.event == DONE and not failed:
+                await message_writer.submit(session_id, body.query, "".join(answer_parts))
+
+            yield event
 
     return StreamingResponse(
-        event_generator(),
+        encode_sse(lifecycle.track_stream(coalesce_tokens(persisting_events()))),
         media_type="text/event-stream",
-        headers={
-            "Cache-Control":    "no-cache",
-            "X-Accel-Buffering": "no",
-        },
-    )
\ No newline at end of file
+        headers=_SSE_HEADERS,
+    )
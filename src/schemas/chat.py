@@ -0,0 +1,45 @@
+from datetime import datetime
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+
+class CreateSessionRequest(BaseModel):
+    title: str = Field("New Chat", min_length=1, max_length=255)
+
+
+class MessageSchema(BaseModel):
+    id:      int
+    role:    str
+    content: str
+
+    class Config:
+        from_attributes = True
+
+
+class SessionSchema(BaseModel):
+    """
+    One session with a single keyset page of its messages (chronological).
+    Pass `next_message_cursor` back as `?cursor=` for the following page.
+    """
+    id:       int
+    title:    str
+    messages: List[MessageSchema] = []
+    next_message_cursor: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+
+class SessionSummarySchema(BaseModel):
+    id:         int
+    title:      str
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+class SessionListResponse(BaseModel):
+    sessions:    List[SessionSummarySchema]
+    next_cursor: Optional[str] = None
@@ -1,6 +1,9 @@
 from pydantic import BaseModel
+from datetime import datetime
 from typing import Optional, List
 
+from src.models.files import IndexingStatus
+
 
 class FileUploadResponse(BaseModel):
     """Response schema for single file upload"""
@@ -21,10 +24,17 @@ class FileResponse(BaseModel):
 
 
 class FileListResponse(BaseModel):
-    """Response schema for listing files"""
+    """
+    Response schema for listing files (one keyset page).
+
+    `total` is the number of files the user has across all pages; pass
+    `next_cursor` back as `?cursor=` to fetch the next page.  `next_cursor`
+    is null on the last page.
+    """
     success: bool
     files: List[FileResponse]
     total: int
+    next_cursor: Optional[str] = None
 
 
 class MultipleFileUploadResponse(BaseModel):
@@ -36,6 +46,43 @@ class MultipleFileUploadResponse(BaseModel):
     total_failed: int
 
 
+class FileStatusResponse(BaseModel):
+    """Response schema for indexing status"""
+    file_id: str
+    file_name: str
+    indexing_status: IndexingStatus
+    indexing_error: Optional[str] = None
+
+
+class FileReindexResponse(BaseModel):
+    """
+    Response schema for POST /files/{file_id}/reindex.  `resume_from` is the
+    chunk the run will continue at if the file still splits the same way.
+    """
+    success: bool
+    file_id: str
+    resume_from: int
+    message: str
+
+
+class EmbeddingStatusResponse(BaseModel):
+    """
+    Response schema for GET /files/embedding-status: which embedding model
+    serves the user's queries and how far a migration to `target_model` is.
+    """
+    user_id: int
+    status: str
+    active_model: str
+    target_model: Optional[str] = None
+    total_files: int
+    migrated_files: int
+    migrated_chunks: int
+    chunks_per_sec: float
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    error: Optional[str] = None
+
+
 class FileDeleteResponse(BaseModel):
     """Response schema for file deletion"""
     success: bool
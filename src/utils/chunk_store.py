@@ -0,0 +1,185 @@
+"""
+Local, zstd-compressed chunk text store.
+
+With CHUNK_TEXT_STORE=local the vector store keeps only the vector and a
+compact row (pk, file_id and the small filterable metadata keys); chunk
+text and full metadata live here instead, one SQLite file per user:
+
+  CHUNK_STORE_DIR/user_{id}/chunks.sqlite
+      pk        TEXT PRIMARY KEY   — same pk as the vector-store row
+      file_id   TEXT               — indexed, for delete-by-file
+      text      BLOB               — zstd-compressed UTF-8
+      metadata  BLOB               — zstd-compressed JSON
+
+Search results then carry no text, and retrieval hydrates only the
+candidates that survive de-duplication (get_many, one batched lookup).
+
+CHUNK_TEXT_STORE=inline (default) keeps the previous behaviour: text and
+metadata stored as vector-store fields, nothing written here.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, Sequence, Tuple
+
+import zstandard
+from dotenv import load_dotenv
+from langchain_core.documents import Document
+
+from src.vectorstore.base import FILTERABLE_METADATA, collection_name, parse_collection_name
+
+load_dotenv()
+
+CHUNK_TEXT_STORE = os.getenv("CHUNK_TEXT_STORE", "inline").lower()
+CHUNK_STORE_DIR  = os.getenv("CHUNK_STORE_DIR", "./chunk_store")
+CHUNK_STORE_ZSTD_LEVEL = int(os.getenv("CHUNK_STORE_ZSTD_LEVEL", "3"))
+
+# Keys the vector store still keeps in local mode — enough to filter on.
+COMPACT_KEYS = ("pk", "file_id", *FILTERABLE_METADATA)
+
+# SQLite's default host-parameter limit is 999 on older builds.
+_LOOKUP_BATCH = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS chunks (
+    pk       TEXT PRIMARY KEY,
+    file_id  TEXT NOT NULL,
+    text     BLOB NOT NULL,
+    metadata BLOB NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS ix_chunks_file_id ON chunks (file_id);
+"""
+
+
+class ChunkTextStore:
+    """Batched put / get / delete of chunk text by pk, per user."""
+
+    def __init__(self, root: str = CHUNK_STORE_DIR, level: int = CHUNK_STORE_ZSTD_LEVEL) -> None:
+        self.root   = root
+        self.level  = level
+        # zstd (de)compressor objects are not thread-safe; keep one per thread.
+        self._local = threading.local()
+
+    # ── Helpers ──────────────────────────────────────────────────────────────
+
+    def _codec(self) -> Tuple[zstandard.ZstdCompressor, zstandard.ZstdDecompressor]:
+        codec = getattr(self._local, "codec", None)
+        if codec is None:
+            codec = (zstandard.ZstdCompressor(level=self.level), zstandard.ZstdDecompressor())
+            self._local.codec = codec
+        return codec
+
+    def _db(self, user_id: int, create: bool = False) -> sqlite3.Connection | None:
+        directory = os.path.join(self.root, collection_name(user_id))
+        path      = os.path.join(directory, "chunks.sqlite")
+        if not create and not os.path.exists(path):
+            return None
+        os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(_SCHEMA)
+        return conn
+
+    # ── API ──────────────────────────────────────────────────────────────────
+
+    def put_many(self, user_id: int, chunks: Sequence[Document]) -> int:
+        """Store chunks keyed by metadata["pk"] (insert or replace)."""
+        if not chunks:
+            return 0
+        compress = self._codec()[0].compress
+        rows = [
+            (
+                chunk.metadata["pk"],
+                chunk.metadata.get("file_id", ""),
+                compress(chunk.page_content.encode()),
+                compress(json.dumps(chunk.metadata).encode()),
+            )
+            for chunk in chunks
+        ]
+        conn = self._db(user_id, create=True)
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO chunks (pk, file_id, text, metadata) VALUES (?, ?, ?, ?)", rows,
+                )
+        finally:
+            conn.close()
+        return len(rows)
+
+    def get_many(self, user_id: int, pks: Iterable[str]) -> Dict[str, Document]:
+        """pk → Document for every pk found; unknown pks are simply absent."""
+        pks  = list(dict.fromkeys(pks))
+        conn = self._db(user_id) if pks else None
+        if conn is None:
+            return {}
+
+        decompress = self._codec()[1].decompress
+        found: Dict[str, Document] = {}
+        try:
+            for offset in range(0, len(pks), _LOOKUP_BATCH):
+                batch = pks[offset:offset + _LOOKUP_BATCH]
+                marks = ",".join("?" * len(batch))
+                for pk, text, metadata in conn.execute(
+                    f"SELECT pk, text, metadata FROM chunks WHERE pk IN ({marks})", batch,
+                ):
+                    found[pk] = Document(
+                        page_content=decompress(text).decode(),
+                        metadata=json.loads(decompress(metadata)),
+                    )
+        finally:
+            conn.close()
+        return found
+
+    def delete_by_file(self, user_id: int, file_id: str) -> int:
+        conn = self._db(user_id)
+        if conn is None:
+            return 0
+        try:
+            with conn:
+                return conn.execute("DELETE FROM chunks WHERE file_id = ?", (file_id,)).rowcount
+        finally:
+            conn.close()
+
+    # ── Reconciliation ───────────────────────────────────────────────────────
+
+    def list_users(self) -> List[int]:
+        """Users with a chunk store, as VectorStore.list_users."""
+        try:
+            with os.scandir(self.root) as entries:
+                parsed = [parse_collection_name(e.name) for e in entries if e.is_dir()]
+        except FileNotFoundError:
+            return []
+        return sorted({p[0] for p in parsed if p is not None})
+
+    def iter_file_ids(self, user_id: int, batch_size: int = 1000) -> Iterator[List[str]]:
+        """Distinct file_ids with stored text, `batch_size` at a time."""
+        conn = self._db(user_id)
+        if conn is None:
+            return
+        try:
+            cursor = conn.execute("SELECT DISTINCT file_id FROM chunks")
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield [r[0] for r in rows]
+        finally:
+            conn.close()
+
+
+def compact(chunks: Sequence[Document]) -> List[Document]:
+    """Text-less copies carrying only COMPACT_KEYS, for the vector store."""
+    return [
+        Document(page_content="", metadata={k: c.metadata[k] for k in COMPACT_KEYS if k in c.metadata})
+        for c in chunks
+    ]
+
+
+@lru_cache(maxsize=1)
+def get_chunk_store() -> ChunkTextStore:
+    return ChunkTextStore()
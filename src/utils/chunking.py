@@ -0,0 +1,188 @@
+"""
+Structure-aware chunking with parent / child chunks.
+
+CHUNKING_STRATEGY=structured (default)
+───────────────────────────────────────
+  Documents are loaded as Unstructured elements (Title, NarrativeText,
+  ListItem, Table, … with page numbers) and grouped into parent *sections*:
+
+    • a Title starts a new section; its text becomes the section heading
+    • a Table is always a section of its own and is never merged with prose
+    • a page change closes the section once it has PARENT_MIN_CHARS
+    • sections are capped at PARENT_MAX_CHARS (continuations keep the heading)
+
+  Each section is then cut into small *child* chunks (CHILD_CHUNK_SIZE,
+  no overlap — the parent supplies the surrounding context).  Only children
+  are embedded; sections are stored in Postgres (document_sections) and
+  fetched by id for the prompt.  Table children repeat the header row.
+
+  Inputs without element categories (e.g. plain text loaded as one
+  document) fall back to markdown headings, markdown tables and form-feed
+  page breaks.
+
+CHUNKING_STRATEGY=recursive
+───────────────────────────
+  The original RecursiveCharacterTextSplitter at 1000 / 150 — no sections.
+
+Users whose Milvus collection predates dynamic fields can't store the
+section keys in inline rows, so their uploads fall back to recursive (with
+a warning) — see rag._chunking_strategy.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+from dataclasses import dataclass
+from typing import List, Optional
+
+from dotenv import load_dotenv
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+load_dotenv()
+
+CHUNKING_STRATEGY = os.getenv("CHUNKING_STRATEGY", "structured").lower()
+CHILD_CHUNK_SIZE  = int(os.getenv("CHILD_CHUNK_SIZE", "400"))
+PARENT_MAX_CHARS  = int(os.getenv("PARENT_MAX_CHARS", "4000"))
+PARENT_MIN_CHARS  = int(os.getenv("PARENT_MIN_CHARS", "200"))
+
+_MD_HEADING = re.compile(r"^#{1,6}\s+\S")
+_BLOCK_SEP  = re.compile(r"\n\s*\n")
+
+
+@dataclass(slots=True)
+class Section:
+    idx:     int
+    text:    str
+    heading: Optional[str] = None
+    page:    Optional[int] = None
+    kind:    str = "text"          # "text" | "table"
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Elements → sections
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _is_markdown_table(block: str) -> bool:
+    lines = [line for line in block.splitlines() if line.strip()]
+    return len(lines) >= 2 and all(line.lstrip().startswith("|") for line in lines)
+
+
+def _pseudo_elements(doc: Document) -> List[Document]:
+    """Split an uncategorised document into Title / Table / NarrativeText blocks."""
+    elements = []
+    base     = doc.metadata.get("page_number")
+    for page_no, page in enumerate(doc.page_content.split("\f")):
+        for block in _BLOCK_SEP.split(page):
+            block = block.strip()
+            if not block:
+                continue
+            if "\n" not in block and _MD_HEADING.match(block):
+                category, block = "Title", block.lstrip("#").strip()
+            elif _is_markdown_table(block):
+                category = "Table"
+            else:
+                category = "NarrativeText"
+            elements.append(Document(
+                page_content=block,
+                metadata={"category": category, "page_number": (base or 1) + page_no},
+            ))
+    return elements
+
+
+def build_sections(elements: List[Document]) -> List[Section]:
+    """Group loader elements into heading-delimited parent sections."""
+    if elements and not any("category" in el.metadata for el in elements):
+        elements = [pe for el in elements for pe in _pseudo_elements(el)]
+
+    sections: List[Section] = []
+    buffer:   List[str]     = []
+    size      = 0
+    heading: Optional[str] = None
+    page:    Optional[int] = None
+
+    def flush() -> None:
+        nonlocal size
+        if buffer:
+            sections.append(Section(len(sections), "\n\n".join(buffer), heading, page))
+            buffer.clear()
+            size = 0
+
+    for element in elements:
+        category = element.metadata.get("category", "NarrativeText")
+        el_page  = element.metadata.get("page_number")
+        text     = element.page_content.strip()
+        if not text or category == "PageBreak":
+            continue
+
+        if category == "Table":
+            flush()
+            sections.append(Section(len(sections), text, heading, el_page, kind="table"))
+            continue
+
+        if category == "Title":
+            flush()
+            heading = text[:512]
+        elif el_page != page and size >= PARENT_MIN_CHARS:
+            flush()
+        elif size + len(text) > PARENT_MAX_CHARS:
+            flush()
+
+        if not buffer:
+            page = el_page
+        buffer.append(text)
+        size += len(text) + 2
+
+    flush()
+    return sections
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Sections → child chunks
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _table_children(text: str, size: int) -> List[str]:
+    """Split a table on row boundaries, repeating the header row."""
+    lines  = text.splitlines()
+    header = lines[0]
+    rows   = [line for line in lines[1:] if line.strip()]
+    if len(text) <= size or not rows:
+        return [text]
+
+    children, current = [], [header]
+    length = len(header)
+    for row in rows:
+        if length + len(row) > size and len(current) > 1:
+            children.append("\n".join(current))
+            current, length = [header], len(header)
+        current.append(row)
+        length += len(row) + 1
+    children.append("\n".join(current))
+    return children
+
+
+def split_children(sections: List[Section], chunk_size: int = CHILD_CHUNK_SIZE) -> List[Document]:
+    """Small, overlap-free child chunks pointing back at their section."""
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=0)
+    children = []
+    for section in sections:
+        if section.kind == "table":
+            texts = _table_children(section.text, chunk_size)
+        else:
+            texts = splitter.split_text(section.text)
+
+        for text in texts:
+            meta = {"section_idx": section.idx, "kind": section.kind}
+            if section.heading:
+                meta["heading"] = section.heading
+            if section.page is not None:
+                meta["page"] = section.page
+            children.append(Document(page_content=text, metadata=meta))
+    return children
+
+
+def recursive_chunks(docs: List[Document], chunk_size: int = 1000, chunk_overlap: int = 150) -> List[Document]:
+    """The original fixed-size splitter (CHUNKING_STRATEGY=recursive)."""
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    return splitter.split_documents(docs)
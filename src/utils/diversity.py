@@ -0,0 +1,107 @@
+"""
+Candidate diversification before re-ranking.
+
+Dense search over chunks split with overlap tends to return several copies
+of the same passage: neighbouring chunks of one file that share their
+150-character overlap, or boilerplate (headers, disclaimers) repeated across
+files.  Sending all of them to the CrossEncoder wastes reranker compute and,
+if they survive, prompt tokens.
+
+select_diverse() works on the candidate vectors the store already returned
+(search(..., with_vectors=True)) — one (n, d) matrix product, no extra
+model calls:
+
+  1. near-duplicates   cosine(a, b) >= DEDUP_THRESHOLD            → dropped
+  2. neighbours        same file_id, |chunk_idx| gap <= NEIGHBOUR_WINDOW
+                                                                   → dropped
+  3. MMR               greedy argmax of
+                         λ·sim(query, c) − (1−λ)·max sim(c, selected)
+                       with λ = MMR_LAMBDA, until MMR_K are chosen
+
+Candidates are only ever dropped in favour of a better-scoring one already
+selected, so the top dense hit always survives.
+"""
+
+from __future__ import annotations
+
+import os
+from typing import List, Sequence
+
+import numpy as np
+from dotenv import load_dotenv
+
+from src.vectorstore.base import SearchHit
+
+load_dotenv()
+
+MMR_LAMBDA       = float(os.getenv("MMR_LAMBDA", "0.7"))
+MMR_K            = int(os.getenv("MMR_K", "8"))
+DEDUP_THRESHOLD  = float(os.getenv("DEDUP_THRESHOLD", "0.95"))
+NEIGHBOUR_WINDOW = int(os.getenv("NEIGHBOUR_WINDOW", "1"))
+
+
+def _unit(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+
+def _neighbour_mask(hits: Sequence[SearchHit], window: int) -> np.ndarray:
+    """(n, n) bool — True where two hits are nearby chunks of the same file."""
+    n = len(hits)
+    if window <= 0:
+        return np.zeros((n, n), dtype=bool)
+
+    files   = [h.document.metadata.get("file_id") for h in hits]
+    _, code = np.unique(np.asarray(files, dtype=object).astype(str), return_inverse=True)
+    idx     = np.asarray([int(h.document.metadata.get("chunk_idx", -10**9)) for h in hits])
+
+    same_file = code[:, None] == code[None, :]
+    close     = np.abs(idx[:, None] - idx[None, :]) <= window
+    return same_file & close
+
+
+def select_diverse(
+    query_vector: Sequence[float],
+    hits: Sequence[SearchHit],
+    k: int = MMR_K,
+    lambda_mult: float = MMR_LAMBDA,
+    dedup_threshold: float = DEDUP_THRESHOLD,
+    neighbour_window: int = NEIGHBOUR_WINDOW,
+) -> List[SearchHit]:
+    """
+    Pick up to `k` mutually diverse hits, in selection order.
+
+    Hits without vectors can't be compared, so they are returned as-is
+    (truncated to k).
+    """
+    if len(hits) <= 1 or any(h.vector is None for h in hits):
+        return list(hits[:k])
+
+    vectors   = _unit(np.stack([np.asarray(h.vector, dtype=np.float32) for h in hits]))
+    query     = _unit(np.asarray(query_vector, dtype=np.float32))
+    relevance = vectors @ query
+    pairwise  = vectors @ vectors.T
+
+    # Pairs that must never both be selected.
+    blocking = (pairwise >= dedup_threshold) | _neighbour_mask(hits, neighbour_window)
+    np.fill_diagonal(blocking, False)
+
+    n         = len(hits)
+    available = np.ones(n, dtype=bool)
+    max_sim   = np.full(n, -np.inf, dtype=np.float32)
+    selected: List[int] = []
+
+    while len(selected) < k and available.any():
+        if selected:
+            score = lambda_mult * relevance - (1.0 - lambda_mult) * max_sim
+        else:
+            score = relevance.copy()
+        score[~available] = -np.inf
+        chosen = int(np.argmax(score))
+
+        selected.append(chosen)
+        available[chosen] = False
+        available &= ~blocking[chosen]
+        np.maximum(max_sim, pairwise[chosen], out=max_sim)
+
+    return [hits[i] for i in selected]
@@ -0,0 +1,170 @@
+"""
+Embedding models and the collection versions they write to.
+
+EMBEDDING_MODEL_NAME is the base model.  Its vectors live in the
+unversioned user_{id} collections, as they always have, so it must not be
+changed in place — every existing collection would silently stop matching
+its queries.  To move to another model, set EMBEDDING_MIGRATION_TARGET
+instead: that model writes to user_{id}__{version} (embedding_version()),
+and src/utils/reembed.py migrates users to it in the background.
+
+An EmbeddingSpace is a (model, collection version) pair.  Per user, the
+embedding_states table says which space is active and, while migrating,
+which one is the target:
+
+  active_space(user_id)    the space queries search — cached for
+                           EMBEDDING_STATE_TTL seconds per worker, so a
+                           switchover reaches every worker within that window
+  write_spaces(user_id)    the spaces indexing writes to (active, plus the
+                           target while migrating) — read fresh for every
+                           batch, so nothing indexed mid-migration misses
+                           the target collection
+  stored_versions(user_id) every version that may hold the user's chunks,
+                           including one retained after a switchover — used
+                           by deletes and reconciliation
+
+get_embeddings(model) loads each model once per process.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import xxhash
+from dotenv import load_dotenv
+from langchain_huggingface import HuggingFaceEmbeddings
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_MODEL_NAME       = os.getenv("EMBEDDING_MODEL_NAME", "sentence-transformers/all-MiniLM-L6-v2")
+EMBEDDING_MIGRATION_TARGET = os.getenv("EMBEDDING_MIGRATION_TARGET", "").strip()
+EMBEDDING_STATE_TTL        = float(os.getenv("EMBEDDING_STATE_TTL", "5"))
+
+# Bound on cached active spaces per worker; the cache is simply cleared
+# when it fills up.
+_MAX_CACHED = 10_000
+
+
+@dataclass(frozen=True, slots=True)
+class EmbeddingSpace:
+    model:   str
+    version: str
+
+
+def embedding_version(model: str) -> str:
+    """
+    Collection suffix for `model`: "" for the base model, otherwise a slug
+    of the model name plus a short hash (two orgs' "bge-small" differ).
+    """
+    if model == EMBEDDING_MODEL_NAME:
+        return ""
+    slug = re.sub(r"[^0-9a-z]+", "_", model.rsplit("/", 1)[-1].lower()).strip("_")[:40]
+    return f"{slug}_{xxhash.xxh3_64_hexdigest(model.encode())[:8]}"
+
+
+BASE_SPACE = EmbeddingSpace(EMBEDDING_MODEL_NAME, "")
+# The base model is a valid target too: that rolls users back to user_{id}.
+TARGET_SPACE: Optional[EmbeddingSpace] = (
+    EmbeddingSpace(EMBEDDING_MIGRATION_TARGET, embedding_version(EMBEDDING_MIGRATION_TARGET))
+    if EMBEDDING_MIGRATION_TARGET
+    else None
+)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Models
+# ─────────────────────────────────────────────────────────────────────────────
+
+_models: Dict[str, HuggingFaceEmbeddings] = {}
+_models_lock = threading.Lock()
+
+
+def get_embeddings(model: str) -> HuggingFaceEmbeddings:
+    """The process-wide embedder for `model`, loaded on first use."""
+    embedder = _models.get(model)
+    if embedder is None:
+        with _models_lock:
+            embedder = _models.get(model)
+            if embedder is None:
+                logger.info("Loading embedding model '%s'", model)
+                # Unit-normalised so every vector-store backend can treat
+                # scores as cosine.
+                embedder = HuggingFaceEmbeddings(
+                    model_name=model,
+                    encode_kwargs={"normalize_embeddings": True},
+                )
+                _models[model] = embedder
+    return embedder
+
+
+def embedding_dimension(model: str) -> int:
+    return get_embeddings(model).client.get_sentence_embedding_dimension()
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Per-user state
+# ─────────────────────────────────────────────────────────────────────────────
+
+# user_id → (expires at, active space)
+_active_cache: Dict[int, Tuple[float, EmbeddingSpace]] = {}
+
+
+async def _load_state(user_id: int):
+    from src.database.config import AsyncSessionLocal
+    from src.models.embedding import EmbeddingState
+
+    async with AsyncSessionLocal() as db:
+        return await db.get(EmbeddingState, user_id)
+
+
+async def active_space(user_id: int) -> EmbeddingSpace:
+    """The space the user's queries are embedded with and searched in."""
+    now    = time.monotonic()
+    cached = _active_cache.get(user_id)
+    if cached is not None and cached[0] > now:
+        return cached[1]
+
+    state = await _load_state(user_id)
+    space = EmbeddingSpace(state.active_model, state.active_version) if state else BASE_SPACE
+    if len(_active_cache) >= _MAX_CACHED:
+        _active_cache.clear()
+    _active_cache[user_id] = (now + EMBEDDING_STATE_TTL, space)
+    return space
+
+
+def invalidate(user_id: int) -> None:
+    """Forget this worker's cached active space (after a switchover)."""
+    _active_cache.pop(user_id, None)
+
+
+async def write_spaces(user_id: int) -> List[EmbeddingSpace]:
+    """Active space first, then the migration target if there is one."""
+    from src.models.embedding import EmbeddingStatus
+
+    state = await _load_state(user_id)
+    if state is None:
+        return [BASE_SPACE]
+    spaces = [EmbeddingSpace(state.active_model, state.active_version)]
+    if state.status == EmbeddingStatus.MIGRATING and state.target_model:
+        spaces.append(EmbeddingSpace(state.target_model, state.target_version or ""))
+    return spaces
+
+
+async def stored_versions(user_id: int) -> List[str]:
+    """Every collection version that may hold the user's chunks, active first."""
+    state = await _load_state(user_id)
+    if state is None:
+        return [""]
+    versions = [state.active_version]
+    for version in (state.target_version, state.previous_version):
+        if version is not None and version not in versions:
+            versions.append(version)
+    return versions
@@ -0,0 +1,180 @@
+"""
+Graceful shutdown / drain.
+
+Rolling restarts send the worker SIGTERM.  From that moment:
+
+  1. draining      drain_middleware answers new requests with 503 +
+                   Retry-After + Connection: close, so the load balancer /
+                   client retries them on another worker.  /metrics keeps
+                   answering.
+  2. streams       SSE responses wrapped in track_stream() keep going until
+                   STREAM_DRAIN_SECONDS after the signal; a stream still
+                   running then ends cleanly with an `error` event
+                   ({"detail", "retry_after"}) followed by `done`, instead
+                   of a cut connection.  Run uvicorn with
+                   --timeout-graceful-shutdown above STREAM_DRAIN_SECONDS.
+  3. indexing      jobs started with spawn_indexing() are not tied to a
+                   request.  The lifespan shutdown waits up to
+                   INDEX_DRAIN_SECONDS for them, then cancels the rest;
+                   index_file_task puts a cancelled file back to PENDING
+                   and the next worker to start picks it up again
+                   (requeue_pending_files in src/routers/files.py).
+
+SIGTERM / SIGINT handlers are chained in front of the server's own, so
+draining starts the moment the signal arrives rather than after the
+server has already stopped accepting connections.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import signal
+import time
+from typing import AsyncIterator, Coroutine, Dict, Optional
+
+from dotenv import load_dotenv
+from fastapi.responses import JSONResponse
+
+from src.utils.sse import DONE, ERROR, StreamEvent
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+STREAM_DRAIN_SECONDS = float(os.getenv("STREAM_DRAIN_SECONDS", "25"))
+INDEX_DRAIN_SECONDS  = float(os.getenv("INDEX_DRAIN_SECONDS", "20"))
+
+# Paths still served while draining.
+_ALWAYS_SERVED = {"/metrics"}
+
+# How often a stream waiting on its next event checks whether draining began.
+_DRAIN_POLL_SECONDS = 0.5
+
+
+class Lifecycle:
+    """Process-wide drain flag plus the work that has to finish before exit."""
+
+    def __init__(self) -> None:
+        self.draining       = False
+        self.drain_started: Optional[float] = None
+        self.active_streams = 0
+        self._indexing: Dict[str, asyncio.Task] = {}
+
+    # ── Draining ─────────────────────────────────────────────────────────────
+
+    def begin_drain(self) -> None:
+        """Idempotent; safe to call from a signal handler."""
+        if not self.draining:
+            self.draining      = True
+            self.drain_started = time.monotonic()
+            logger.info(
+                "Draining: %d stream(s) and %d indexing job(s) in flight",
+                self.active_streams, len(self._indexing),
+            )
+
+    def stream_deadline_passed(self) -> bool:
+        return (
+            self.drain_started is not None
+            and time.monotonic() - self.drain_started >= STREAM_DRAIN_SECONDS
+        )
+
+    def _stream_wait(self) -> float:
+        """How long a stream may wait for its next event before re-checking."""
+        if self.drain_started is None:
+            return _DRAIN_POLL_SECONDS
+        return max(0.0, self.drain_started + STREAM_DRAIN_SECONDS - time.monotonic())
+
+    def install_signal_handlers(self) -> None:
+        """Start draining on SIGTERM / SIGINT, then defer to the previous handler."""
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            try:
+                previous = signal.getsignal(sig)
+
+                def handler(signum, frame, previous=previous):
+                    self.begin_drain()
+                    if callable(previous):
+                        previous(signum, frame)
+
+                signal.signal(sig, handler)
+            except ValueError:
+                # Not the main thread (e.g. TestClient) — lifespan shutdown still drains.
+                return
+
+    # ── Streams ──────────────────────────────────────────────────────────────
+
+    async def track_stream(self, events: AsyncIterator[StreamEvent]) -> AsyncIterator[StreamEvent]:
+        """
+        Count an SSE stream as in flight; end it in-band at the drain deadline.
+
+        Each next event is awaited as a task raced against the deadline, so a
+        stream stuck waiting (a slow LLM, a queued retrieval) is still ended
+        on time rather than whenever it next yields.
+        """
+        self.active_streams += 1
+        iterator = events.__aiter__()
+        pending: Optional[asyncio.Future] = None
+        try:
+            while True:
+                pending = asyncio.ensure_future(iterator.__anext__())
+                while not pending.done() and not self.stream_deadline_passed():
+                    await asyncio.wait({pending}, timeout=self._stream_wait())
+                if self.stream_deadline_passed():
+                    yield StreamEvent(ERROR, {"detail": "Server is restarting, please retry", "retry_after": 1})
+                    yield StreamEvent(DONE, "[DONE]")
+                    return
+                try:
+                    event = pending.result()
+                except StopAsyncIteration:
+                    return
+                yield event
+        finally:
+            self.active_streams -= 1
+            if pending is not None and not pending.done():
+                pending.cancel()
+                await asyncio.gather(pending, return_exceptions=True)
+            aclose = getattr(events, "aclose", None)
+            if aclose is not None:
+                await aclose()
+
+    async def wait_for_streams(self) -> None:
+        deadline = (self.drain_started or time.monotonic()) + STREAM_DRAIN_SECONDS + 1
+        while self.active_streams and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+
+    # ── Indexing jobs ────────────────────────────────────────────────────────
+
+    def spawn_indexing(self, file_id: str, job: Coroutine) -> None:
+        """Run an indexing job outside the request, tracked for shutdown."""
+        if file_id in self._indexing:
+            job.close()
+            return
+        task = asyncio.create_task(job, name=f"index:{file_id}")
+        self._indexing[file_id] = task
+        task.add_done_callback(lambda _: self._indexing.pop(file_id, None))
+
+    async def drain_indexing(self) -> None:
+        tasks = list(self._indexing.values())
+        if not tasks:
+            return
+        _, pending = await asyncio.wait(tasks, timeout=INDEX_DRAIN_SECONDS)
+        for task in pending:
+            task.cancel()
+        if pending:
+            logger.info("Requeued %d unfinished indexing job(s)", len(pending))
+            await asyncio.gather(*pending, return_exceptions=True)
+
+
+lifecycle = Lifecycle()
+
+
+async def drain_middleware(request, call_next):
+    """Refuse new work once draining so clients retry on another worker."""
+    if lifecycle.draining and request.url.path not in _ALWAYS_SERVED:
+        return JSONResponse(
+            status_code=503,
+            content={"detail": "Server is restarting, please retry"},
+            headers={"Retry-After": "1", "Connection": "close"},
+        )
+    return await call_next(request)
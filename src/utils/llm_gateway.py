@@ -0,0 +1,330 @@
+"""
+LLM gateway.
+
+Every call to the LLM provider goes through one LLMGateway, which owns:
+
+  • a shared keep-alive httpx connection pool (sync + async clients) handed
+    to ChatGroq, with explicit connect/read timeouts
+  • a token-bucket limiter sized to the provider's requests-per-minute quota
+  • a cap on concurrent in-flight requests
+  • retries with full-jitter exponential backoff on 429 / 5xx / connection
+    errors, honouring Retry-After
+  • a per-request deadline covering queueing, retries and (for
+    non-streaming calls) generation; for streams it bounds time-to-first-token
+
+When the limiter or the concurrency cap can't admit a request before its
+deadline, the gateway fails fast with LLMRateLimitedError instead of letting
+requests pile up — routers turn that into 429 + Retry-After.
+
+Point GROQ_BASE_URL at benchmarks/fake_llm.py to exercise all of this
+offline.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import random
+import time
+from typing import AsyncIterator, Dict, Optional
+
+import httpx
+from dotenv import load_dotenv
+from langchain_groq import ChatGroq
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# ── Configuration ─────────────────────────────────────────────────────────────
+GROQ_BASE_URL          = os.getenv("GROQ_BASE_URL", "https://api.groq.com")
+LLM_MAX_CONNECTIONS    = int(os.getenv("LLM_MAX_CONNECTIONS", "32"))
+LLM_MAX_KEEPALIVE      = int(os.getenv("LLM_MAX_KEEPALIVE", "16"))
+LLM_KEEPALIVE_SECONDS  = float(os.getenv("LLM_KEEPALIVE_SECONDS", "30"))
+LLM_CONNECT_TIMEOUT    = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+LLM_READ_TIMEOUT       = float(os.getenv("LLM_READ_TIMEOUT", "60"))
+LLM_REQUESTS_PER_MIN   = float(os.getenv("LLM_REQUESTS_PER_MIN", "30"))
+LLM_BURST              = int(os.getenv("LLM_BURST", "5"))
+LLM_MAX_CONCURRENCY    = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_MAX_RETRIES        = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_BACKOFF_BASE       = float(os.getenv("LLM_BACKOFF_BASE", "0.5"))
+LLM_BACKOFF_MAX        = float(os.getenv("LLM_BACKOFF_MAX", "8"))
+LLM_DEADLINE_SECONDS   = float(os.getenv("LLM_DEADLINE_SECONDS", "60"))
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Errors
+# ─────────────────────────────────────────────────────────────────────────────
+
+class LLMError(Exception):
+    """Base class for failures surfaced by the gateway."""
+
+
+class LLMRateLimitedError(LLMError):
+    """Local quota or provider 429 — the caller should retry after `retry_after` s."""
+
+    def __init__(self, message: str, retry_after: float) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class LLMTimeoutError(LLMError):
+    """The per-request deadline expired."""
+
+
+class LLMUnavailableError(LLMError):
+    """The provider kept failing after all retries (5xx / connection errors)."""
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Token bucket
+# ─────────────────────────────────────────────────────────────────────────────
+
+class TokenBucket:
+    """
+    Async token bucket.  A caller reserves its token up front — the bucket
+    may go negative — and then sleeps until that token would have been
+    refilled, so waiters are served FIFO without holding anything while
+    they sleep, and one that can't be served before its own deadline fails
+    at once.  A provider 429 can push the bucket into debt so every caller
+    backs off, not just the one that was rejected.
+    """
+
+    def __init__(self, rate_per_sec: float, capacity: int) -> None:
+        self.rate      = rate_per_sec
+        self.capacity  = capacity
+        self._tokens   = float(capacity)
+        self._updated  = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens  = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, deadline: float) -> None:
+        """Take one token, waiting at most until `deadline` (time.monotonic())."""
+        # No await between the check and the reservation: atomic on the loop.
+        self._refill()
+        wait = max(0.0, (1 - self._tokens) / self.rate)
+        if time.monotonic() + wait > deadline:
+            raise LLMRateLimitedError("LLM request quota exhausted", retry_after=wait)
+        self._tokens -= 1
+        if wait:
+            try:
+                await asyncio.sleep(wait)
+            except asyncio.CancelledError:
+                # Give the reservation back so later callers don't wait for it.
+                self._refill()
+                self._tokens = min(self.capacity, self._tokens + 1)
+                raise
+
+    def penalize(self, seconds: float) -> None:
+        """Provider said 'retry after N s' — make everyone wait that long."""
+        self._refill()
+        self._tokens = min(self._tokens, -seconds * self.rate)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Gateway
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _status_code(exc: BaseException) -> Optional[int]:
+    status = getattr(exc, "status_code", None)
+    if status is None and isinstance(exc, httpx.HTTPStatusError):
+        status = exc.response.status_code
+    return status
+
+
+def _retry_after(exc: BaseException) -> Optional[float]:
+    response = getattr(exc, "response", None)
+    headers  = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def _is_retryable(exc: BaseException) -> bool:
+    status = _status_code(exc)
+    if status is not None:
+        return status == 429 or status >= 500
+    # groq.APIConnectionError / APITimeoutError and raw httpx transport errors
+    return isinstance(exc, httpx.TransportError) or type(exc).__name__ in {
+        "APIConnectionError", "APITimeoutError",
+    }
+
+
+class LLMGateway:
+    def __init__(
+        self,
+        model: str,
+        temperature: float = 0.7,
+        base_url: str = GROQ_BASE_URL,
+        requests_per_min: float = LLM_REQUESTS_PER_MIN,
+        burst: int = LLM_BURST,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        max_retries: int = LLM_MAX_RETRIES,
+        deadline_seconds: float = LLM_DEADLINE_SECONDS,
+    ) -> None:
+        self.base_url         = base_url
+        self.max_retries      = max_retries
+        self.deadline_seconds = deadline_seconds
+
+        limits  = httpx.Limits(
+            max_connections=LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=LLM_MAX_KEEPALIVE,
+            keepalive_expiry=LLM_KEEPALIVE_SECONDS,
+        )
+        timeout = httpx.Timeout(LLM_READ_TIMEOUT, connect=LLM_CONNECT_TIMEOUT)
+        self.http_client       = httpx.Client(limits=limits, timeout=timeout)
+        self.http_async_client = httpx.AsyncClient(limits=limits, timeout=timeout)
+
+        self.llm = ChatGroq(
+            model=model,
+            temperature=temperature,
+            base_url=base_url,
+            http_client=self.http_client,
+            http_async_client=self.http_async_client,
+            max_retries=0,      # retries are ours, so they share the limiter
+        )
+
+        self._bucket    = TokenBucket(requests_per_min / 60.0, burst)
+        self._slots     = asyncio.Semaphore(max_concurrency)
+        self._last_used = 0.0
+        self.stats: Dict[str, int] = {
+            "requests": 0, "retries": 0, "rate_limited": 0, "timeouts": 0, "failures": 0,
+        }
+
+    # ── Admission ────────────────────────────────────────────────────────────
+
+    def _deadline(self, deadline_seconds: Optional[float]) -> float:
+        return time.monotonic() + (deadline_seconds or self.deadline_seconds)
+
+    async def _admit(self, deadline: float) -> None:
+        """Wait for a rate token and a concurrency slot, both before `deadline`."""
+        try:
+            await self._bucket.acquire(deadline)
+        except LLMRateLimitedError:
+            self.stats["rate_limited"] += 1
+            raise
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=max(0.0, deadline - time.monotonic()))
+        except asyncio.TimeoutError:
+            self.stats["rate_limited"] += 1
+            raise LLMRateLimitedError("Too many concurrent LLM requests", retry_after=1.0)
+
+    def _backoff(self, attempt: int, exc: BaseException, deadline: float) -> float:
+        """
+        Full-jitter exponential backoff, never shorter than the provider's
+        Retry-After.  Raises if the wait would overrun the deadline.
+        """
+        delay       = random.uniform(0, min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * 2 ** attempt))
+        retry_after = _retry_after(exc)
+        if _status_code(exc) == 429 and retry_after:
+            self._bucket.penalize(retry_after)
+            delay = max(delay, retry_after)
+
+        if time.monotonic() + delay > deadline:
+            if _status_code(exc) == 429:
+                self.stats["rate_limited"] += 1
+                raise LLMRateLimitedError("LLM provider rate limit", retry_after=retry_after or delay) from exc
+            self.stats["failures"] += 1
+            raise LLMUnavailableError(f"LLM provider unavailable: {exc}") from exc
+
+        self.stats["retries"] += 1
+        logger.warning("LLM call failed (%s); retry %d in %.2fs", exc, attempt + 1, delay)
+        return delay
+
+    def _give_up(self, exc: BaseException) -> LLMError:
+        self.stats["failures"] += 1
+        if _status_code(exc) == 429:
+            return LLMRateLimitedError("LLM provider rate limit", retry_after=_retry_after(exc) or 1.0)
+        return LLMUnavailableError(f"LLM provider error: {exc}")
+
+    # ── Calls ────────────────────────────────────────────────────────────────
+
+    async def ainvoke(self, prompt: str, deadline_seconds: Optional[float] = None) -> str:
+        """Non-streaming completion, bounded end-to-end by the deadline."""
+        deadline = self._deadline(deadline_seconds)
+        self.stats["requests"] += 1
+
+        for attempt in range(self.max_retries + 1):
+            await self._admit(deadline)
+            try:
+                async with asyncio.timeout(max(0.0, deadline - time.monotonic())):
+                    response = await self.llm.ainvoke(prompt)
+                self._last_used = time.monotonic()
+                return response.content
+            except TimeoutError:
+                self.stats["timeouts"] += 1
+                raise LLMTimeoutError("LLM request deadline exceeded")
+            except Exception as exc:
+                if not _is_retryable(exc) or attempt == self.max_retries:
+                    raise self._give_up(exc) from exc
+                delay = self._backoff(attempt, exc, deadline)
+            finally:
+                self._slots.release()
+            await asyncio.sleep(delay)
+
+        raise AssertionError("unreachable")  # pragma: no cover
+
+    async def astream(self, prompt: str, deadline_seconds: Optional[float] = None) -> AsyncIterator[str]:
+        """
+        Streaming completion yielding text tokens.  Failures before the
+        first token are retried; once tokens have been yielded a failure
+        propagates, since the caller has already forwarded partial output.
+        """
+        deadline = self._deadline(deadline_seconds)
+        self.stats["requests"] += 1
+
+        for attempt in range(self.max_retries + 1):
+            await self._admit(deadline)
+            started = False
+            try:
+                stream = self.llm.astream(prompt).__aiter__()
+                try:
+                    async with asyncio.timeout(max(0.0, deadline - time.monotonic())):
+                        first = await anext(stream)
+                        while not first.content:
+                            first = await anext(stream)
+                except StopAsyncIteration:
+                    return
+                except TimeoutError:
+                    self.stats["timeouts"] += 1
+                    raise LLMTimeoutError("LLM time-to-first-token deadline exceeded")
+
+                started = True
+                yield first.content
+                async for chunk in stream:
+                    if chunk.content:
+                        yield chunk.content
+                self._last_used = time.monotonic()
+                return
+            except LLMError:
+                raise
+            except Exception as exc:
+                if started or not _is_retryable(exc) or attempt == self.max_retries:
+                    raise self._give_up(exc) from exc
+                delay = self._backoff(attempt, exc, deadline)
+            finally:
+                self._slots.release()
+            await asyncio.sleep(delay)
+
+    async def warm(self) -> None:
+        """
+        Open a keep-alive connection to the provider so DNS, TCP and TLS are
+        done before the prompt is ready.  Skipped while the pool is known to
+        be warm; failures are ignored.
+        """
+        if time.monotonic() - self._last_used < LLM_KEEPALIVE_SECONDS:
+            return
+        try:
+            await self.http_async_client.head(self.base_url, timeout=LLM_CONNECT_TIMEOUT)
+            self._last_used = time.monotonic()
+        except Exception as exc:
+            logger.debug("LLM warm-up failed (ignored): %s", exc)
+
+    async def aclose(self) -> None:
+        await self.http_async_client.aclose()
+        self.http_client.close()
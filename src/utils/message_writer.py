@@ -0,0 +1,205 @@
+"""
+Batched, off-the-response-path chat-message persistence.
+
+Session endpoints hand both turns of an exchange to `message_writer.submit`
+and return (or send `done`) immediately.  One background task drains the
+queue and writes everything that accumulated — across requests and
+sessions — as a single multi-row INSERT per flush, in one transaction that
+also bumps the sessions' updated_at.
+
+  flush when MESSAGE_BATCH_SIZE rows are queued, or MESSAGE_FLUSH_MS after
+  the first queued row, whichever comes first
+
+Read-your-writes
+────────────────
+Rows stay visible through `pending(session_id)` until their transaction
+commits.  `_load_history` snapshots them *before* its DB read and merges
+with merge_history(), which drops any that committed in between (same
+role, content and created_at), so a turn is never missing or doubled —
+without a lock: history reads never wait on a batch commit, and the writer
+never holds anything while it waits for a pooled connection.  This holds
+within one worker process — a follow-up query that lands on another worker
+within the flush window may miss the last turn.
+
+Durability
+──────────
+`stop()` (application shutdown) drains the queue and flushes everything.
+A failing batch is retried; if it still fails it is split per session so
+one bad session (e.g. deleted meanwhile) can't lose the others' messages.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from sqlalchemy import insert, update
+
+from src.database.config import AsyncSessionLocal
+from src.models.chat import ChatMessage, ChatSession, MessageRole
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+MESSAGE_BATCH_SIZE = int(os.getenv("MESSAGE_BATCH_SIZE", "200"))
+MESSAGE_FLUSH_MS   = float(os.getenv("MESSAGE_FLUSH_MS", "50"))
+MESSAGE_QUEUE_SIZE = int(os.getenv("MESSAGE_QUEUE_SIZE", "10000"))
+MESSAGE_RETRIES    = 3
+
+_STOP = object()
+
+
+class MessageWriter:
+    """Single background task that batches ChatMessage inserts."""
+
+    def __init__(self) -> None:
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=MESSAGE_QUEUE_SIZE)
+        # session_id → rows submitted but not yet committed (in order)
+        self._pending: Dict[int, List[dict]] = defaultdict(list)
+        self._task: Optional[asyncio.Task] = None
+
+    # ── Producer side ────────────────────────────────────────────────────────
+
+    async def submit(self, session_id: int, question: str, answer: str) -> None:
+        """Queue one exchange (user + assistant turn).  Waits only if the queue is full."""
+        now  = datetime.now(timezone.utc)
+        rows = [
+            {"session_id": session_id, "role": MessageRole.USER,      "content": question, "created_at": now},
+            {"session_id": session_id, "role": MessageRole.ASSISTANT, "content": answer,   "created_at": now},
+        ]
+        self._pending[session_id].extend(rows)
+        for row in rows:
+            await self._queue.put(row)
+
+    def pending(self, session_id: int) -> List[dict]:
+        """
+        Rows for `session_id` not committed yet.  Take this snapshot before
+        reading the table, then combine the two with merge_history().
+        """
+        return list(self._pending.get(session_id, ()))
+
+    def discard(self, session_id: int) -> None:
+        """Forget queued rows of a deleted session; the flush skips them."""
+        self._pending.pop(session_id, None)
+
+    # ── Lifecycle ────────────────────────────────────────────────────────────
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Let the writer finish what is queued, then flush anything still pending."""
+        if self._task is not None:
+            await self._queue.put(_STOP)
+            await self._task
+            self._task = None
+
+        leftover = [row for rows in list(self._pending.values()) for row in rows]
+        if leftover:
+            await self._flush(leftover)
+        logger.info("Message writer stopped (%d late row(s) flushed)", len(leftover))
+
+    # ── Consumer side ────────────────────────────────────────────────────────
+
+    async def _collect(self) -> List[dict]:
+        batch    = [await self._queue.get()]
+        deadline = asyncio.get_running_loop().time() + MESSAGE_FLUSH_MS / 1000
+        while len(batch) < MESSAGE_BATCH_SIZE:
+            remaining = deadline - asyncio.get_running_loop().time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self) -> None:
+        while True:
+            batch    = await self._collect()
+            stopping = _STOP in batch
+            await self._flush([row for row in batch if row is not _STOP])
+            if stopping:
+                return
+
+    async def _write(self, rows: List[dict]) -> None:
+        session_ids = {row["session_id"] for row in rows}
+        async with AsyncSessionLocal() as db:
+            await db.execute(insert(ChatMessage).values(rows))
+            await db.execute(
+                update(ChatSession)
+                .where(ChatSession.id.in_(session_ids))
+                .values(updated_at=max(row["created_at"] for row in rows))
+            )
+            await db.commit()
+        self._forget(rows)
+
+    def _forget(self, rows: List[dict]) -> None:
+        for row in rows:
+            pending = self._pending.get(row["session_id"])
+            if pending is None:
+                continue
+            try:
+                pending.remove(row)
+            except ValueError:
+                pass
+            if not pending:
+                del self._pending[row["session_id"]]
+
+    async def _flush(self, batch: List[dict]) -> None:
+        rows = [row for row in batch if row in self._pending.get(row["session_id"], ())]
+        if not rows:
+            return
+
+        for attempt in range(1, MESSAGE_RETRIES + 1):
+            try:
+                await self._write(rows)
+                return
+            except Exception as exc:
+                logger.warning("Message batch of %d row(s) failed (attempt %d): %s", len(rows), attempt, exc)
+                await asyncio.sleep(0.1 * 2 ** attempt)
+
+        # Isolate the failure: write each session's rows on their own.
+        by_session: Dict[int, List[dict]] = defaultdict(list)
+        for row in rows:
+            by_session[row["session_id"]].append(row)
+        for session_id, session_rows in by_session.items():
+            try:
+                await self._write(session_rows)
+            except Exception:
+                logger.exception("Dropping %d message(s) for session_id=%s", len(session_rows), session_id)
+                self._forget(session_rows)
+
+
+def _utc(value: datetime) -> datetime:
+    # SQLite hands back naive datetimes.
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+def merge_history(
+    stored: Iterable[Tuple[MessageRole, str, datetime]],
+    pending: List[dict],
+) -> List[dict]:
+    """
+    Oldest-first turns from committed rows (role, content, created_at) plus
+    a pending() snapshot taken before they were read.  A pending row that
+    committed meanwhile may be in both; it is kept once.
+    """
+    turns = [{"role": role.value, "content": content} for role, content, _ in stored]
+    seen  = {(role, content, _utc(created_at)) for role, content, created_at in stored}
+    turns.extend(
+        {"role": row["role"].value, "content": row["content"]}
+        for row in pending
+        if (row["role"], row["content"], _utc(row["created_at"])) not in seen
+    )
+    return turns
+
+
+message_writer = MessageWriter()
@@ -0,0 +1,135 @@
+"""
+Keyset (cursor) pagination helpers.
+
+List endpoints never use OFFSET — the cost of OFFSET grows with the page
+number.  Instead each page is fetched with a `WHERE <sort key> < <last key>`
+predicate that is served directly by a composite index, so page 1 and
+page 10 000 cost the same.
+
+Cursors are opaque to clients: a URL-safe base64 encoding of the sort key of
+the last row on the previous page.
+
+Sort keys and their matching indexes
+────────────────────────────────────
+  files          (user_id, id)               newest first
+  chat_sessions  (user_id, updated_at, id)   most recently active first
+  chat_messages  (session_id, id)            chronological
+"""
+
+import base64
+import json
+import os
+from datetime import datetime
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+from dotenv import load_dotenv
+from fastapi import HTTPException, status
+from sqlalchemy import Select, func, select, tuple_
+
+from src.models.chat import ChatMessage, ChatSession
+from src.models.files import FileInputModel
+
+load_dotenv()
+
+DEFAULT_PAGE_SIZE = int(os.getenv("DEFAULT_PAGE_SIZE", "50"))
+MAX_PAGE_SIZE     = int(os.getenv("MAX_PAGE_SIZE", "200"))
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Cursor encoding
+# ─────────────────────────────────────────────────────────────────────────────
+
+def encode_cursor(*values: Any) -> str:
+    """Pack a sort key into an opaque, URL-safe cursor string."""
+    payload = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    raw     = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, *types: type) -> Tuple:
+    """
+    Unpack a cursor produced by encode_cursor(), coercing each element to
+    the matching entry in `types`.  Raises 400 on anything malformed.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded))
+        if not isinstance(values, list) or len(values) != len(types):
+            raise ValueError("wrong arity")
+        return tuple(
+            datetime.fromisoformat(v) if t is datetime else t(v)
+            for t, v in zip(types, values)
+        )
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor",
+        )
+
+
+def split_page(
+    rows: Sequence,
+    limit: int,
+    key: Callable[[Any], Tuple],
+) -> Tuple[List, Optional[str]]:
+    """
+    Statements below fetch `limit + 1` rows; the extra row only tells us
+    whether another page exists.  Returns (page_rows, next_cursor).
+    """
+    page = list(rows[:limit])
+    if len(rows) <= limit or not page:
+        return page, None
+    return page, encode_cursor(*key(page[-1]))
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Statement builders
+# ─────────────────────────────────────────────────────────────────────────────
+
+def files_page_stmt(user_id: int, cursor: Optional[str], limit: int) -> Select:
+    """A user's files, newest first.  Uses ix_files_user_id_id."""
+    stmt = select(FileInputModel).where(FileInputModel.user_id == user_id)
+    if cursor:
+        (last_id,) = decode_cursor(cursor, int)
+        stmt = stmt.where(FileInputModel.id < last_id)
+    return stmt.order_by(FileInputModel.id.desc()).limit(limit + 1)
+
+
+def files_count_stmt(user_id: int) -> Select:
+    """Total number of a user's files.  Counted off ix_files_user_id_id."""
+    return select(func.count(FileInputModel.id)).where(FileInputModel.user_id == user_id)
+
+
+def file_key(file: FileInputModel) -> Tuple:
+    return (file.id,)
+
+
+def sessions_page_stmt(user_id: int, cursor: Optional[str], limit: int) -> Select:
+    """A user's sessions, most recently updated first.  Uses ix_chat_sessions_user_updated."""
+    stmt = select(ChatSession).where(ChatSession.user_id == user_id)
+    if cursor:
+        last_updated, last_id = decode_cursor(cursor, datetime, int)
+        stmt = stmt.where(
+            tuple_(ChatSession.updated_at, ChatSession.id) < tuple_(last_updated, last_id)
+        )
+    return (
+        stmt.order_by(ChatSession.updated_at.desc(), ChatSession.id.desc())
+        .limit(limit + 1)
+    )
+
+
+def session_key(session: ChatSession) -> Tuple:
+    return (session.updated_at, session.id)
+
+
+def messages_page_stmt(session_id: int, cursor: Optional[str], limit: int) -> Select:
+    """Messages of one session in chronological order.  Uses ix_chat_messages_session_id_id."""
+    stmt = select(ChatMessage).where(ChatMessage.session_id == session_id)
+    if cursor:
+        (last_id,) = decode_cursor(cursor, int)
+        stmt = stmt.where(ChatMessage.id > last_id)
+    return stmt.order_by(ChatMessage.id).limit(limit + 1)
+
+
+def message_key(message: ChatMessage) -> Tuple:
+    return (message.id,)
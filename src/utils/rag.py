@@ -3,7 +3,8 @@ RAG utility layer.
 
 High-priority features already present
 ───────────────────────────────────────
-  Features 1 & 2  Per-user Milvus collections  (user_{id})
+  Features 1 & 2  Per-user collections         (user_{id}) in the vector store
+                  selected by VECTOR_BACKEND — see src/vectorstore/
   Feature  3      Conversation memory          (chat_history param)
   Feature  4      Cross-encoder re-ranking
   Feature  5      Async indexing-status updates
@@ -11,150 +12,313 @@ High-priority features already present
 Medium-priority additions in this file
 ───────────────────────────────────────
   Task 6   stream_answer()   — async generator that yields LLM tokens one by
-                               one so the caller can push them as SSE.
+                               one (as StreamEvent values) so the caller can
+                               push them as SSE.
 
-  Task 8   delete_file_vectors() — removes every Milvus chunk that belongs to
+  Task 8   delete_file_vectors() — removes every vector chunk that belongs to
                                a specific (user_id, file_id) pair, called from
                                the DELETE /files/{file_id} endpoint so nothing
                                is left behind in the vector store.
+
+  Retrieve retrieve_chunks() — ranked chunks only, no LLM call; accepts a
+                               precomputed query vector.
+
+  Batch    answer_batch()    — many questions at once: one embedding call,
+                               one multi-vector search, one CrossEncoder
+                               batch, then bounded-concurrency LLM calls.
+
+  Resume   index_file_task() — chunk ids are deterministic and stores
+                               upsert, and files.indexed_chunks records each
+                               committed batch, so a failed or interrupted
+                               file continues where it stopped
+                               (POST /files/{file_id}/reindex).
+
+  Migrate  Embedding models are versioned per user (src/utils/
+                               embedding_spaces.py): indexing writes every
+                               space returned by write_spaces(), queries
+                               use active_space(), and src/utils/reembed.py
+                               moves existing chunks to a new model.
+
+Every retrieval and indexing stage runs inside telemetry.stage(), which
+emits an OpenTelemetry span and a rag.stage.duration sample — see
+src/utils/telemetry.py.
 """
 
 from __future__ import annotations
 
+import asyncio
+import contextlib
 import logging
 import os
-from typing import AsyncIterator, Dict, List, Tuple
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import AsyncIterator, Dict, List, Optional, Sequence, Tuple
 
+import numpy as np
+import xxhash
 from dotenv import load_dotenv
 from langchain_community.document_loaders import UnstructuredFileLoader
 from langchain_core.documents import Document
-from langchain_groq import ChatGroq
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_milvus import Milvus
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from pymilvus import Collection, connections, utility
+from opentelemetry import trace
 from sentence_transformers import CrossEncoder
-from sqlalchemy import update
+from sqlalchemy import delete, select, update
+
+from src.utils.chunk_store import CHUNK_TEXT_STORE, compact, get_chunk_store
+from src.utils.chunking import CHUNKING_STRATEGY, Section, build_sections, recursive_chunks, split_children
+from src.utils.diversity import MMR_K, select_diverse
+from src.utils.embedding_spaces import (
+    BASE_SPACE,
+    TARGET_SPACE,
+    EmbeddingSpace,
+    active_space,
+    embedding_dimension,
+    get_embeddings,
+    stored_versions,
+    write_spaces,
+)
+from src.utils.llm_gateway import LLMError, LLMGateway
+from src.utils.retrieved import DENSE, NO_SECTION, RERANK, RetrievedChunks
+from src.utils.scheduler import index_scheduler, retrieval_scheduler
+from src.utils.sse import DONE, ERROR, SOURCES, TIMINGS, TOKEN, StreamEvent
+from src.utils.storage import get_storage
+from src.utils.telemetry import indexed_chunks, indexed_files, record_stage, stage
+from src.vectorstore import SearchFilter, SearchHit, chunk_id, collection_name, get_vector_store
 
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
 # ── Configuration ─────────────────────────────────────────────────────────────
-MILVUS_URI           = os.getenv("MILVUS_URI", "http://localhost:19530")
-EMBEDDING_MODEL_NAME = os.getenv("EMBEDDING_MODEL_NAME", "sentence-transformers/all-MiniLM-L6-v2")
 LLM_MODEL_NAME       = os.getenv("LLM_MODEL_NAME", "llama3-8b-8192")
 RERANKER_MODEL_NAME  = os.getenv("RERANKER_MODEL_NAME", "cross-encoder/ms-marco-MiniLM-L-6-v2")
 
-# ── Shared model instances (loaded once at startup) ───────────────────────────
-llm        = ChatGroq(model=LLM_MODEL_NAME, temperature=0.7)
-embeddings = HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL_NAME)
-reranker   = CrossEncoder(RERANKER_MODEL_NAME)
-
+# Number of most-recent chat turns included in the prompt.
+HISTORY_WINDOW = 6
 
-# ─────────────────────────────────────────────────────────────────────────────
-# Internal helpers — collection naming & vector store handles
-# ─────────────────────────────────────────────────────────────────────────────
+# Chunks embedded and inserted per step while indexing; progress events are
+# published after each batch.
+INDEX_BATCH_SIZE = int(os.getenv("INDEX_BATCH_SIZE", "64"))
 
-def _collection_name(user_id: int) -> str:
-    return f"user_{user_id}"
+# Adaptive retrieval defaults — see RetrievalOptions.
+RETRIEVAL_TOP_K       = int(os.getenv("RETRIEVAL_TOP_K", "4"))
+RETRIEVAL_FETCH_K     = int(os.getenv("RETRIEVAL_FETCH_K", "12"))
+RETRIEVAL_MAX_FETCH_K = int(os.getenv("RETRIEVAL_MAX_FETCH_K", "48"))
+RERANK_SKIP_MARGIN    = float(os.getenv("RERANK_SKIP_MARGIN", "0.08"))
+# CrossEncoder logit below which the best candidate counts as a weak match.
+RERANK_EXPAND_BELOW   = float(os.getenv("RERANK_EXPAND_BELOW", "0.0"))
 
+# Batch queries: CrossEncoder batch size and concurrent LLM calls per batch.
+RERANK_BATCH_SIZE     = int(os.getenv("RERANK_BATCH_SIZE", "64"))
+BATCH_LLM_CONCURRENCY = int(os.getenv("BATCH_LLM_CONCURRENCY", "4"))
 
-def _get_vector_store(user_id: int) -> Milvus:
-    return Milvus(
-        embedding_function=embeddings,
-        collection_name=_collection_name(user_id),
-        connection_args={"uri": MILVUS_URI},
-    )
+# ── Shared model instances (loaded once at startup) ───────────────────────────
+# All LLM traffic goes through the gateway (pooling, rate limiting, retries,
+# deadlines) — see src/utils/llm_gateway.py.
+llm_gateway = LLMGateway(model=LLM_MODEL_NAME, temperature=0.7)
+# Embedders come from src/utils/embedding_spaces.py; the base model and a
+# migration target are loaded here, before serve.py forks.
+for _space in (BASE_SPACE, TARGET_SPACE):
+    if _space is not None:
+        get_embeddings(_space.model)
+reranker = CrossEncoder(RERANKER_MODEL_NAME)
 
 
 # ─────────────────────────────────────────────────────────────────────────────
 # Document loading & splitting
 # ─────────────────────────────────────────────────────────────────────────────
 
-def _load_single_file(file_path: str) -> List[Document]:
-    loader = UnstructuredFileLoader(file_path)
-    docs   = loader.load()
+# Chunk metadata parent-section expansion relies on.
+_SECTION_KEYS = ("section_id", "section_idx", "kind", "page", "heading")
+
+
+def _chunking_strategy(user_id: int, version: str = "") -> str:
+    """
+    CHUNKING_STRATEGY, unless the user's collection is an old fixed-schema
+    one that would silently drop the section keys from inline rows — small
+    children without their parents retrieve worse than the recursive split.
+    """
+    if CHUNKING_STRATEGY != "structured" or CHUNK_TEXT_STORE == "local":
+        # Compact rows are hydrated from the chunk store, metadata and all.
+        return CHUNKING_STRATEGY
+    missing = get_vector_store().unsupported_metadata(user_id, _SECTION_KEYS, version=version)
+    if missing:
+        logger.warning(
+            "Collection '%s' has a fixed schema without %s — indexing with the recursive strategy",
+            collection_name(user_id, version), ", ".join(sorted(missing)),
+        )
+        return "recursive"
+    return CHUNKING_STRATEGY
+
+
+def _load_single_file(file_path: str, strategy: str = CHUNKING_STRATEGY) -> List[Document]:
+    # Structured chunking needs the individual elements (titles, tables,
+    # page numbers) rather than one flattened document.
+    mode = "elements" if strategy == "structured" else "single"
+    with stage("load", pipeline="index"):
+        loader = UnstructuredFileLoader(file_path, mode=mode)
+        docs   = loader.load()
     logger.info("Loaded %d doc(s) from %s", len(docs), file_path)
     return docs
 
 
 def _split_docs(
     data: List[Document],
-    chunk_size: int = 1000,
-    chunk_overlap: int = 150,
-) -> List[Document]:
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=chunk_size, chunk_overlap=chunk_overlap
-    )
-    chunks = splitter.split_documents(data)
-    logger.info("Split into %d chunks", len(chunks))
-    return chunks
+    strategy: str = CHUNKING_STRATEGY,
+) -> Tuple[List[Section], List[Document]]:
+    """
+    Returns (parent sections, chunks to embed).  With the recursive strategy
+    there are no sections and the chunks carry their own context.
+    """
+    with stage("split", pipeline="index", strategy=strategy):
+        if strategy == "structured":
+            sections = build_sections(data)
+            chunks   = split_children(sections)
+        else:
+            sections = []
+            chunks   = recursive_chunks(data)
+    logger.info("Split into %d section(s), %d chunks", len(sections), len(chunks))
+    return sections, chunks
+
+
+async def _store_sections(
+    db,
+    user_id: int,
+    file_id: str,
+    sections: List[Section],
+    chunks: List[Document],
+    reuse: bool = False,
+) -> bool:
+    """
+    Persist parent sections and point each child chunk at its section id.
 
+    With `reuse` (resuming a file whose split is unchanged) the rows written
+    by the earlier run are kept, so chunks already in the vector store keep
+    pointing at valid section ids.  Returns whether they were reused.
+    """
+    from src.models.sections import DocumentSection
+
+    if reuse:
+        ids = dict((await db.execute(
+            select(DocumentSection.section_idx, DocumentSection.id).where(DocumentSection.file_id == file_id)
+        )).all())
+        if all(section.idx in ids for section in sections):
+            for chunk in chunks:
+                if "section_idx" in chunk.metadata:
+                    chunk.metadata["section_id"] = ids[chunk.metadata["section_idx"]]
+            return True
+
+    await db.execute(delete(DocumentSection).where(DocumentSection.file_id == file_id))
+    if not sections:
+        return False
+
+    rows = [
+        DocumentSection(
+            file_id=file_id,
+            user_id=user_id,
+            section_idx=section.idx,
+            kind=section.kind,
+            heading=section.heading,
+            page=section.page,
+            content=section.text,
+        )
+        for section in sections
+    ]
+    db.add_all(rows)
+    await db.flush()
 
-def _save_to_user_collection(
+    ids = {row.section_idx: row.id for row in rows}
+    for chunk in chunks:
+        chunk.metadata["section_id"] = ids[chunk.metadata["section_idx"]]
+    return False
+
+
+def _tag_chunks(
     chunks: List[Document],
     user_id: int,
     file_id: str,
     file_name: str,
 ) -> None:
-    """Embed chunks and store them in the user's private Milvus collection."""
+    """Stamp ownership, position and the deterministic pk onto every chunk."""
     for i, chunk in enumerate(chunks):
         chunk.metadata.update({
+            "pk":        chunk_id(file_id, i, chunk.page_content),
             "user_id":   user_id,
             "file_id":   file_id,
             "file_name": file_name,
             "chunk_idx": i,
         })
 
-    Milvus.from_documents(
-        documents=chunks,
-        embedding=embeddings,
-        collection_name=_collection_name(user_id),
-        connection_args={"uri": MILVUS_URI},
-        drop_old=False,
-    )
-    logger.info(
-        "Saved %d chunks to collection '%s' (file_id=%s)",
-        len(chunks), _collection_name(user_id), file_id,
-    )
 
+def _chunks_digest(chunks: List[Document]) -> str:
+    """Fingerprint of a file's split: changes if any chunk's id does."""
+    digest = xxhash.xxh3_128()
+    for chunk in chunks:
+        digest.update(chunk.metadata["pk"].encode())
+        digest.update(b"\n")
+    return digest.hexdigest()
 
-# ─────────────────────────────────────────────────────────────────────────────
-# Task 8 — Delete vectors from Milvus when a file is deleted
-# ─────────────────────────────────────────────────────────────────────────────
 
-def delete_file_vectors(user_id: int, file_id: str) -> int:
+def _save_to_user_collection(
+    chunks: List[Document],
+    user_id: int,
+    spaces: Sequence[EmbeddingSpace] = (BASE_SPACE,),
+) -> None:
     """
-    Remove every chunk that belongs to `file_id` from the user's Milvus
-    collection.  Returns the number of entities deleted.
+    Embed one batch of chunks and store it in the user's private collection
+    — once per space while an embedding migration is running.
+    """
+    rows = chunks
+    if CHUNK_TEXT_STORE == "local":
+        # Text + metadata go to the compressed local store (shared by every
+        # space); the vector store keeps only the vector and a compact row.
+        with stage("store", pipeline="index", chunks=len(chunks), target="chunk_store"):
+            get_chunk_store().put_many(user_id, chunks)
+        rows = compact(chunks)
+
+    texts = [chunk.page_content for chunk in chunks]
+    for space in spaces:
+        with stage("embed", pipeline="index", chunks=len(chunks), model=space.model):
+            vectors = get_embeddings(space.model).embed_documents(texts)
+        with stage("store", pipeline="index", chunks=len(chunks)):
+            saved = get_vector_store().add(user_id, rows, vectors, version=space.version)
+        logger.info("Saved %d chunks to collection '%s'", saved, collection_name(user_id, space.version))
+    indexed_chunks.add(len(chunks))
 
-    Strategy
-    ────────
-    We use pymilvus directly because langchain-milvus' high-level API only
-    supports deletion by primary key.  Milvus 2.3+ supports scalar-field
-    expression deletes, which is exactly what we need here.
 
-    If the user's collection doesn't exist yet (edge case: file was uploaded
-    but indexing never ran), we just return 0 safely.
-    """
-    col_name = _collection_name(user_id)
+# ─────────────────────────────────────────────────────────────────────────────
+# Task 8 — Delete vectors when a file is deleted
+# ─────────────────────────────────────────────────────────────────────────────
 
+def _drop_file_chunks(user_id: int, file_id: str, versions: Sequence[str] = ("",)) -> int:
+    """
+    Delete a file's vectors from every collection version in `versions`
+    (stored_versions), and its stored chunk text; errors propagate.
+    Returns the count deleted from the first (active) version.
+    """
+    store = get_vector_store()
     try:
-        connections.connect(alias="default", uri=MILVUS_URI)
+        deleted = [store.delete_by_file(user_id, file_id, version=version) for version in versions]
+    finally:
+        # Attempted even when a vector delete failed, so the text doesn't
+        # outlive the file; the reconciler catches whatever is left.
+        get_chunk_store().delete_by_file(user_id, file_id)
+    return deleted[0] if deleted else 0
 
-        if not utility.has_collection(col_name):
-            logger.info("Collection '%s' does not exist — nothing to delete.", col_name)
-            return 0
 
-        collection = Collection(col_name)
-        collection.load()
+def delete_file_vectors(user_id: int, file_id: str, versions: Sequence[str] = ("",)) -> int:
+    """
+    Remove every chunk that belongs to `file_id` from the user's collection
+    (each of `versions`, active first).  Returns the number of entities
+    deleted from the active one.
 
-        # Expression filter: match the file_id metadata field
-        expr   = f'file_id == "{file_id}"'
-        result = collection.delete(expr=expr)
+    If the user's collection doesn't exist yet (edge case: file was uploaded
+    but indexing never ran), the store simply reports 0.
+    """
+    col_name = collection_name(user_id, versions[0] if versions else "")
 
-        deleted = result.delete_count
+    try:
+        deleted = _drop_file_chunks(user_id, file_id, versions)
         logger.info(
             "Deleted %d vector(s) from collection '%s' for file_id='%s'",
             deleted, col_name, file_id,
@@ -194,101 +358,315 @@ def _rerank(query: str, docs: List[Document], top_k: int) -> List[Document]:
 # ─────────────────────────────────────────────────────────────────────────────
 
 async def index_file_task(
-    file_path: str,
+    storage_key: str,
     user_id: int,
     file_id: str,
     file_name: str,
 ) -> None:
     """
-    Full pipeline: load → split → store in Milvus.
-    Writes PROCESSING → INDEXED / FAILED back to Postgres.
+    Full pipeline: load → split → store in the vector store.  `storage_key`
+    names the upload in the storage backend (src/utils/storage.py).
+    Writes PROCESSING → INDEXED / FAILED back to Postgres and publishes each
+    transition, plus per-batch progress, to the status broker.
+
+    The blocking load/split/embed steps run in the indexing pool, fair-
+    scheduled per user (src/utils/scheduler.py), so a large document
+    doesn't stall the event loop and one user's bulk upload doesn't starve
+    everyone else's.
+
+    The PENDING → PROCESSING transition is a conditional UPDATE, so a file
+    requeued on startup is only ever indexed by one worker.
+
+    Indexing is resumable.  Chunk pks are derived from (file_id, chunk_idx,
+    text) and the stores upsert, so writing a batch twice is harmless; after
+    each batch files.indexed_chunks is committed.  A later run whose split
+    has the same chunks_digest starts after that checkpoint.  If the split
+    changed, whatever an earlier run wrote is dropped first.  A cancelled
+    task (shutdown drain deadline) keeps its checkpoint and goes back to
+    PENDING; a failed one keeps it and goes to FAILED until reindexed.
+
+    During an embedding-model migration every batch is embedded and stored
+    twice, in the active and the target space (write_spaces).
     """
     from src.database.config import AsyncSessionLocal
     from src.models.files import FileInputModel, IndexingStatus
+    from src.utils.status_events import status_broker
 
-    async with AsyncSessionLocal() as db:
-        await db.execute(
-            update(FileInputModel)
-            .where(FileInputModel.file_id == file_id)
-            .values(indexing_status=IndexingStatus.PROCESSING)
+    async def publish(status: IndexingStatus, progress: float, error: str | None = None) -> None:
+        await status_broker.publish(
+            user_id, file_id, status.value, file_name=file_name, progress=progress, error=error,
         )
-        await db.commit()
 
-        try:
-            docs   = _load_single_file(file_path)
-            chunks = _split_docs(docs)
-            _save_to_user_collection(chunks, user_id, file_id, file_name)
-
-            await db.execute(
-                update(FileInputModel)
-                .where(FileInputModel.file_id == file_id)
-                .values(indexing_status=IndexingStatus.INDEXED, indexing_error=None)
-            )
-            await db.commit()
-            logger.info("Indexing complete for file_id=%s", file_id)
-
-        except Exception as exc:
-            logger.exception("Indexing failed for file_id=%s", file_id)
-            await db.execute(
+    async with AsyncSessionLocal() as db:
+        with stage("index", pipeline="index", file_id=file_id) as span:
+            claimed = await db.execute(
                 update(FileInputModel)
-                .where(FileInputModel.file_id == file_id)
+                .where(
+                    FileInputModel.file_id == file_id,
+                    FileInputModel.indexing_status == IndexingStatus.PENDING,
+                )
                 .values(
-                    indexing_status=IndexingStatus.FAILED,
-                    indexing_error=str(exc),
+                    indexing_status=IndexingStatus.PROCESSING,
+                    indexing_started_at=datetime.now(timezone.utc),
                 )
             )
             await db.commit()
+            if claimed.rowcount == 0:
+                logger.info("file_id=%s is not pending any more — skipping", file_id)
+                return
+            await publish(IndexingStatus.PROCESSING, 0.0)
+            checkpoint = (await db.execute(
+                select(FileInputModel.indexed_chunks, FileInputModel.chunks_digest)
+                .where(FileInputModel.file_id == file_id)
+            )).one()
+
+            try:
+                active   = (await write_spaces(user_id))[0]
+                strategy = await asyncio.to_thread(_chunking_strategy, user_id, active.version)
+                async with get_storage().local_copy(storage_key) as file_path:
+                    docs = await index_scheduler.run(user_id, _load_single_file, file_path, strategy)
+                await publish(IndexingStatus.PROCESSING, 0.1)
+                sections, chunks = await index_scheduler.run(user_id, _split_docs, docs, strategy)
+                _tag_chunks(chunks, user_id, file_id, file_name)
+
+                digest = _chunks_digest(chunks)
+                resume = (checkpoint.indexed_chunks or 0) if checkpoint.chunks_digest == digest else 0
+                if not await _store_sections(db, user_id, file_id, sections, chunks, reuse=resume > 0):
+                    resume = 0
+                if not resume and checkpoint.indexed_chunks is not None:
+                    # An earlier run wrote chunks we can't build on.
+                    await asyncio.to_thread(_drop_file_chunks, user_id, file_id, await stored_versions(user_id))
+                await db.execute(
+                    update(FileInputModel)
+                    .where(FileInputModel.file_id == file_id)
+                    .values(indexed_chunks=resume, chunks_digest=digest)
+                )
+                await db.commit()
+                if resume:
+                    logger.info("Resuming file_id=%s at chunk %d of %d", file_id, resume, len(chunks))
+                    span.set_attribute("resumed_at", resume)
+                await publish(IndexingStatus.PROCESSING, 0.2 + 0.8 * resume / max(len(chunks), 1))
+
+                for start in range(resume, len(chunks), INDEX_BATCH_SIZE):
+                    batch = chunks[start:start + INDEX_BATCH_SIZE]
+                    # Re-read per batch: a migration starting mid-file must
+                    # see every later batch written to its target too.
+                    spaces = await write_spaces(user_id)
+                    await index_scheduler.run(user_id, _save_to_user_collection, batch, user_id, spaces)
+                    done = start + len(batch)
+                    await db.execute(
+                        update(FileInputModel)
+                        .where(FileInputModel.file_id == file_id)
+                        .values(indexed_chunks=done)
+                    )
+                    await db.commit()
+                    await publish(IndexingStatus.PROCESSING, 0.2 + 0.8 * done / len(chunks))
+
+                await db.execute(
+                    update(FileInputModel)
+                    .where(FileInputModel.file_id == file_id)
+                    .values(indexing_status=IndexingStatus.INDEXED, indexing_error=None)
+                )
+                await db.commit()
+                await publish(IndexingStatus.INDEXED, 1.0)
+                span.set_attribute("chunks", len(chunks))
+                indexed_files.add(1, {"status": IndexingStatus.INDEXED.value})
+                logger.info("Indexing complete for file_id=%s (%d chunks)", file_id, len(chunks))
+
+            except asyncio.CancelledError:
+                logger.warning("Indexing of file_id=%s interrupted by shutdown — requeueing", file_id)
+                await db.rollback()
+                await db.execute(
+                    update(FileInputModel)
+                    .where(FileInputModel.file_id == file_id)
+                    .values(indexing_status=IndexingStatus.PENDING, indexing_started_at=None)
+                )
+                await db.commit()
+                await publish(IndexingStatus.PENDING, 0.0)
+                raise
+
+            except Exception as exc:
+                logger.exception("Indexing failed for file_id=%s", file_id)
+                span.record_exception(exc)
+                indexed_files.add(1, {"status": IndexingStatus.FAILED.value})
+                await db.rollback()
+                await db.execute(
+                    update(FileInputModel)
+                    .where(FileInputModel.file_id == file_id)
+                    .values(
+                        indexing_status=IndexingStatus.FAILED,
+                        indexing_error=str(exc),
+                    )
+                )
+                await db.commit()
+                await publish(IndexingStatus.FAILED, 1.0, error=str(exc))
 
 
 # ─────────────────────────────────────────────────────────────────────────────
 # Retrieval helpers (Features 1, 2, 4)
 # ─────────────────────────────────────────────────────────────────────────────
 
+@dataclass(slots=True)
+class RetrievalOptions:
+    """
+    Per-request retrieval knobs.
+
+    skip_margin   Dense early exit.  When there are more than top_k
+                  candidates and the top_k-th dense similarity beats the
+                  next one by at least this much, re-ranking can't change
+                  which chunks make the cut, so the CrossEncoder is skipped
+                  and dense scores are returned (scorer DENSE).  None
+                  disables it.
+    expand_below  When the best re-ranker score is below this, fetch_k is
+                  doubled (up to max_fetch_k) and only the new candidates
+                  are re-ranked.  None disables expansion.
+    filter        Restrict the ANN search to some files / metadata values.
+    """
+    top_k:        int                    = RETRIEVAL_TOP_K
+    fetch_k:      int                    = RETRIEVAL_FETCH_K
+    max_fetch_k:  int                    = RETRIEVAL_MAX_FETCH_K
+    skip_margin:  Optional[float]        = None
+    expand_below: Optional[float]        = RERANK_EXPAND_BELOW
+    filter:       Optional[SearchFilter] = None
+
+
+def _hydrate(
+    user_id: int,
+    hits: List[SearchHit],
+    timings: Optional[Dict[str, float]] = None,
+) -> List[SearchHit]:
+    """
+    Fill in text for hits whose vector-store row is compact (text kept in
+    the local chunk store) — one batched lookup, surviving candidates only.
+    """
+    missing = [hit for hit in hits if not hit.document.page_content]
+    if not missing:
+        return hits
+    with stage("hydrate", timings, pipeline="query", chunks=len(missing)):
+        found = get_chunk_store().get_many(user_id, [hit.id for hit in missing])
+    for hit in missing:
+        if hit.id in found:
+            hit.document = found[hit.id]
+    return hits
+
+
+def _dense_margin_clear(hits: List[SearchHit], top_k: int, margin: Optional[float]) -> bool:
+    # With top_k or fewer candidates there is no runner-up to beat: every
+    # candidate makes the cut, and only the CrossEncoder can order them.
+    if margin is None or len(hits) <= top_k:
+        return False
+    scores = sorted((hit.score for hit in hits), reverse=True)
+    return scores[top_k - 1] - scores[top_k] >= margin
+
+
 def _get_docs_with_scores(
-    query: str,
+    query: Optional[str],
     user_id: int,
-    top_k: int = 4,
-    fetch_k: int = 12,
-) -> List[Tuple[Document, float]]:
+    options: Optional[RetrievalOptions] = None,
+    timings: Optional[Dict[str, float]] = None,
+    query_vector: Optional[List[float]] = None,
+    space: Optional[EmbeddingSpace] = None,
+) -> RetrievedChunks:
     """
-    Fetch fetch_k candidates from Milvus, re-rank with CrossEncoder,
-    return top_k with their re-ranker scores.
+    Fetch fetch_k candidates from the vector store, drop near-duplicates and
+    neighbouring chunks while diversifying with MMR (src/utils/diversity.py),
+    re-rank the survivors with CrossEncoder and return top_k with their
+    scores.
+
+    Adaptive depth (RetrievalOptions): easy queries may return straight from
+    the dense scores; hard ones widen the search until a strong match turns
+    up or max_fetch_k is reached.
+
+    Each stage is traced; when `timings` is given, the embed / search /
+    diversify / rerank durations (ms) are also recorded into it.
+
+    A caller-supplied `query_vector` (already unit-normalised) skips the
+    embedding step.  Without query text there is nothing to re-rank
+    against, so the diversified candidates are returned by dense score.
+
+    `space` is the user's active embedding space (active_space); it picks
+    both the query embedder and the collection version searched.
     """
-    vs         = _get_vector_store(user_id)
-    candidates = vs.similarity_search(query, k=fetch_k)
-    if not candidates:
-        return []
+    space   = space or BASE_SPACE
+    opts    = options or RetrievalOptions()
+    top_k   = opts.top_k
+    fetch_k = max(opts.fetch_k, top_k)
+    store   = get_vector_store()
+    current = trace.get_current_span()
+
+    if query_vector is None:
+        with stage("embed", timings, pipeline="query"):
+            query_vector = get_embeddings(space.model).embed_query(query)
+
+    reranked: set[str] = set()
+    scored: List[Tuple[SearchHit, float]] = []
+    while True:
+        with stage("search", timings, pipeline="query", k=fetch_k) as span:
+            found = store.search(
+                user_id, query_vector, k=fetch_k, with_vectors=True, filter=opts.filter, version=space.version,
+            )
+            span.set_attribute("hits", len(found))
+        if not found:
+            return RetrievedChunks()
+
+        with stage("diversify", timings, pipeline="query", candidates=len(found)) as span:
+            hits = select_diverse(query_vector, found, k=max(top_k, MMR_K))
+            span.set_attribute("kept", len(hits))
+
+        if not query or (not scored and _dense_margin_clear(hits, top_k, opts.skip_margin)):
+            current.set_attribute("retrieval.rerank_skipped", True)
+            hits.sort(key=lambda hit: hit.score, reverse=True)
+            hits = _hydrate(user_id, hits[:top_k], timings)
+            return RetrievedChunks.from_hits(hits, (hit.score for hit in hits), DENSE)
+
+        fresh = _hydrate(user_id, [hit for hit in hits if hit.id not in reranked], timings)
+        if fresh:
+            with stage("rerank", timings, pipeline="query", pairs=len(fresh)):
+                scores = reranker.predict([(query, hit.document.page_content) for hit in fresh])
+            reranked.update(hit.id for hit in fresh)
+            scored.extend((hit, float(score)) for hit, score in zip(fresh, scores))
+            scored.sort(key=lambda pair: pair[1], reverse=True)
+
+        exhausted = len(found) < fetch_k or fetch_k >= opts.max_fetch_k
+        if opts.expand_below is None or exhausted or scored[0][1] >= opts.expand_below:
+            break
+        fetch_k = min(fetch_k * 2, opts.max_fetch_k)
+
+    current.set_attribute("retrieval.fetch_k", fetch_k)
+    current.set_attribute("retrieval.reranked", len(reranked))
+    top = scored[:top_k]
+    return RetrievedChunks.from_hits((hit for hit, _ in top), (score for _, score in top), RERANK)
+
+
+async def _attach_sections(
+    user_id: int,
+    chunks: RetrievedChunks,
+    timings: Optional[Dict[str, float]] = None,
+) -> RetrievedChunks:
+    """
+    Swap each retrieved child chunk for its parent section (one batched
+    lookup by id).  Siblings collapse into their best-scoring child, so a
+    section reaches the prompt once.  Chunks indexed without sections are
+    passed through unchanged.
+    """
+    section_ids = {sid for sid in chunks.section_ids if sid != NO_SECTION}
+    if not section_ids:
+        return chunks
 
-    pairs  = [(query, doc.page_content) for doc in candidates]
-    scores = reranker.predict(pairs)
-    ranked = sorted(zip(scores, candidates), key=lambda x: x[0], reverse=True)
-    return [(doc, float(score)) for score, doc in ranked[:top_k]]
-
-
-def _build_context_and_sources(
-    docs_with_scores: List[Tuple[Document, float]],
-) -> Tuple[str, List[Dict]]:
-    """Render a context string and a deduplicated sources list."""
-    context_parts = []
-    sources       = []
-    seen          = set()
-
-    for doc, score in docs_with_scores:
-        meta      = doc.metadata
-        file_name = meta.get("file_name", "unknown")
-        file_id   = meta.get("file_id", "")
-        chunk_idx = meta.get("chunk_idx", 0)
-
-        context_parts.append(
-            f"[Source: {file_name}, chunk {chunk_idx}, score {score:.3f}]\n"
-            f"{doc.page_content}"
-        )
-        key = f"{file_id}:{chunk_idx}"
-        if key not in seen:
-            seen.add(key)
-            sources.append({"file_name": file_name, "file_id": file_id, "chunk_idx": chunk_idx})
+    from src.database.config import AsyncSessionLocal
+    from src.models.sections import DocumentSection
+
+    with stage("sections", timings, pipeline="query", sections=len(section_ids)):
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(DocumentSection.id, DocumentSection.content).where(
+                    DocumentSection.id.in_(section_ids),
+                    DocumentSection.user_id == user_id,
+                )
+            )
+            content = dict(result.all())
 
-    return "\n\n---\n\n".join(context_parts), sources
+    return chunks.with_sections(content)
 
 
 def _build_prompt(
@@ -300,7 +678,7 @@ def _build_prompt(
     if chat_history:
         turns = [
             f"{t.get('role','user').capitalize()}: {t.get('content','')}"
-            for t in chat_history[-6:]
+            for t in chat_history[-HISTORY_WINDOW:]
         ]
         history_block = "\n\n<Conversation History>\n" + "\n".join(turns) + "\n</Conversation History>"
 
@@ -313,34 +691,121 @@ def _build_prompt(
     )
 
 
+def _query_vector(vector: List[float], space: EmbeddingSpace = BASE_SPACE) -> List[float]:
+    """Validate and unit-normalise a client-supplied query embedding."""
+    dim = embedding_dimension(space.model)
+    if len(vector) != dim:
+        raise ValueError(
+            f"query_vector has {len(vector)} dimensions, the embedding model ({space.model}) produces {dim}"
+        )
+    array = np.asarray(vector, dtype=np.float32)
+    norm  = float(np.linalg.norm(array))
+    if not np.isfinite(norm) or norm == 0:
+        raise ValueError("query_vector must be a finite, non-zero vector")
+    return (array / norm).tolist()
+
+
+def _get_docs_by_vector(
+    query: Optional[str],
+    user_id: int,
+    options: Optional[RetrievalOptions],
+    query_vector: List[float],
+    space: EmbeddingSpace,
+) -> RetrievedChunks:
+    # Validated inside the pool job: the dimension check may have to load
+    # the space's embedding model, which must not happen on the event loop.
+    return _get_docs_with_scores(query, user_id, options, None, _query_vector(query_vector, space), space)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Public API — retrieval only
+# ─────────────────────────────────────────────────────────────────────────────
+
+async def retrieve_chunks(
+    user_id: int,
+    query: Optional[str] = None,
+    query_vector: Optional[List[float]] = None,
+    options: Optional[RetrievalOptions] = None,
+    expand_sections: bool = False,
+) -> List[Dict]:
+    """
+    Ranked chunks without generation, for clients that build their own
+    prompts or UIs.  Either `query` or `query_vector` is required; with
+    only a vector, ranking is by dense similarity (no re-ranking).
+    `expand_sections` swaps child chunks for their parent sections, as the
+    answer endpoints do.
+
+    Raises ValueError for a query_vector of the wrong size.  A client-side
+    vector must come from the user's active embedding model, which changes
+    when a migration switches over.
+    """
+    space = await active_space(user_id)
+    with stage("retrieval", pipeline="retrieve", user_id=user_id):
+        if query_vector is not None:
+            chunks = await retrieval_scheduler.run(
+                user_id, _get_docs_by_vector, query, user_id, options, query_vector, space,
+            )
+        else:
+            chunks = await retrieval_scheduler.run(
+                user_id, _get_docs_with_scores, query, user_id, options, None, None, space,
+            )
+        if expand_sections:
+            chunks = await _attach_sections(user_id, chunks)
+
+    return [
+        {
+            "text":      chunks.texts[i],
+            "score":     chunks.scores[i],
+            "scorer":    chunks.scorer,
+            "file_id":   chunks.file_ids[i],
+            "file_name": chunks.file_names[i],
+            "chunk_idx": chunks.chunk_idx[i],
+            "metadata":  chunks.metadata[i],
+        }
+        for i in range(len(chunks))
+    ]
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 # Public API — non-streaming (Feature 3 + all above)
 # ─────────────────────────────────────────────────────────────────────────────
 
-def generate_answer(
+async def generate_answer(
     query: str,
     user_id: int,
     chat_history: List[Dict[str, str]] | None = None,
+    options: Optional[RetrievalOptions] = None,
 ) -> Dict:
     """
     Full RAG pipeline (non-streaming).
 
+    Retrieval runs in the fair-scheduled retrieval pool; the LLM call goes through the gateway
+    and may raise LLMError subclasses (rate limited / timeout / unavailable).
+
     Returns:
         {"answer": str, "sources": [{"file_name", "file_id", "chunk_idx"}, ...]}
     """
-    docs_with_scores = _get_docs_with_scores(query, user_id)
+    with stage("generate", pipeline="query", user_id=user_id):
+        with stage("retrieval", pipeline="query"):
+            space  = await active_space(user_id)
+            chunks = await retrieval_scheduler.run(
+                user_id, _get_docs_with_scores, query, user_id, options, None, None, space,
+            )
+            chunks = await _attach_sections(user_id, chunks)
 
-    if not docs_with_scores:
-        return {
-            "answer": "I could not find relevant information in your documents to answer this question.",
-            "sources": [],
-        }
+        if not chunks:
+            return {
+                "answer": "I could not find relevant information in your documents to answer this question.",
+                "sources": [],
+            }
 
-    context, sources = _build_context_and_sources(docs_with_scores)
-    prompt           = _build_prompt(query, context, chat_history)
-    response         = llm.invoke(prompt)
+        with stage("prompt", pipeline="query"):
+            context, sources = chunks.render()
+            prompt           = _build_prompt(query, context, chat_history)
+        with stage("llm", pipeline="query"):
+            answer = await llm_gateway.ainvoke(prompt)
 
-    return {"answer": response.content, "sources": sources}
+    return {"answer": answer, "sources": sources}
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -351,44 +816,216 @@ async def stream_answer(
     query: str,
     user_id: int,
     chat_history: List[Dict[str, str]] | None = None,
-) -> AsyncIterator[str]:
+    include_timings: bool = False,
+    options: Optional[RetrievalOptions] = None,
+) -> AsyncIterator[StreamEvent]:
     """
     Streaming RAG pipeline.
 
-    Yields Server-Sent Event lines:
-      - One  "data: <token>\\n\\n"  per LLM token as it arrives.
-      - A final "data: [SOURCES] <json>\\n\\n" so the client knows which
-        documents were cited.
-      - A terminal "data: [DONE]\\n\\n" to signal end-of-stream.
+    Yields structured events rather than wire frames; the router encodes
+    them with src.utils.sse (which also coalesces tiny tokens):
+      - StreamEvent("sources", [{"file_name", "file_id", "chunk_idx"}, ...])
+        as soon as re-ranking finishes, before generation starts.
+      - StreamEvent("token",   <text>)   per LLM token, newlines preserved.
+      - StreamEvent("error",   {"detail", "retry_after"}) if the LLM call
+        fails after retries; the stream still ends with "done".
+      - StreamEvent("timings", {stage: ms, ...}) only if include_timings.
+      - StreamEvent("done",    "[DONE]") to signal end-of-stream.
+
+    Retrieval runs in the retrieval pool while the LLM connection is warmed up
+    concurrently, so the first byte (sources) and the first token both
+    arrive sooner even though the total work is unchanged.
 
     Example client consumption (JavaScript):
         const es = new EventSource('/rag/stream?...');
-        es.onmessage = (e) => {
-            if (e.data === '[DONE]') { es.close(); return; }
-            if (e.data.startsWith('[SOURCES]')) { /* parse citations */ return; }
-            appendToken(e.data);
-        };
+        es.addEventListener('sources', (e) => showCitations(JSON.parse(e.data)));
+        es.addEventListener('token',   (e) => appendToken(e.data));
+        es.addEventListener('done',    ()  => es.close());
     """
-    import json
+    timings: Dict[str, float] = {}
+    started = time.perf_counter()
+    warm_up = asyncio.create_task(llm_gateway.warm())
 
-    # ── Retrieval (sync, fast) ────────────────────────────────────────────────
-    docs_with_scores = _get_docs_with_scores(query, user_id)
+    # The warm-up must not outlive the request: cancel it if retrieval fails,
+    # the client disconnects before generation, or there is nothing to answer.
+    # Cancelling a finished task is a no-op.
+    try:
+        # ── Retrieval (blocking models → retrieval pool) ──────────────────────
+        with stage("retrieval", timings, pipeline="query", user_id=user_id):
+            space  = await active_space(user_id)
+            chunks = await retrieval_scheduler.run(
+                user_id, _get_docs_with_scores, query, user_id, options, timings, None, space,
+            )
+            chunks = await _attach_sections(user_id, chunks, timings)
+
+        if not chunks:
+            yield StreamEvent(TOKEN, "I could not find relevant information in your documents.")
+            if include_timings:
+                yield StreamEvent(TIMINGS, timings)
+            yield StreamEvent(DONE, "[DONE]")
+            return
 
-    if not docs_with_scores:
-        yield "data: I could not find relevant information in your documents.\n\n"
-        yield "data: [DONE]\n\n"
-        return
+        with stage("prompt", timings, pipeline="query"):
+            context, sources = chunks.render()
+            prompt           = _build_prompt(query, context, chat_history)
 
-    context, sources = _build_context_and_sources(docs_with_scores)
-    prompt           = _build_prompt(query, context, chat_history)
+        # ── Sources go out before generation starts ───────────────────────────
+        yield StreamEvent(SOURCES, sources)
+
+        with contextlib.suppress(Exception):
+            await warm_up
+    finally:
+        warm_up.cancel()
 
     # ── Stream tokens from LLM ────────────────────────────────────────────────
-    async for chunk in llm.astream(prompt):
-        token = chunk.content
-        if token:
-            # Escape newlines inside the SSE data field
-            yield f"data: {token.replace(chr(10), ' ')}\n\n"
-
-    # ── Send sources after all tokens ─────────────────────────────────────────
-    yield f"data: [SOURCES] {json.dumps(sources)}\n\n"
-    yield "data: [DONE]\n\n"
\ No newline at end of file
+    llm_started = time.perf_counter()
+    first_token = True
+    try:
+        async for token in llm_gateway.astream(prompt):
+            if first_token:
+                record_stage("llm_first_token", (time.perf_counter() - llm_started) * 1000, timings)
+                first_token = False
+            yield StreamEvent(TOKEN, token)
+    except LLMError as exc:
+        # Headers are long gone by now — report the failure in-band.
+        logger.warning("LLM streaming failed for user_id=%s: %s", user_id, exc)
+        yield StreamEvent(ERROR, {
+            "detail":      str(exc),
+            "retry_after": getattr(exc, "retry_after", None),
+        })
+
+    record_stage("llm", (time.perf_counter() - llm_started) * 1000)
+    record_stage("stream", (time.perf_counter() - started) * 1000)
+    if include_timings:
+        timings["llm_total_ms"] = round((time.perf_counter() - llm_started) * 1000, 2)
+        timings["total_ms"]     = round((time.perf_counter() - started) * 1000, 2)
+        yield StreamEvent(TIMINGS, timings)
+    yield StreamEvent(DONE, "[DONE]")
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Batch queries
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _get_docs_with_scores_many(
+    queries: List[str],
+    user_id: int,
+    options: Optional[RetrievalOptions] = None,
+    space: Optional[EmbeddingSpace] = None,
+) -> List[RetrievedChunks]:
+    """
+    _get_docs_with_scores for many questions against one collection: one
+    multi-vector search, one chunk-store lookup and one CrossEncoder pass
+    over every (query, candidate) pair.  Questions are embedded with
+    embed_query, not embed_documents, so models with a query-side prompt
+    retrieve exactly what /rag/query would for the same question.
+
+    fetch_k is fixed — widening the search for weak matches would cost a
+    round trip per query — but the dense early exit still applies per query.
+    """
+    space   = space or BASE_SPACE
+    opts    = options or RetrievalOptions()
+    top_k   = opts.top_k
+    fetch_k = max(opts.fetch_k, top_k)
+
+    with stage("embed", pipeline="batch", queries=len(queries)):
+        embeddings = get_embeddings(space.model)
+        vectors    = [embeddings.embed_query(query) for query in queries]
+    with stage("search", pipeline="batch", k=fetch_k, queries=len(queries)):
+        found = get_vector_store().search_many(
+            user_id, vectors, k=fetch_k, with_vectors=True, filter=opts.filter, version=space.version,
+        )
+    with stage("diversify", pipeline="batch"):
+        kept = [
+            select_diverse(vector, hits, k=max(top_k, MMR_K)) if hits else []
+            for vector, hits in zip(vectors, found)
+        ]
+
+    dense = set()
+    for i, hits in enumerate(kept):
+        if hits and _dense_margin_clear(hits, top_k, opts.skip_margin):
+            hits.sort(key=lambda hit: hit.score, reverse=True)
+            kept[i] = hits[:top_k]
+            dense.add(i)
+
+    _hydrate(user_id, [hit for hits in kept for hit in hits])
+
+    pairs = [
+        (queries[i], hit.document.page_content)
+        for i, hits in enumerate(kept) if i not in dense
+        for hit in hits
+    ]
+    scores = []
+    if pairs:
+        with stage("rerank", pipeline="batch", pairs=len(pairs)):
+            scores = reranker.predict(pairs, batch_size=RERANK_BATCH_SIZE)
+
+    results, offset = [], 0
+    for i, hits in enumerate(kept):
+        if i in dense:
+            results.append(RetrievedChunks.from_hits(hits, (hit.score for hit in hits), DENSE))
+            continue
+        ranked = sorted(
+            zip(hits, scores[offset:offset + len(hits)]), key=lambda pair: pair[1], reverse=True,
+        )[:top_k]
+        offset += len(hits)
+        results.append(RetrievedChunks.from_hits((hit for hit, _ in ranked), (score for _, score in ranked), RERANK))
+    return results
+
+
+async def answer_batch(
+    queries: List[str],
+    user_id: int,
+    options: Optional[RetrievalOptions] = None,
+    concurrency: int = BATCH_LLM_CONCURRENCY,
+) -> AsyncIterator[Dict]:
+    """
+    Answer independent questions in bulk (evaluation runs).
+
+    Retrieval for the whole batch is one job in the retrieval pool, charged
+    as len(queries) so it takes its fair share; at most `concurrency`
+    prompts are then in flight at the gateway.  Yields, in completion order:
+        {"index", "query", "answer", "sources"}
+        {"index", "query", "error", "retry_after"}   if the LLM call failed
+    """
+    with stage("retrieval", pipeline="batch", user_id=user_id, queries=len(queries)):
+        space     = await active_space(user_id)
+        retrieved = await retrieval_scheduler.run(
+            user_id, _get_docs_with_scores_many, queries, user_id, options, space, cost=len(queries),
+        )
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def answer(index: int) -> Dict:
+        query = queries[index]
+        async with semaphore:
+            chunks = await _attach_sections(user_id, retrieved[index])
+            if not chunks:
+                return {
+                    "index":   index,
+                    "query":   query,
+                    "answer":  "I could not find relevant information in your documents to answer this question.",
+                    "sources": [],
+                }
+            context, sources = chunks.render()
+            try:
+                with stage("llm", pipeline="batch"):
+                    text = await llm_gateway.ainvoke(_build_prompt(query, context, None))
+            except LLMError as exc:
+                logger.warning("Batch query %d failed for user_id=%s: %s", index, user_id, exc)
+                return {
+                    "index":       index,
+                    "query":       query,
+                    "error":       str(exc),
+                    "retry_after": getattr(exc, "retry_after", None),
+                }
+        return {"index": index, "query": query, "answer": text, "sources": sources}
+
+    tasks = [asyncio.create_task(answer(i)) for i in range(len(queries))]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        # Client went away (or the batch was cut short): stop the rest.
+        for task in tasks:
+            task.cancel()
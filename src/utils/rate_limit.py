@@ -0,0 +1,118 @@
+"""
+Per-user rate limiting.
+
+Each (user, route class) pair gets its own token bucket.  Unlike the LLM
+gateway's bucket, nobody waits here: a request that finds the bucket empty
+is rejected at once with 429 and a Retry-After of when the next token
+arrives, before it costs any embedding, re-ranking or LLM work.
+
+  route class   routes                                   env
+  query         /rag/query, /rag/stream, session         RATE_LIMIT_QUERY_PER_MIN
+                query/stream                             RATE_LIMIT_QUERY_BURST
+  upload        /files/upload-single, /files/upload-     RATE_LIMIT_UPLOAD_PER_MIN
+                multiple (one token per file)            RATE_LIMIT_UPLOAD_BURST
+  batch         /rag/query/batch                         RATE_LIMIT_BATCH_PER_MIN
+                                                         RATE_LIMIT_BATCH_BURST
+
+A per-minute rate of 0 disables that class.  Buckets live in process
+memory, so with several workers the effective limit is per worker.
+"""
+
+from __future__ import annotations
+
+import math
+import os
+import time
+from dataclasses import dataclass
+from typing import Dict, Tuple
+
+from dotenv import load_dotenv
+from fastapi import Depends, HTTPException, status
+
+from src.utils.auth_dependencies import get_current_user_id
+from src.utils.telemetry import rate_limited
+
+load_dotenv()
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+
+# Buckets idle long enough to be full again are dropped past this many.
+_MAX_BUCKETS = 10_000
+
+
+@dataclass(slots=True)
+class RouteLimit:
+    per_min: float
+    burst:   int
+
+
+def _limit(route_class: str, per_min: str, burst: str) -> RouteLimit:
+    prefix = f"RATE_LIMIT_{route_class.upper()}"
+    return RouteLimit(
+        per_min=float(os.getenv(f"{prefix}_PER_MIN", per_min)),
+        burst=int(os.getenv(f"{prefix}_BURST", burst)),
+    )
+
+
+ROUTE_LIMITS: Dict[str, RouteLimit] = {
+    "query":  _limit("query", "60", "10"),
+    "upload": _limit("upload", "30", "20"),
+    "batch":  _limit("batch", "2", "2"),
+}
+
+
+class RateLimiter:
+    """Non-blocking token buckets keyed by (route class, user)."""
+
+    def __init__(self, limits: Dict[str, RouteLimit]) -> None:
+        self.limits = limits
+        # (route class, user) → (tokens, last refill, monotonic)
+        self._buckets: Dict[Tuple[str, int], Tuple[float, float]] = {}
+
+    def check(self, user_id: int, route_class: str, cost: int = 1) -> None:
+        """
+        Take `cost` tokens or raise 429.  A request costing more than the
+        burst is admitted once the bucket is full and leaves it in debt, so
+        a large batch upload is never rejected outright.
+        """
+        limit = self.limits[route_class]
+        if not RATE_LIMIT_ENABLED or limit.per_min <= 0:
+            return
+
+        rate   = limit.per_min / 60
+        now    = time.monotonic()
+        key    = (route_class, user_id)
+        tokens, updated = self._buckets.get(key, (float(limit.burst), now))
+        tokens = min(limit.burst, tokens + (now - updated) * rate)
+
+        needed = min(cost, limit.burst)
+        if tokens < needed:
+            self._buckets[key] = (tokens, now)
+            rate_limited.add(1, {"route_class": route_class})
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail=f"Too many {route_class} requests, slow down",
+                headers={"Retry-After": str(max(1, math.ceil((needed - tokens) / rate)))},
+            )
+
+        self._buckets[key] = (tokens - cost, now)
+        if len(self._buckets) > _MAX_BUCKETS:
+            self._prune(now)
+
+    def _prune(self, now: float) -> None:
+        for key, (tokens, updated) in list(self._buckets.items()):
+            limit = self.limits[key[0]]
+            if tokens + (now - updated) * limit.per_min / 60 >= limit.burst:
+                del self._buckets[key]
+
+
+rate_limiter = RateLimiter(ROUTE_LIMITS)
+
+
+def rate_limit(route_class: str):
+    """Dependency: authenticate, then charge one token of `route_class`."""
+    async def dependency(user_id: int = Depends(get_current_user_id)) -> int:
+        rate_limiter.check(user_id, route_class)
+        return user_id
+
+    return dependency
@@ -0,0 +1,360 @@
+"""
+Orphan reconciliation across the files table, upload storage, the
+vector store and the chunk text store.
+
+Uploads, vectors and `files` rows are written and deleted in separate
+steps, and some of those steps are deliberately non-fatal
+(delete_file_vectors logs and carries on), so crashes and partial
+failures leave debris behind.  reconcile() finds it:
+
+  vector_orphans        file_ids in a user_* collection (any embedding
+                        version — see src/utils/embedding_spaces.py) or in
+                        the user's chunk text store with no files row
+  storage_orphans       stored uploads with no files row, older than
+                        RECONCILE_GRACE_SECONDS (an upload writes its bytes
+                        before the row commits)
+  missing_uploads       files rows whose upload is gone from storage
+  indexed_without_vectors
+                        INDEXED rows with nothing in the vector store
+                        (other than files that split into zero chunks)
+
+With repair=True the first two are deleted and the INDEXED rows go back to
+PENDING with their resume checkpoint cleared, so they are rebuilt from the
+first chunk (the in-app job requeues them at once; from the CLI the next
+startup does).  Missing uploads are only reported — their vectors may still
+be serving answers.
+
+Nothing is loaded wholesale: upload storage is listed in batches
+(StorageBackend.list_keys), collections are walked one user at a time
+through VectorStore.iter_file_ids (a query iterator on Milvus, a cursor on
+FAISS), `files` rows are read in keyset batches on ix_files_user_id_id, and
+existence checks against the table go RECONCILE_BATCH_SIZE ids at a time.
+Only key names and, per user, the set of distinct file_ids are held,
+both bounded by the number of files, not chunks.
+
+Run on demand:
+    python -m src.utils.reconcile [--repair] [--batch-size 1000]
+
+or periodically inside the app with RECONCILE_INTERVAL_SECONDS > 0 (one
+worker at a time on PostgreSQL, via an advisory lock).
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set
+
+from dotenv import load_dotenv
+from sqlalchemy import func, select, update
+
+from src.database.config import AsyncSessionLocal, engine, try_advisory_lock
+from src.models.files import FileInputModel, IndexingStatus
+from src.utils.chunk_store import get_chunk_store
+from src.utils.embedding_spaces import stored_versions
+from src.utils.storage import get_storage
+from src.vectorstore import get_vector_store
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+RECONCILE_BATCH_SIZE       = int(os.getenv("RECONCILE_BATCH_SIZE", "1000"))
+RECONCILE_GRACE_SECONDS    = float(os.getenv("RECONCILE_GRACE_SECONDS", "3600"))
+RECONCILE_INTERVAL_SECONDS = float(os.getenv("RECONCILE_INTERVAL_SECONDS", "0"))
+RECONCILE_REPAIR           = os.getenv("RECONCILE_REPAIR", "false").lower() == "true"
+
+# Arbitrary, fixed key for pg_try_advisory_lock.
+_ADVISORY_LOCK_KEY = 0x5245434F4E
+
+
+@dataclass
+class ReconcileReport:
+    repaired:                bool = False
+    users:                   int  = 0
+    files_scanned:           int  = 0
+    storage_keys:            int  = 0
+    vector_orphans:          Dict[int, List[str]] = field(default_factory=dict)
+    storage_orphans:         List[str] = field(default_factory=list)
+    missing_uploads:         List[str] = field(default_factory=list)
+    indexed_without_vectors: List[str] = field(default_factory=list)
+    errors:                  List[str] = field(default_factory=list)
+    seconds:                 float = 0.0
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    def summary(self) -> str:
+        return (
+            f"{sum(map(len, self.vector_orphans.values()))} vector orphan(s), "
+            f"{len(self.storage_orphans)} storage orphan(s), "
+            f"{len(self.missing_uploads)} missing upload(s), "
+            f"{len(self.indexed_without_vectors)} indexed file(s) without vectors, "
+            f"{len(self.errors)} error(s)"
+        )
+
+
+def _batches(items: Iterable, size: int) -> Iterable[list]:
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def _known_file_ids(file_ids: Iterable[str], batch_size: int) -> Set[str]:
+    """The subset of `file_ids` that still have a files row."""
+    known: Set[str] = set()
+    async with AsyncSessionLocal() as db:
+        for batch in _batches(file_ids, batch_size):
+            rows = await db.execute(select(FileInputModel.file_id).where(FileInputModel.file_id.in_(batch)))
+            known.update(rows.scalars())
+    return known
+
+
+def _vector_file_ids(user_id: int, batch_size: int, versions: List[str]) -> Set[str]:
+    """file_ids present in any of the user's collection versions."""
+    found: Set[str] = set()
+    for version in versions:
+        for batch in get_vector_store().iter_file_ids(user_id, batch_size, version=version):
+            found.update(batch)
+    return found
+
+
+def _chunk_file_ids(user_id: int, batch_size: int) -> Set[str]:
+    """file_ids with text in the user's chunk store (CHUNK_TEXT_STORE=local)."""
+    found: Set[str] = set()
+    for batch in get_chunk_store().iter_file_ids(user_id, batch_size):
+        found.update(batch)
+    return found
+
+
+def _delete_vectors(user_id: int, file_id: str, versions: List[str]) -> None:
+    try:
+        for version in versions:
+            get_vector_store().delete_by_file(user_id, file_id, version=version)
+    finally:
+        get_chunk_store().delete_by_file(user_id, file_id)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Passes
+# ─────────────────────────────────────────────────────────────────────────────
+
+async def _scan_storage(report: ReconcileReport, batch_size: int, repair: bool) -> Set[str]:
+    """
+    Storage orphans, found a listing batch at a time: one files-table
+    lookup and one mtime lookup per batch.  Returns every listed key, for
+    the missing-upload check.
+    """
+    storage = get_storage()
+    cutoff  = time.time() - RECONCILE_GRACE_SECONDS
+    keys: Set[str] = set()
+
+    async for batch in storage.list_keys(batch_size):
+        report.storage_keys += len(batch)
+        stems   = {os.path.splitext(key)[0]: key for key in batch}
+        known   = await _known_file_ids(stems, batch_size)
+        unknown = [key for stem, key in stems.items() if stem not in known]
+        times   = await storage.modified_many(unknown) if unknown else {}
+        orphans = [key for key in unknown if key in times and times[key] < cutoff]
+        report.storage_orphans.extend(orphans)
+        if repair and orphans:
+            await storage.delete_many(orphans)
+        keys.update(batch)
+    return keys
+
+
+async def _scan_user(
+    user_id: int,
+    keys: Set[str],
+    stems: Set[str],
+    snapshot_id: int,
+    report: ReconcileReport,
+    batch_size: int,
+    repair: bool,
+) -> None:
+    versions = await stored_versions(user_id)
+    vectors  = await asyncio.to_thread(_vector_file_ids, user_id, batch_size, versions)
+    # Text left behind when a vector delete succeeded and the chunk-store
+    # one did not (or the other way round) is an orphan too.
+    stored   = await asyncio.to_thread(_chunk_file_ids, user_id, batch_size)
+    stale: List[str] = []
+
+    last_id = 0
+    async with AsyncSessionLocal() as db:
+        while True:
+            rows = (await db.execute(
+                select(
+                    FileInputModel.id, FileInputModel.file_id,
+                    FileInputModel.indexing_status, FileInputModel.storage_key,
+                    FileInputModel.indexed_chunks,
+                )
+                .where(FileInputModel.user_id == user_id, FileInputModel.id > last_id)
+                .order_by(FileInputModel.id)
+                .limit(batch_size)
+            )).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+            report.files_scanned += len(rows)
+
+            for row in rows:
+                has_vectors = row.file_id in vectors
+                vectors.discard(row.file_id)
+                stored.discard(row.file_id)
+                empty = row.indexed_chunks == 0
+                if row.indexing_status == IndexingStatus.INDEXED and not has_vectors and not empty:
+                    stale.append(row.file_id)
+                # Rows newer than the storage listing may have been uploaded after it.
+                if row.id <= snapshot_id:
+                    present = row.storage_key in keys if row.storage_key else row.file_id in stems
+                    if not present:
+                        report.missing_uploads.append(row.file_id)
+
+        report.indexed_without_vectors.extend(stale)
+        vectors |= stored
+        if vectors:
+            # Whatever was not claimed by a row is an orphan — unless its row
+            # was inserted after the walk passed it.
+            vectors -= await _known_file_ids(vectors, batch_size)
+        if vectors:
+            report.vector_orphans[user_id] = sorted(vectors)
+
+        if not repair:
+            return
+        for file_id in vectors:
+            try:
+                await asyncio.to_thread(_delete_vectors, user_id, file_id, versions)
+            except Exception as exc:
+                report.errors.append(f"user {user_id} file {file_id}: {exc}")
+        for batch in _batches(stale, batch_size):
+            await db.execute(
+                update(FileInputModel)
+                .where(
+                    FileInputModel.file_id.in_(batch),
+                    FileInputModel.indexing_status == IndexingStatus.INDEXED,
+                )
+                # Checkpoint cleared as by reindex?force=true: with it kept, the
+                # requeued run would resume past every chunk and rebuild nothing.
+                .values(
+                    indexing_status=IndexingStatus.PENDING,
+                    indexing_started_at=None,
+                    indexed_chunks=0,
+                    chunks_digest=None,
+                )
+            )
+        await db.commit()
+
+
+async def reconcile(repair: bool = False, batch_size: int = RECONCILE_BATCH_SIZE) -> ReconcileReport:
+    """One full pass over storage, then every user with files or a collection."""
+    report  = ReconcileReport(repaired=repair)
+    started = time.monotonic()
+
+    async with AsyncSessionLocal() as db:
+        snapshot_id = (await db.execute(select(func.coalesce(func.max(FileInputModel.id), 0)))).scalar_one()
+        db_users    = set((await db.execute(select(FileInputModel.user_id).distinct())).scalars())
+
+    try:
+        keys = await _scan_storage(report, batch_size, repair)
+    except Exception as exc:
+        logger.exception("Storage scan failed")
+        report.errors.append(f"storage: {exc}")
+        # Without a listing nothing can be called missing.
+        keys, snapshot_id = set(), 0
+    stems = {os.path.splitext(key)[0] for key in keys}
+
+    users = sorted(
+        db_users
+        | set(await asyncio.to_thread(get_vector_store().list_users))
+        | set(await asyncio.to_thread(get_chunk_store().list_users))
+    )
+    report.users = len(users)
+    for user_id in users:
+        try:
+            await _scan_user(user_id, keys, stems, snapshot_id, report, batch_size, repair)
+        except Exception as exc:
+            logger.exception("Reconciliation failed for user %s", user_id)
+            report.errors.append(f"user {user_id}: {exc}")
+
+    report.seconds = round(time.monotonic() - started, 3)
+    logger.info("Reconciliation %s: %s", "repaired" if repair else "found", report.summary())
+    return report
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Scheduled job
+# ─────────────────────────────────────────────────────────────────────────────
+
+class ReconcileJob:
+    """Runs reconcile() every RECONCILE_INTERVAL_SECONDS inside the app."""
+
+    def __init__(self, interval: float = RECONCILE_INTERVAL_SECONDS, repair: bool = RECONCILE_REPAIR) -> None:
+        self.interval = interval
+        self.repair   = repair
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self, requeue: Optional[Callable[[], Awaitable[int]]] = None) -> None:
+        """`requeue` resumes PENDING files after a repair (requeue_pending_files)."""
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run(requeue), name="reconcile")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self, requeue: Optional[Callable[[], Awaitable[int]]]) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                report = await self._run_once()
+                if report is not None and report.repaired and report.indexed_without_vectors and requeue:
+                    await requeue()
+            except Exception:
+                logger.exception("Scheduled reconciliation failed")
+
+    async def _run_once(self) -> Optional[ReconcileReport]:
+        # Every worker runs the job; the advisory lock lets only one scan.
+        async with try_advisory_lock(_ADVISORY_LOCK_KEY) as locked:
+            return await reconcile(self.repair) if locked else None
+
+
+reconcile_job = ReconcileJob()
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# CLI
+# ─────────────────────────────────────────────────────────────────────────────
+
+async def _main(repair: bool, batch_size: int) -> ReconcileReport:
+    try:
+        return await reconcile(repair, batch_size)
+    finally:
+        get_vector_store().close()
+        await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repair", action="store_true", help="delete orphans and requeue INDEXED files without vectors")
+    parser.add_argument("--batch-size", type=int, default=RECONCILE_BATCH_SIZE)
+    args = parser.parse_args()
+
+    report = asyncio.run(_main(args.repair, args.batch_size))
+    print(json.dumps(report.to_dict(), indent=2))
+    raise SystemExit(1 if report.errors else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,501 @@
+"""
+Background re-embedding for embedding-model migrations.
+
+Set EMBEDDING_MIGRATION_TARGET to a model name and every user is moved to
+it (src/utils/embedding_spaces.py explains the spaces and versions):
+
+  1. start    each user not on the target gets an embedding_states row
+              marked MIGRATING, with started_at = now.  From then on every
+              indexing batch is written to both spaces (write_spaces) while
+              queries keep using the active one.
+  2. settle   a user's copy waits until no file that began indexing before
+              started_at is still PROCESSING — those batches may have gone
+              to the old space only.  Files stuck longer than
+              INDEX_STALE_SECONDS (dead worker) are not waited for; they
+              resume with dual writes when requeued.
+  3. copy     the user's files are walked in files.id order from cursor_id.
+              Each file's stored chunks are read from the active collection
+              (get_by_file; text from the chunk store for compact rows),
+              embedded with the target model and upserted under the same
+              pks.  Progress is committed per file, so a restart resumes at
+              the cursor and a repeated file is overwritten, not duplicated.
+  4. switch   once the walk finds no more files, one UPDATE moves target_*
+              into active_* — queries flip to the new collection at once,
+              on other workers within EMBEDDING_STATE_TTL.
+  5. retire   the replaced collection is kept EMBEDDING_RETAIN_SECONDS for
+              rollback (set the target back to the old model), then dropped.
+
+Each file is one job in the indexing pool under the user's id, so live
+uploads keep their fair share, and the job sleeps to stay under
+EMBEDDING_MIGRATION_CHUNKS_PER_SEC.  Users advance round-robin, a few files
+each per round.  One worker at a time runs it (PostgreSQL advisory lock).
+
+Progress: GET /files/embedding-status (one user), GET /metrics/embedding-
+migration (all users) and the rag.embedding.migrated_chunks counter.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from dotenv import load_dotenv
+from sqlalchemy import func, or_, select, update
+
+from src.database.config import AsyncSessionLocal, try_advisory_lock
+from src.models.embedding import EmbeddingState, EmbeddingStatus
+from src.models.files import FileInputModel, IndexingStatus
+from src.models.users import User
+from src.utils.chunk_store import CHUNK_TEXT_STORE, get_chunk_store
+from src.utils.embedding_spaces import (
+    BASE_SPACE,
+    TARGET_SPACE,
+    EmbeddingSpace,
+    get_embeddings,
+    invalidate,
+)
+from src.utils.scheduler import index_scheduler
+from src.utils.telemetry import reembedded_chunks, stage
+from src.vectorstore import get_vector_store
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_MIGRATION_CHUNKS_PER_SEC   = float(os.getenv("EMBEDDING_MIGRATION_CHUNKS_PER_SEC", "200"))
+EMBEDDING_MIGRATION_INTERVAL_SECONDS = float(os.getenv("EMBEDDING_MIGRATION_INTERVAL_SECONDS", "10"))
+EMBEDDING_MIGRATION_BATCH_SIZE       = int(os.getenv("EMBEDDING_MIGRATION_BATCH_SIZE", "64"))
+EMBEDDING_RETAIN_SECONDS             = float(os.getenv("EMBEDDING_RETAIN_SECONDS", "86400"))
+INDEX_STALE_SECONDS                  = float(os.getenv("INDEX_STALE_SECONDS", "3600"))
+
+# Files re-embedded per user before moving on to the next user.
+_FILES_PER_TURN = 20
+# Users started (rows inserted) per statement.
+_INSERT_BATCH = 500
+
+# Arbitrary, fixed key for pg_try_advisory_lock.
+_ADVISORY_LOCK_KEY = 0x5245454D42
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _aware(value: Optional[datetime]) -> Optional[datetime]:
+    # SQLite hands back naive datetimes.
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Copying one file
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _reembed_file(user_id: int, file_id: str, source: EmbeddingSpace, target: EmbeddingSpace) -> int:
+    """Copy one file's chunks from `source` to `target`, re-embedded.  Returns chunks written."""
+    store = get_vector_store()
+    rows  = store.get_by_file(user_id, file_id, version=source.version)
+    if not rows:
+        return 0
+
+    texts = [row.page_content for row in rows]
+    if CHUNK_TEXT_STORE == "local":
+        compact = [row.metadata["pk"] for row in rows if not row.page_content]
+        stored  = get_chunk_store().get_many(user_id, compact) if compact else {}
+        texts   = [
+            text or (stored[row.metadata["pk"]].page_content if row.metadata["pk"] in stored else "")
+            for row, text in zip(rows, texts)
+        ]
+    keep = [i for i, text in enumerate(texts) if text]
+    if len(keep) < len(rows):
+        logger.warning("%d chunk(s) of file_id=%s have no stored text — not migrated", len(rows) - len(keep), file_id)
+
+    embedder = get_embeddings(target.model)
+    with stage("reembed", pipeline="reembed", file_id=file_id, chunks=len(keep), model=target.model):
+        for start in range(0, len(keep), EMBEDDING_MIGRATION_BATCH_SIZE):
+            batch   = keep[start:start + EMBEDDING_MIGRATION_BATCH_SIZE]
+            vectors = embedder.embed_documents([texts[i] for i in batch])
+            # Rows are written as read: compact rows stay compact.
+            store.add(user_id, [rows[i] for i in batch], vectors, version=target.version)
+    return len(keep)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Migration steps
+# ─────────────────────────────────────────────────────────────────────────────
+
+async def start_migrations(target: EmbeddingSpace) -> int:
+    """Point every user not yet on `target` at it.  Returns how many users started."""
+    store   = get_vector_store()
+    now     = _now()
+    started = 0
+    values  = dict(
+        status=EmbeddingStatus.MIGRATING,
+        target_model=target.model,
+        target_version=target.version,
+        cursor_id=0,
+        total_files=0,
+        migrated_files=0,
+        migrated_chunks=0,
+        error=None,
+        started_at=now,
+        finished_at=None,
+    )
+
+    async with AsyncSessionLocal() as db:
+        # Migrations toward an earlier target are abandoned with their
+        # half-written collections.
+        abandoned = (await db.execute(
+            select(EmbeddingState.user_id, EmbeddingState.target_version).where(
+                EmbeddingState.status == EmbeddingStatus.MIGRATING,
+                EmbeddingState.target_version != target.version,
+                EmbeddingState.active_version != EmbeddingState.target_version,
+            )
+        )).all()
+        for row in abandoned:
+            await asyncio.to_thread(store.drop, row.user_id, row.target_version)
+
+        result = await db.execute(
+            update(EmbeddingState)
+            .where(
+                EmbeddingState.active_version != target.version,
+                or_(
+                    EmbeddingState.status == EmbeddingStatus.ACTIVE,
+                    EmbeddingState.target_version != target.version,
+                ),
+            )
+            .values(**values)
+        )
+        started += result.rowcount
+        await db.commit()
+
+        # Users without a row are on the base model.
+        if target != BASE_SPACE:
+            while True:
+                missing = (await db.execute(
+                    select(User.id)
+                    .where(~select(EmbeddingState.user_id).where(EmbeddingState.user_id == User.id).exists())
+                    .order_by(User.id)
+                    .limit(_INSERT_BATCH)
+                )).scalars().all()
+                if not missing:
+                    break
+                db.add_all(
+                    EmbeddingState(
+                        user_id=user_id, active_model=BASE_SPACE.model, active_version=BASE_SPACE.version, **values,
+                    )
+                    for user_id in missing
+                )
+                await db.commit()
+                started += len(missing)
+
+    if started:
+        logger.info("Started migrating %d user(s) to embedding model '%s'", started, target.model)
+    return started
+
+
+async def _settled(db, user_id: int, since: Optional[datetime]) -> bool:
+    """No file that began indexing before `since` is still being indexed."""
+    stale = _now() - timedelta(seconds=INDEX_STALE_SECONDS)
+    pending = (await db.execute(
+        select(FileInputModel.id)
+        .where(
+            FileInputModel.user_id == user_id,
+            FileInputModel.indexing_status == IndexingStatus.PROCESSING,
+            FileInputModel.indexing_started_at < (since or _now()),
+            FileInputModel.indexing_started_at >= stale,
+        )
+        .limit(1)
+    )).first()
+    return pending is None
+
+
+async def _switch_over(db, state: EmbeddingState) -> None:
+    """Make the target active for one user — a single UPDATE."""
+    store = get_vector_store()
+    # A collection still retained from an earlier switchover goes now.
+    if state.previous_version is not None and state.previous_version not in (
+        state.active_version, state.target_version,
+    ):
+        await asyncio.to_thread(store.drop, state.user_id, state.previous_version)
+
+    result = await db.execute(
+        update(EmbeddingState)
+        .where(
+            EmbeddingState.user_id == state.user_id,
+            EmbeddingState.status == EmbeddingStatus.MIGRATING,
+            EmbeddingState.target_version == state.target_version,
+        )
+        # previous_version first: MySQL evaluates SET left to right.
+        .ordered_values(
+            (EmbeddingState.previous_version, EmbeddingState.active_version),
+            (EmbeddingState.active_model, EmbeddingState.target_model),
+            (EmbeddingState.active_version, EmbeddingState.target_version),
+            (EmbeddingState.target_model, None),
+            (EmbeddingState.target_version, None),
+            (EmbeddingState.status, EmbeddingStatus.ACTIVE),
+            (EmbeddingState.error, None),
+            (EmbeddingState.finished_at, _now()),
+        )
+    )
+    await db.commit()
+    invalidate(state.user_id)
+    if result.rowcount:
+        logger.info(
+            "user_id=%s switched to embedding model '%s' (%d chunks in %d files re-embedded)",
+            state.user_id, state.target_model, state.migrated_chunks, state.migrated_files,
+        )
+
+
+async def _advance(user_id: int) -> bool:
+    """
+    Re-embed up to _FILES_PER_TURN more of one user's files, or switch the
+    user over when none are left.  Returns whether anything was done.
+    """
+    store = get_vector_store()
+    async with AsyncSessionLocal() as db:
+        state = await db.get(EmbeddingState, user_id)
+        if state is None or state.status != EmbeddingStatus.MIGRATING:
+            return False
+        if not await _settled(db, user_id, _aware(state.started_at)):
+            return False
+
+        source = EmbeddingSpace(state.active_model, state.active_version)
+        target = EmbeddingSpace(state.target_model, state.target_version or "")
+        files  = (await db.execute(
+            select(FileInputModel.id, FileInputModel.file_id)
+            .where(FileInputModel.user_id == user_id, FileInputModel.id > state.cursor_id)
+            .order_by(FileInputModel.id)
+            .limit(_FILES_PER_TURN)
+        )).all()
+        if not files:
+            await _switch_over(db, state)
+            return True
+
+        total = (await db.execute(
+            select(func.count()).select_from(FileInputModel).where(FileInputModel.user_id == user_id)
+        )).scalar_one()
+        for row in files:
+            started = time.monotonic()
+            moved   = await index_scheduler.run(user_id, _reembed_file, user_id, row.file_id, source, target)
+
+            # Deleted while it was being copied: the delete may have missed
+            # the chunks just written to the target.
+            exists = (await db.execute(
+                select(FileInputModel.id).where(FileInputModel.id == row.id)
+            )).first()
+            if exists is None:
+                await asyncio.to_thread(store.delete_by_file, user_id, row.file_id, target.version)
+
+            await db.execute(
+                update(EmbeddingState)
+                .where(
+                    EmbeddingState.user_id == user_id,
+                    EmbeddingState.status == EmbeddingStatus.MIGRATING,
+                    EmbeddingState.target_version == target.version,
+                )
+                .values(
+                    cursor_id=row.id,
+                    total_files=total,
+                    migrated_files=EmbeddingState.migrated_files + 1,
+                    migrated_chunks=EmbeddingState.migrated_chunks + moved,
+                    error=None,
+                )
+            )
+            await db.commit()
+            reembedded_chunks.add(moved, {"model": target.model})
+
+            if EMBEDDING_MIGRATION_CHUNKS_PER_SEC > 0:
+                await asyncio.sleep(max(0.0, moved / EMBEDDING_MIGRATION_CHUNKS_PER_SEC - (time.monotonic() - started)))
+    return True
+
+
+async def retire_previous_versions(retain_seconds: float = EMBEDDING_RETAIN_SECONDS) -> int:
+    """Drop collections replaced more than `retain_seconds` ago.  Returns how many."""
+    store  = get_vector_store()
+    cutoff = _now() - timedelta(seconds=retain_seconds)
+    async with AsyncSessionLocal() as db:
+        rows = (await db.execute(
+            select(EmbeddingState.user_id, EmbeddingState.previous_version, EmbeddingState.active_version)
+            .where(
+                EmbeddingState.status == EmbeddingStatus.ACTIVE,
+                EmbeddingState.previous_version.is_not(None),
+                EmbeddingState.finished_at < cutoff,
+            )
+        )).all()
+        for row in rows:
+            if row.previous_version != row.active_version:
+                await asyncio.to_thread(store.drop, row.user_id, row.previous_version)
+            await db.execute(
+                update(EmbeddingState)
+                .where(
+                    EmbeddingState.user_id == row.user_id,
+                    EmbeddingState.previous_version == row.previous_version,
+                )
+                .values(previous_version=None)
+            )
+            await db.commit()
+            logger.info("Dropped retired embedding version '%s' of user_id=%s", row.previous_version, row.user_id)
+    return len(rows)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Progress
+# ─────────────────────────────────────────────────────────────────────────────
+
+def progress(user_id: int, state: Optional[EmbeddingState]) -> Dict:
+    """One user's migration state, as returned by GET /files/embedding-status."""
+    if state is None:
+        return {
+            "user_id":         user_id,
+            "status":          EmbeddingStatus.ACTIVE.value,
+            "active_model":    BASE_SPACE.model,
+            "target_model":    None,
+            "total_files":     0,
+            "migrated_files":  0,
+            "migrated_chunks": 0,
+            "chunks_per_sec":  0.0,
+            "started_at":      None,
+            "finished_at":     None,
+            "error":           None,
+        }
+    started  = _aware(state.started_at)
+    finished = _aware(state.finished_at)
+    elapsed  = ((finished or _now()) - started).total_seconds() if started else 0.0
+    return {
+        "user_id":         user_id,
+        "status":          state.status.value,
+        "active_model":    state.active_model,
+        "target_model":    state.target_model,
+        "total_files":     state.total_files,
+        "migrated_files":  state.migrated_files,
+        "migrated_chunks": state.migrated_chunks,
+        "chunks_per_sec":  round(state.migrated_chunks / elapsed, 2) if elapsed > 0 else 0.0,
+        "started_at":      started,
+        "finished_at":     finished,
+        "error":           state.error,
+    }
+
+
+async def migration_summary() -> Dict:
+    """Totals over every user, for GET /metrics/embedding-migration."""
+    async with AsyncSessionLocal() as db:
+        by_model = (await db.execute(
+            select(EmbeddingState.active_model, func.count())
+            .group_by(EmbeddingState.active_model)
+        )).all()
+        migrating = (await db.execute(
+            select(
+                func.count(),
+                func.coalesce(func.sum(EmbeddingState.total_files), 0),
+                func.coalesce(func.sum(EmbeddingState.migrated_files), 0),
+                func.coalesce(func.sum(EmbeddingState.migrated_chunks), 0),
+                func.min(EmbeddingState.started_at),
+            ).where(EmbeddingState.status == EmbeddingStatus.MIGRATING)
+        )).one()
+        failing = (await db.execute(
+            select(func.count()).select_from(EmbeddingState).where(
+                EmbeddingState.status == EmbeddingStatus.MIGRATING,
+                EmbeddingState.error.is_not(None),
+            )
+        )).scalar_one()
+
+    users, total_files, migrated_files, migrated_chunks, since = migrating
+    since   = _aware(since)
+    elapsed = (_now() - since).total_seconds() if since else 0.0
+    return {
+        "target_model":    TARGET_SPACE.model if TARGET_SPACE else None,
+        "users_by_model":  {model: count for model, count in by_model},
+        "migrating_users": users,
+        "failing_users":   failing,
+        "total_files":     int(total_files),
+        "migrated_files":  int(migrated_files),
+        "migrated_chunks": int(migrated_chunks),
+        "chunks_per_sec":  round(migrated_chunks / elapsed, 2) if elapsed > 0 else 0.0,
+        "started_at":      since,
+    }
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Background job
+# ─────────────────────────────────────────────────────────────────────────────
+
+class ReembedJob:
+    """
+    Drives migrations inside the app: starts users on the configured
+    target, advances them round-robin, retires replaced collections.
+    Sleeps EMBEDDING_MIGRATION_INTERVAL_SECONDS whenever a round does no work;
+    busy rounds follow each other directly (the copy paces itself), but
+    starting new users and retiring collections — both full-table scans —
+    still happen at most once per interval.
+    """
+
+    def __init__(
+        self,
+        target: Optional[EmbeddingSpace] = TARGET_SPACE,
+        interval: float = EMBEDDING_MIGRATION_INTERVAL_SECONDS,
+    ) -> None:
+        self.target   = target
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+        # monotonic time of the last start_migrations / retire pass
+        self._maintained_at: Optional[float] = None
+
+    def start(self) -> None:
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run(), name="reembed")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            busy = False
+            try:
+                async with try_advisory_lock(_ADVISORY_LOCK_KEY) as locked:
+                    if locked:
+                        busy = await self._run_once()
+            except Exception:
+                logger.exception("Embedding migration round failed")
+            if not busy:
+                await asyncio.sleep(self.interval)
+
+    async def _run_once(self) -> bool:
+        # Users created since the last pass start migrating too.
+        now = time.monotonic()
+        if self._maintained_at is None or now - self._maintained_at >= self.interval:
+            self._maintained_at = now
+            if self.target is not None:
+                await start_migrations(self.target)
+            await retire_previous_versions()
+
+        async with AsyncSessionLocal() as db:
+            user_ids: List[int] = (await db.execute(
+                select(EmbeddingState.user_id)
+                .where(EmbeddingState.status == EmbeddingStatus.MIGRATING)
+                .order_by(EmbeddingState.updated_at)
+            )).scalars().all()
+
+        busy = False
+        for user_id in user_ids:
+            try:
+                busy |= await _advance(user_id)
+            except Exception as exc:
+                logger.exception("Embedding migration failed for user_id=%s", user_id)
+                async with AsyncSessionLocal() as db:
+                    await db.execute(
+                        update(EmbeddingState).where(EmbeddingState.user_id == user_id).values(error=str(exc))
+                    )
+                    await db.commit()
+        return busy
+
+
+reembed_job = ReembedJob()
@@ -0,0 +1,147 @@
+"""
+Compact container for retrieval results.
+
+Retrieval used to hand back a list of (Document, score) tuples; rendering
+then went through every Document's metadata dict, built a "file:chunk"
+string key per chunk for de-duplication and a dict per source, and the
+router rebuilt those dicts as models.
+
+RetrievedChunks keeps the same information as parallel columns instead —
+plain lists for strings, typed arrays for numbers — in one slotted object
+per query:
+
+  ids          vector-store primary keys
+  texts        chunk (or parent section) text
+  scores       array('d')  re-ranker or dense score, see `scorer`
+  file_ids     owning file
+  file_names
+  chunk_idx    array('q')
+  section_ids  array('q')  parent DocumentSection id, -1 if none
+  metadata     the original metadata dicts, by reference — only
+               /rag/retrieve reads them
+
+`scorer` says which of the two produced `scores` for this query: DENSE
+(cosine similarity, roughly 0..1) or RERANK (CrossEncoder logits, unbounded).
+The scales differ, so scores are only comparable within one scorer.
+
+render() produces the prompt context and the de-duplicated sources list in
+a single pass.
+"""
+
+from __future__ import annotations
+
+from array import array
+from typing import Dict, Iterable, Iterator, List, Sequence, Tuple
+
+from langchain_core.documents import Document
+
+from src.vectorstore import SearchHit
+
+NO_SECTION = -1
+
+DENSE  = "dense"
+RERANK = "rerank"
+
+_SEPARATOR = "\n\n---\n\n"
+
+
+class RetrievedChunks:
+    """Ranked chunks for one query, best first, stored column-wise."""
+
+    __slots__ = (
+        "ids", "texts", "scores", "scorer", "file_ids", "file_names", "chunk_idx", "section_ids", "metadata",
+    )
+
+    def __init__(self, scorer: str = DENSE) -> None:
+        self.ids:         List[str]  = []
+        self.texts:       List[str]  = []
+        self.scores:      array      = array("d")
+        self.scorer:      str        = scorer
+        self.file_ids:    List[str]  = []
+        self.file_names:  List[str]  = []
+        self.chunk_idx:   array      = array("q")
+        self.section_ids: array      = array("q")
+        self.metadata:    List[Dict] = []
+
+    # ── Construction ─────────────────────────────────────────────────────────
+
+    def append(self, id: str, document: Document, score: float) -> None:
+        meta = document.metadata
+        self.ids.append(id)
+        self.texts.append(document.page_content)
+        self.scores.append(score)
+        self.file_ids.append(meta.get("file_id", ""))
+        self.file_names.append(meta.get("file_name", "unknown"))
+        self.chunk_idx.append(int(meta.get("chunk_idx", 0)))
+        self.section_ids.append(int(meta.get("section_id", NO_SECTION)))
+        self.metadata.append(meta)
+
+    @classmethod
+    def from_hits(cls, hits: Iterable[SearchHit], scores: Iterable[float], scorer: str) -> "RetrievedChunks":
+        chunks = cls(scorer)
+        for hit, score in zip(hits, scores):
+            chunks.append(hit.id, hit.document, float(score))
+        return chunks
+
+    def take(self, order: Sequence[int]) -> "RetrievedChunks":
+        """A new RetrievedChunks holding rows `order`, in that order."""
+        out = RetrievedChunks(self.scorer)
+        out.ids         = [self.ids[i] for i in order]
+        out.texts       = [self.texts[i] for i in order]
+        out.scores      = array("d", (self.scores[i] for i in order))
+        out.file_ids    = [self.file_ids[i] for i in order]
+        out.file_names  = [self.file_names[i] for i in order]
+        out.chunk_idx   = array("q", (self.chunk_idx[i] for i in order))
+        out.section_ids = array("q", (self.section_ids[i] for i in order))
+        out.metadata    = [self.metadata[i] for i in order]
+        return out
+
+    def with_sections(self, content: Dict[int, str]) -> "RetrievedChunks":
+        """
+        Swap child text for its parent section's.  Siblings collapse into
+        the first (best-scoring) child so a section appears once; rows
+        without a known section pass through unchanged.
+        """
+        keep, seen = [], set()
+        for i, section_id in enumerate(self.section_ids):
+            if section_id not in content:
+                keep.append(i)
+            elif section_id not in seen:
+                seen.add(section_id)
+                keep.append(i)
+        out = self.take(keep)
+        for row, section_id in enumerate(out.section_ids):
+            if section_id in content:
+                out.texts[row] = content[section_id]
+        return out
+
+    # ── Access ───────────────────────────────────────────────────────────────
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def pairs(self) -> Iterator[Tuple[Document, float]]:
+        """(Document, score) view, for callers that still want Documents."""
+        for text, meta, score in zip(self.texts, self.metadata, self.scores):
+            yield Document(page_content=text, metadata=meta), score
+
+    def render(self) -> Tuple[str, List[Dict]]:
+        """
+        Prompt context and de-duplicated sources in one pass.  Header and
+        text are appended as separate parts and joined once; the only
+        per-row allocation besides the header is the (file, chunk) key.
+        """
+        parts: List[str]  = []
+        sources: List[Dict] = []
+        seen = set()
+        for i, text in enumerate(self.texts):
+            file_name, file_id, chunk_idx = self.file_names[i], self.file_ids[i], self.chunk_idx[i]
+            if i:
+                parts.append(_SEPARATOR)
+            parts.append(f"[Source: {file_name}, chunk {chunk_idx}, score {self.scores[i]:.3f}]\n")
+            parts.append(text)
+            key = (file_id, chunk_idx)
+            if key not in seen:
+                seen.add(key)
+                sources.append({"file_name": file_name, "file_id": file_id, "chunk_idx": chunk_idx})
+        return "".join(parts), sources
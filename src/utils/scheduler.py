@@ -0,0 +1,130 @@
+"""
+Weighted fair scheduling of blocking RAG work.
+
+Retrieval (embed → search → re-rank) and indexing (load, split, embed +
+store per batch) used to go straight to asyncio.to_thread, so whoever
+submitted the most jobs got the most threads.  Each now runs through a
+FairScheduler with its own small executor:
+
+  retrieval   RETRIEVAL_WORKERS slots — one job per query
+  indexing    INDEX_WORKERS slots     — one job per load / split / batch
+
+When every slot is busy, jobs wait in a start-time fair queue: a user's
+job is tagged max(virtual time, that user's previous finish tag) and the
+smallest tag runs next, advancing by cost / weight.  A user with a
+hundred queued batches therefore takes turns with a user who just
+arrived instead of finishing first.
+
+A slot is held until the job's thread finishes, not until its caller stops
+waiting: a cancelled caller (client gone) does not free a slot whose
+thread is still running.  Jobs run in a copy of the caller's context, so
+telemetry spans opened inside them join the request's trace.
+
+Time spent waiting is recorded in rag.scheduler.queue_time (ms, attr
+`pool`); rag.scheduler.queued is the current backlog.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import heapq
+import itertools
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Tuple
+
+from dotenv import load_dotenv
+
+from src.utils.telemetry import queue_depth, queue_time
+
+load_dotenv()
+
+RETRIEVAL_WORKERS = int(os.getenv("RETRIEVAL_WORKERS", "4"))
+INDEX_WORKERS     = int(os.getenv("INDEX_WORKERS", "2"))
+
+# Finish tags at or below the virtual clock carry no backlog; drop them past this.
+_MAX_USERS = 10_000
+
+
+class FairScheduler:
+    """Start-time fair queuing in front of a bounded thread pool."""
+
+    def __init__(self, name: str, workers: int) -> None:
+        self.name     = name
+        self.workers  = workers
+        self._attrs   = {"pool": name}
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"{name}-")
+        self._busy    = 0
+        self._vtime   = 0.0
+        self._finish: Dict[int, float] = {}
+        self._queue:  List[Tuple[float, int, asyncio.Future]] = []
+        self._seq     = itertools.count()
+
+    async def run(
+        self,
+        user_id: int,
+        fn: Callable[..., Any],
+        *args: Any,
+        cost: float = 1.0,
+        weight: float = 1.0,
+    ) -> Any:
+        """Run `fn(*args)` in the pool once it is `user_id`'s turn."""
+        enqueued = time.perf_counter()
+        start    = max(self._vtime, self._finish.get(user_id, 0.0))
+        self._finish[user_id] = start + cost / weight
+
+        if self._busy < self.workers and not self._queue:
+            self._busy += 1
+        else:
+            turn = asyncio.get_running_loop().create_future()
+            heapq.heappush(self._queue, (start, next(self._seq), turn))
+            queue_depth.add(1, self._attrs)
+            try:
+                await turn
+            except asyncio.CancelledError:
+                # Handed a slot in the same tick we were cancelled: pass it on.
+                if turn.done() and not turn.cancelled():
+                    self._release()
+                raise
+            finally:
+                queue_depth.add(-1, self._attrs)
+
+        queue_time.record((time.perf_counter() - enqueued) * 1000, self._attrs)
+        loop = asyncio.get_running_loop()
+        try:
+            job = self._executor.submit(contextvars.copy_context().run, fn, *args)
+        except BaseException:
+            self._release()
+            raise
+        # Released when the thread is done (or the job is cancelled before
+        # it started) — never merely because the awaiting task went away.
+        job.add_done_callback(lambda _: self._release_threadsafe(loop))
+        return await asyncio.wrap_future(job)
+
+    def _release_threadsafe(self, loop: asyncio.AbstractEventLoop) -> None:
+        try:
+            loop.call_soon_threadsafe(self._release)
+        except RuntimeError:
+            pass  # loop already closed (shutdown)
+
+    def _release(self) -> None:
+        """Hand the finished job's slot to the next queued job, if any."""
+        while self._queue:
+            start, _, turn = heapq.heappop(self._queue)
+            if turn.cancelled():
+                continue
+            self._vtime = max(self._vtime, start)
+            turn.set_result(None)
+            return
+        self._busy -= 1
+        if len(self._finish) > _MAX_USERS:
+            self._finish = {u: tag for u, tag in self._finish.items() if tag > self._vtime}
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+retrieval_scheduler = FairScheduler("retrieval", RETRIEVAL_WORKERS)
+index_scheduler     = FairScheduler("indexing", INDEX_WORKERS)
@@ -0,0 +1,173 @@
+"""
+Indexing-status pub/sub.
+
+index_file_task publishes every status transition (PENDING → PROCESSING →
+INDEXED / FAILED) plus coarse progress while a file is being embedded.
+GET /files/status/stream subscribes per user and pushes those events to the
+client, so upload UIs no longer poll /files/status/{file_id}.
+
+Cross-worker delivery
+─────────────────────
+Indexing runs in whichever worker accepted the upload, but the client's
+event stream may be connected to any other worker.  Every event is
+delivered to the publishing worker's own subscribers directly.  With a
+PostgreSQL DATABASE_URL it is also sent through `pg_notify` on the
+`file_status` channel, over each worker's one LISTEN connection (no pool
+checkout per event), and that connection fans other workers'
+notifications out to local subscribers.  Events carry the worker's origin
+id so a worker skips its own.  On any other database, or while the LISTEN
+connection is reconnecting, events reach the local worker only.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import uuid
+from collections import defaultdict
+from typing import Dict, Iterator, Optional, Set
+
+from dotenv import load_dotenv
+from sqlalchemy.engine import make_url
+
+from src.database.config import DATABASE_URL
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+STATUS_CHANNEL        = "file_status"
+STATUS_QUEUE_SIZE     = int(os.getenv("STATUS_QUEUE_SIZE", "256"))
+STATUS_RECONNECT_SECS = 5.0
+
+# NOTIFY payloads are capped at 8000 bytes; error text is the only unbounded field.
+_MAX_ERROR_CHARS = 1000
+
+
+class StatusBroker:
+    """Per-user fan-out of indexing-status events to asyncio queues."""
+
+    def __init__(self) -> None:
+        self._subscribers: Dict[int, Set[asyncio.Queue]] = defaultdict(set)
+        self._listen_task: Optional[asyncio.Task] = None
+        # The live LISTEN connection, also used to NOTIFY; one query at a time.
+        self._conn = None
+        self._conn_lock = asyncio.Lock()
+        # Set again in start(): workers forked from one parent need their own.
+        self._origin = uuid.uuid4().hex
+
+    # ── Subscribing ──────────────────────────────────────────────────────────
+
+    @contextlib.contextmanager
+    def subscribe(self, user_id: int) -> Iterator[asyncio.Queue]:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=STATUS_QUEUE_SIZE)
+        self._subscribers[user_id].add(queue)
+        try:
+            yield queue
+        finally:
+            subs = self._subscribers.get(user_id)
+            if subs is not None:
+                subs.discard(queue)
+                if not subs:
+                    del self._subscribers[user_id]
+
+    def _dispatch(self, event: dict) -> None:
+        for queue in self._subscribers.get(event["user_id"], ()):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Slow consumer — drop its oldest event rather than block indexing.
+                queue.get_nowait()
+                queue.put_nowait(event)
+
+    # ── Publishing ───────────────────────────────────────────────────────────
+
+    async def publish(
+        self,
+        user_id: int,
+        file_id: str,
+        status: str,
+        file_name: Optional[str] = None,
+        progress: Optional[float] = None,
+        error: Optional[str] = None,
+    ) -> None:
+        event = {
+            "user_id":   user_id,
+            "file_id":   file_id,
+            "file_name": file_name,
+            "status":    status,
+            "progress":  round(progress, 3) if progress is not None else None,
+            "error":     error[:_MAX_ERROR_CHARS] if error else None,
+        }
+
+        self._dispatch(event)
+
+        conn = self._conn
+        if conn is None or conn.is_closed():
+            return
+        try:
+            async with self._conn_lock:
+                await conn.execute(
+                    "SELECT pg_notify($1, $2)", STATUS_CHANNEL, json.dumps({**event, "origin": self._origin}),
+                )
+        except Exception as exc:
+            logger.warning("pg_notify failed, delivered locally only: %s", exc)
+
+    # ── LISTEN connection lifecycle ──────────────────────────────────────────
+
+    async def start(self) -> None:
+        """Start the LISTEN loop when running on PostgreSQL; no-op otherwise."""
+        url = make_url(DATABASE_URL)
+        if url.get_backend_name() != "postgresql":
+            logger.info("Status events: in-process delivery only (%s)", url.get_backend_name())
+            return
+        self._origin      = uuid.uuid4().hex
+        self._listen_task = asyncio.create_task(self._listen_forever(url))
+
+    async def stop(self) -> None:
+        if self._listen_task:
+            self._listen_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._listen_task
+            self._listen_task = None
+
+    def _on_notify(self, _conn, _pid, _channel, payload: str) -> None:
+        try:
+            event = json.loads(payload)
+            # Already dispatched locally by publish().
+            if event.pop("origin", None) != self._origin:
+                self._dispatch(event)
+        except Exception as exc:
+            logger.warning("Dropping malformed status notification: %s", exc)
+
+    async def _listen_forever(self, url) -> None:
+        import asyncpg
+
+        dsn = url.set(drivername="postgresql").render_as_string(hide_password=False)
+        while True:
+            conn = None
+            try:
+                conn = await asyncpg.connect(dsn)
+                lost = asyncio.Event()
+                conn.add_termination_listener(lambda _c: lost.set())
+                await conn.add_listener(STATUS_CHANNEL, self._on_notify)
+                self._conn = conn
+                logger.info("Listening for status events on channel '%s'", STATUS_CHANNEL)
+                await lost.wait()
+                logger.warning("Status LISTEN connection lost — reconnecting")
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.error("Status LISTEN connection failed: %s", exc)
+            finally:
+                self._conn = None
+                if conn is not None and not conn.is_closed():
+                    with contextlib.suppress(Exception):
+                        await conn.close()
+            await asyncio.sleep(STATUS_RECONNECT_SECS)
+
+
+status_broker = StatusBroker()
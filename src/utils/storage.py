@@ -0,0 +1,179 @@
+"""
+Uploaded-file storage.
+
+Routers and the indexing task talk to a StorageBackend by key
+("<file_id><ext>", recorded in files.storage_key) instead of touching
+UPLOAD_DIRECTORY directly, so:
+
+  • no blocking open()/write()/remove() runs on the event loop — the
+    local backend does its file I/O in worker threads, which matters on
+    network-mounted volumes where each call can take milliseconds;
+  • nothing probes ALLOWED_EXTENSIONS to find a file — the key is stored;
+  • an object-store backend only has to implement the same six methods.
+    local_copy() exists for that case: document loaders need a real path,
+    so a remote backend downloads to a temp file for the duration.
+
+STORAGE_BACKEND=local (the only built-in backend) stores files under
+UPLOAD_DIRECTORY.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import os
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from typing import AsyncIterator, Dict, Iterable, Iterator, List
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+STORAGE_BACKEND  = os.getenv("STORAGE_BACKEND", "local").lower()
+UPLOAD_DIRECTORY = os.getenv("UPLOAD_DIRECTORY", "uploads")
+
+
+def storage_key(file_id: str, file_ext: str) -> str:
+    return f"{file_id}{file_ext}"
+
+
+class StorageBackend(ABC):
+    """Async blob storage keyed by storage_key()."""
+
+    name: str = "base"
+
+    @abstractmethod
+    async def put(self, key: str, data: bytes) -> None:
+        """Store `data` under `key`, replacing any existing object."""
+
+    @abstractmethod
+    async def delete(self, key: str) -> bool:
+        """Remove `key`.  Returns False if it did not exist."""
+
+    @abstractmethod
+    async def exists(self, key: str) -> bool:
+        """Whether `key` is stored."""
+
+    @abstractmethod
+    def local_copy(self, key: str) -> contextlib.AbstractAsyncContextManager[str]:
+        """Async context manager yielding a filesystem path with the object's bytes."""
+
+    @abstractmethod
+    def list_keys(self, batch_size: int = 1000) -> AsyncIterator[List[str]]:
+        """Every stored key, `batch_size` at a time (used by reconciliation)."""
+
+    @abstractmethod
+    async def modified_at(self, key: str) -> float | None:
+        """Last-write time of `key` (epoch seconds), None if it does not exist."""
+
+    async def modified_many(self, keys: Iterable[str]) -> Dict[str, float]:
+        """key → last-write time for every key that exists, looked up concurrently."""
+        keys  = list(keys)
+        times = await asyncio.gather(*(self.modified_at(key) for key in keys))
+        return {key: mtime for key, mtime in zip(keys, times) if mtime is not None}
+
+    async def delete_many(self, keys: Iterable[str]) -> int:
+        """Delete several keys concurrently.  Returns how many existed."""
+        results = await asyncio.gather(*(self.delete(key) for key in keys))
+        return sum(results)
+
+
+class LocalStorage(StorageBackend):
+    """Files under a local (or network-mounted) directory, I/O off the loop."""
+
+    name = "local"
+
+    def __init__(self, root: str = UPLOAD_DIRECTORY) -> None:
+        self.root = root
+
+    def _path(self, key: str) -> str:
+        if os.path.basename(key) != key:
+            raise ValueError(f"Invalid storage key: {key!r}")
+        return os.path.join(self.root, key)
+
+    def _write(self, key: str, data: bytes) -> None:
+        os.makedirs(self.root, exist_ok=True)
+        # Write then rename, so a crash never leaves a truncated upload behind.
+        path = self._path(key)
+        tmp  = f"{path}.part"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def _remove(self, key: str) -> bool:
+        try:
+            os.remove(self._path(key))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def _scan(self, batch_size: int) -> Iterator[List[str]]:
+        try:
+            entries = os.scandir(self.root)
+        except FileNotFoundError:
+            return
+        with entries:
+            batch: List[str] = []
+            for e in entries:
+                if e.is_file() and not e.name.endswith(".part"):
+                    batch.append(e.name)
+                    if len(batch) >= batch_size:
+                        yield batch
+                        batch = []
+            if batch:
+                yield batch
+
+    def _stat_many(self, keys: List[str]) -> Dict[str, float]:
+        times: Dict[str, float] = {}
+        for key in keys:
+            try:
+                times[key] = os.stat(self._path(key)).st_mtime
+            except FileNotFoundError:
+                pass
+        return times
+
+    async def put(self, key: str, data: bytes) -> None:
+        await asyncio.to_thread(self._write, key, data)
+
+    async def delete(self, key: str) -> bool:
+        return await asyncio.to_thread(self._remove, key)
+
+    async def exists(self, key: str) -> bool:
+        return await asyncio.to_thread(os.path.exists, self._path(key))
+
+    @contextlib.asynccontextmanager
+    async def local_copy(self, key: str) -> AsyncIterator[str]:
+        # Already on a filesystem — hand out the real path.
+        yield self._path(key)
+
+    async def list_keys(self, batch_size: int = 1000) -> AsyncIterator[List[str]]:
+        # One scandir walk, advanced a batch per worker-thread hop, so a huge
+        # directory is neither listed in one go nor walked on the loop.
+        batches = self._scan(batch_size)
+        try:
+            while True:
+                batch = await asyncio.to_thread(next, batches, None)
+                if batch is None:
+                    return
+                yield batch
+        finally:
+            batches.close()
+
+    async def modified_at(self, key: str) -> float | None:
+        try:
+            return (await asyncio.to_thread(os.stat, self._path(key))).st_mtime
+        except FileNotFoundError:
+            return None
+
+    async def modified_many(self, keys: Iterable[str]) -> Dict[str, float]:
+        # One thread hop for the whole batch instead of one per key.
+        return await asyncio.to_thread(self._stat_many, list(keys))
+
+
+@lru_cache(maxsize=1)
+def get_storage() -> StorageBackend:
+    """The process-wide backend selected by STORAGE_BACKEND."""
+    if STORAGE_BACKEND == "local":
+        return LocalStorage()
+    raise ValueError(f"Unknown STORAGE_BACKEND '{STORAGE_BACKEND}' (expected 'local')")
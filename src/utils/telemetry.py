@@ -0,0 +1,334 @@
+"""
+Tracing & metrics for the RAG pipeline (OpenTelemetry).
+
+What is recorded
+────────────────
+  rag.<stage> spans + rag.stage.duration histogram (ms, attr `stage`)
+      query:  embed, search, diversify, hydrate, rerank, sections, retrieval,
+              prompt, llm_first_token, llm, generate (whole non-streaming
+              answer), stream (whole stream)
+      index:  load, split, embed, store, index
+      reembed: reembed (one file moved to a new embedding model)
+  db.query spans + db.query.duration histogram — every SQL statement, via
+      SQLAlchemy cursor events on the shared engine
+  http.server.duration histogram + one server span per request
+  rag.indexing.chunks / rag.indexing.files counters
+  rag.scheduler.queue_time histogram + rag.scheduler.queued backlog (attr
+      `pool`: retrieval / indexing) — see src/utils/scheduler.py
+  rag.ratelimit.rejected counter (attr `route_class`)
+  rag.embedding.migrated_chunks counter (attr `model`) — see
+      src/utils/reembed.py
+
+Where it goes
+─────────────
+  GET /metrics                       Prometheus text format, always on
+  OTEL_EXPORTER_OTLP_ENDPOINT=...    OTLP/gRPC traces + metrics
+  TELEMETRY_CONSOLE=true             spans & metrics printed to stdout
+  TELEMETRY_FILE=telemetry.jsonl     spans & metrics appended as JSON lines,
+                                     for offline analysis without a collector
+
+Instruments are created at import time against the global OTel API, which
+proxies to the real providers once setup_telemetry() runs at startup — so
+providers (and their exporter threads) are created in the serving process,
+after any pre-fork.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import logging
+import os
+import time
+from typing import Dict, Iterator, Optional
+
+from dotenv import load_dotenv
+from opentelemetry import metrics, trace
+from opentelemetry.sdk.metrics import Histogram, MeterProvider
+from opentelemetry.sdk.metrics.export import (
+    ConsoleMetricExporter,
+    HistogramDataPoint,
+    InMemoryMetricReader,
+    MetricReader,
+    PeriodicExportingMetricReader,
+)
+from opentelemetry.sdk.metrics.view import ExplicitBucketHistogramAggregation, View
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+from opentelemetry.trace import SpanKind, Status, StatusCode
+from sqlalchemy import event
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+OTEL_SERVICE_NAME  = os.getenv("OTEL_SERVICE_NAME", "any-doc-rag")
+OTLP_ENDPOINT      = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT")
+TELEMETRY_CONSOLE  = os.getenv("TELEMETRY_CONSOLE", "false").lower() == "true"
+TELEMETRY_FILE     = os.getenv("TELEMETRY_FILE")
+METRIC_EXPORT_MS   = int(os.getenv("TELEMETRY_EXPORT_INTERVAL_MS", "15000"))
+
+# Millisecond buckets covering a sub-ms DB hit up to a slow LLM answer.
+_MS_BUCKETS = [1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000]
+
+tracer = trace.get_tracer("src.rag")
+meter  = metrics.get_meter("src.rag")
+
+stage_duration = meter.create_histogram(
+    "rag.stage.duration", unit="ms", description="Duration of one RAG pipeline stage",
+)
+db_duration = meter.create_histogram(
+    "db.query.duration", unit="ms", description="Duration of one SQL statement",
+)
+http_duration = meter.create_histogram(
+    "http.server.duration", unit="ms", description="Duration of one HTTP request",
+)
+indexed_chunks = meter.create_counter(
+    "rag.indexing.chunks", description="Chunks embedded and stored",
+)
+indexed_files = meter.create_counter(
+    "rag.indexing.files", description="Files that finished indexing, by status",
+)
+queue_time = meter.create_histogram(
+    "rag.scheduler.queue_time", unit="ms", description="Time a job waited for a fair-scheduler slot",
+)
+queue_depth = meter.create_up_down_counter(
+    "rag.scheduler.queued", description="Jobs waiting for a fair-scheduler slot",
+)
+reembedded_chunks = meter.create_counter(
+    "rag.embedding.migrated_chunks", description="Chunks re-embedded into a new embedding model's collection",
+)
+rate_limited = meter.create_counter(
+    "rag.ratelimit.rejected", description="Requests rejected with 429 by the per-user rate limiter",
+)
+
+_prometheus_reader: Optional[InMemoryMetricReader] = None
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Stage instrumentation
+# ─────────────────────────────────────────────────────────────────────────────
+
+@contextlib.contextmanager
+def stage(
+    name: str,
+    timings: Optional[Dict[str, float]] = None,
+    **attributes,
+) -> Iterator[trace.Span]:
+    """
+    Time one pipeline stage: opens a `rag.<name>` span, records the duration
+    in the rag.stage.duration histogram and, if given, adds it to
+    `timings["<name>_ms"]` (used by the streaming `timings` event).
+    """
+    start = time.perf_counter()
+    with tracer.start_as_current_span(f"rag.{name}", attributes=attributes) as span:
+        try:
+            yield span
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            stage_duration.record(elapsed, {"stage": name})
+            if timings is not None:
+                # Accumulate: a stage may run more than once per request.
+                key = f"{name}_ms"
+                timings[key] = round(timings.get(key, 0.0) + elapsed, 2)
+
+
+def record_stage(name: str, elapsed_ms: float, timings: Optional[Dict[str, float]] = None) -> None:
+    """Record a duration measured by hand (e.g. time-to-first-token)."""
+    stage_duration.record(elapsed_ms, {"stage": name})
+    if timings is not None:
+        timings[f"{name}_ms"] = round(elapsed_ms, 2)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# SQLAlchemy & HTTP instrumentation
+# ─────────────────────────────────────────────────────────────────────────────
+
+def instrument_engine(engine) -> None:
+    """Emit a db.query span and histogram sample for every SQL statement."""
+    sync_engine = getattr(engine, "sync_engine", engine)
+    system      = sync_engine.dialect.name
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        span = tracer.start_span(
+            "db.query",
+            kind=SpanKind.CLIENT,
+            attributes={"db.system": system, "db.statement": statement[:1000]},
+        )
+        conn.info.setdefault("_otel", []).append((span, time.perf_counter()))
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        stack = conn.info.get("_otel")
+        if stack:
+            span, start = stack.pop()
+            db_duration.record((time.perf_counter() - start) * 1000, {"db.system": system})
+            span.end()
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _error(exception_context):
+        conn  = exception_context.connection
+        stack = conn.info.get("_otel") if conn is not None else None
+        if stack:
+            span, _ = stack.pop()
+            span.set_status(Status(StatusCode.ERROR, str(exception_context.original_exception)))
+            span.end()
+
+
+_UNMATCHED_ROUTE = "<unmatched>"
+
+
+async def telemetry_middleware(request, call_next):
+    """
+    One server span + duration sample per request, labelled by route template.
+    Requests that match no route (404 scans, typos) share the "<unmatched>"
+    label, so arbitrary paths can't blow up metric cardinality.  For
+    streaming responses this measures time until the response starts; the
+    stream itself is covered by the `stream` stage.
+    """
+    start = time.perf_counter()
+    with tracer.start_as_current_span(request.method, kind=SpanKind.SERVER) as span:
+        status_code = 500
+        try:
+            response    = await call_next(request)
+            status_code = response.status_code
+            return response
+        finally:
+            route = request.scope.get("route")
+            path  = getattr(route, "path", _UNMATCHED_ROUTE)
+            span.update_name(f"{request.method} {path}")
+            span.set_attribute("http.status_code", status_code)
+            http_duration.record(
+                (time.perf_counter() - start) * 1000,
+                {"http.method": request.method, "http.route": path, "http.status_code": status_code},
+            )
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Provider setup
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _jsonl_formatter(item) -> str:
+    return item.to_json(indent=None) + "\n"
+
+
+def setup_telemetry(engine=None) -> None:
+    """Install tracer & meter providers with the configured exporters."""
+    global _prometheus_reader
+
+    resource = Resource.create({"service.name": OTEL_SERVICE_NAME})
+
+    tracer_provider = TracerProvider(resource=resource)
+    readers: list[MetricReader] = []
+
+    _prometheus_reader = InMemoryMetricReader()
+    readers.append(_prometheus_reader)
+
+    if OTLP_ENDPOINT:
+        from opentelemetry.exporter.otlp.proto.grpc.metric_exporter import OTLPMetricExporter
+        from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
+
+        tracer_provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+        readers.append(PeriodicExportingMetricReader(OTLPMetricExporter(), METRIC_EXPORT_MS))
+
+    if TELEMETRY_CONSOLE:
+        tracer_provider.add_span_processor(BatchSpanProcessor(ConsoleSpanExporter()))
+        readers.append(PeriodicExportingMetricReader(ConsoleMetricExporter(), METRIC_EXPORT_MS))
+
+    if TELEMETRY_FILE:
+        out = open(TELEMETRY_FILE, "a", buffering=1)
+        tracer_provider.add_span_processor(
+            BatchSpanProcessor(ConsoleSpanExporter(out=out, formatter=_jsonl_formatter))
+        )
+        readers.append(PeriodicExportingMetricReader(
+            ConsoleMetricExporter(out=out, formatter=_jsonl_formatter), METRIC_EXPORT_MS,
+        ))
+
+    meter_provider = MeterProvider(
+        resource=resource,
+        metric_readers=readers,
+        views=[View(instrument_type=Histogram, aggregation=ExplicitBucketHistogramAggregation(_MS_BUCKETS))],
+    )
+    trace.set_tracer_provider(tracer_provider)
+    metrics.set_meter_provider(meter_provider)
+
+    if engine is not None:
+        instrument_engine(engine)
+
+    logger.info(
+        "Telemetry ready (otlp=%s, console=%s, file=%s)",
+        bool(OTLP_ENDPOINT), TELEMETRY_CONSOLE, TELEMETRY_FILE or "-",
+    )
+
+
+def shutdown_telemetry() -> None:
+    for provider in (trace.get_tracer_provider(), metrics.get_meter_provider()):
+        shutdown = getattr(provider, "shutdown", None)
+        if shutdown:
+            with contextlib.suppress(Exception):
+                shutdown()
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Prometheus exposition
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _prom_name(name: str, unit: str) -> str:
+    base = name.replace(".", "_").replace("-", "_")
+    if unit == "ms":
+        base += "_milliseconds"
+    return base
+
+
+def _prom_labels(attributes, extra: Optional[Dict[str, str]] = None) -> str:
+    labels = {**{k.replace(".", "_"): v for k, v in (attributes or {}).items()}, **(extra or {})}
+    if not labels:
+        return ""
+    body = ",".join(
+        f'{k}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+        for k, v in sorted(labels.items())
+    )
+    return "{" + body + "}"
+
+
+def render_prometheus() -> str:
+    """Collect current metrics and render them in Prometheus text format."""
+    if _prometheus_reader is None:
+        return ""
+    data = _prometheus_reader.get_metrics_data()
+    if data is None:
+        return ""
+
+    lines: list[str] = []
+    for resource_metrics in data.resource_metrics:
+        for scope_metrics in resource_metrics.scope_metrics:
+            for metric in scope_metrics.metrics:
+                name   = _prom_name(metric.name, metric.unit)
+                points = metric.data.data_points
+                if not points:
+                    continue
+
+                if isinstance(points[0], HistogramDataPoint):
+                    lines.append(f"# HELP {name} {metric.description}")
+                    lines.append(f"# TYPE {name} histogram")
+                    for point in points:
+                        cumulative = 0
+                        for bound, count in zip(point.explicit_bounds, point.bucket_counts):
+                            cumulative += count
+                            lines.append(f"{name}_bucket{_prom_labels(point.attributes, {'le': repr(float(bound))})} {cumulative}")
+                        lines.append(f"{name}_bucket{_prom_labels(point.attributes, {'le': '+Inf'})} {point.count}")
+                        lines.append(f"{name}_sum{_prom_labels(point.attributes)} {point.sum}")
+                        lines.append(f"{name}_count{_prom_labels(point.attributes)} {point.count}")
+                    continue
+
+                monotonic = getattr(metric.data, "is_monotonic", False)
+                kind      = "counter" if monotonic else "gauge"
+                if monotonic:
+                    name += "_total"
+                lines.append(f"# HELP {name} {metric.description}")
+                lines.append(f"# TYPE {name} {kind}")
+                for point in points:
+                    lines.append(f"{name}{_prom_labels(point.attributes)} {point.value}")
+
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,57 @@
+"""
+Pluggable vector-store backends.
+
+  VECTOR_BACKEND=milvus   (default) Milvus at MILVUS_URI
+  VECTOR_BACKEND=faiss    embedded FAISS, per-user indexes under FAISS_INDEX_DIR
+
+Backends are imported lazily so a FAISS-only deployment never needs a
+reachable Milvus, and vice versa.
+"""
+
+import os
+from functools import lru_cache
+
+from dotenv import load_dotenv
+
+from src.vectorstore.base import (
+    FILTERABLE_METADATA,
+    SearchFilter,
+    SearchHit,
+    VectorStore,
+    chunk_id,
+    collection_name,
+    parse_collection_name,
+)
+
+load_dotenv()
+
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "milvus").lower()
+
+
+def create_vector_store(backend: str) -> VectorStore:
+    if backend == "milvus":
+        from src.vectorstore.milvus_store import MilvusVectorStore
+        return MilvusVectorStore()
+    if backend == "faiss":
+        from src.vectorstore.faiss_store import FaissVectorStore
+        return FaissVectorStore()
+    raise ValueError(f"Unknown VECTOR_BACKEND '{backend}' (expected 'milvus' or 'faiss')")
+
+
+@lru_cache(maxsize=1)
+def get_vector_store() -> VectorStore:
+    """The process-wide store selected by VECTOR_BACKEND."""
+    return create_vector_store(VECTOR_BACKEND)
+
+
+__all__ = [
+    "FILTERABLE_METADATA",
+    "SearchFilter",
+    "SearchHit",
+    "VectorStore",
+    "chunk_id",
+    "collection_name",
+    "create_vector_store",
+    "get_vector_store",
+    "parse_collection_name",
+]
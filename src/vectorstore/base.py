@@ -0,0 +1,179 @@
+"""
+Vector-store interface shared by every backend.
+
+Stores work on pre-computed vectors — embedding happens in src/utils/rag.py
+— and always report `score` as a similarity where higher is better, whatever
+the backend's native metric.
+
+Each user's chunks live in a collection per embedding-model version
+(collection_name): the base model's is plain user_{id}, any other model's
+user_{id}__{version}.  Every method takes `version` ("" = base) so a
+migration can write, read and search both side by side.
+
+Chunk primary keys are deterministic (chunk_id), and add() has upsert
+semantics, so re-indexing a file — or resuming one that failed halfway —
+overwrites the rows it already wrote instead of duplicating them.
+
+Searches can be restricted with a SearchFilter (file ids + equality on a
+few metadata keys).  Backends apply it inside the ANN search itself, so
+top-k is taken over the matching chunks only.
+"""
+
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Sequence, Set, Tuple, Union
+
+import numpy as np
+import xxhash
+from langchain_core.documents import Document
+
+
+def collection_name(user_id: int, version: str = "") -> str:
+    """
+    Every user gets a private collection / index per embedding version:
+    user_{id} for the base model, user_{id}__{version} otherwise.
+    """
+    return f"user_{user_id}__{version}" if version else f"user_{user_id}"
+
+
+def parse_collection_name(name: str) -> Optional[Tuple[int, str]]:
+    """(user_id, version) for a name made by collection_name, else None."""
+    if not name.startswith("user_"):
+        return None
+    user, _, version = name[len("user_"):].partition("__")
+    return (int(user), version) if user.isdigit() else None
+
+
+def chunk_id(file_id: str, chunk_idx: int, text: str) -> str:
+    """
+    Primary key of a chunk: "<file_id>:<chunk_idx>:<xxh3-64 of the text>".
+    The same file split the same way always yields the same ids.
+    """
+    return f"{file_id}:{chunk_idx}:{xxhash.xxh3_64_hexdigest(text.encode())}"
+
+
+# Metadata keys a SearchFilter may match on.  They are kept on every
+# vector-store row (including compact rows, see src/utils/chunk_store.py).
+FILTERABLE_METADATA = ("file_name", "kind", "page", "heading", "chunk_idx")
+
+Scalar = Union[str, int, float, bool]
+
+
+@dataclass(slots=True)
+class SearchFilter:
+    """
+    file_ids  chunks must belong to one of these files
+    metadata  key → value (equality) or list of values (any of), for keys
+              in FILTERABLE_METADATA
+    """
+    file_ids: Optional[List[str]] = None
+    metadata: Dict[str, Union[Scalar, List[Scalar]]] = field(default_factory=dict)
+
+    def __post_init__(self) -> None:
+        unknown = set(self.metadata) - set(FILTERABLE_METADATA)
+        if unknown:
+            raise ValueError(f"Cannot filter on metadata key(s): {', '.join(sorted(unknown))}")
+
+    def __bool__(self) -> bool:
+        return self.file_ids is not None or bool(self.metadata)
+
+
+@dataclass(slots=True)
+class SearchHit:
+    id:       str
+    score:    float
+    document: Document
+    vector:   Optional[np.ndarray] = None
+
+
+class VectorStore(ABC):
+    """Per-user vector storage: add / search / delete-by-file / count."""
+
+    name: str = "base"
+
+    @abstractmethod
+    def add(
+        self,
+        user_id: int,
+        chunks: Sequence[Document],
+        vectors: Sequence[Sequence[float]],
+        version: str = "",
+    ) -> int:
+        """
+        Store chunks with their embeddings, keyed by metadata["pk"].  Rows
+        whose pk already exists are replaced (upsert).  Returns the number
+        written.
+        """
+
+    @abstractmethod
+    def search(
+        self,
+        user_id: int,
+        vector: Sequence[float],
+        k: int,
+        with_vectors: bool = False,
+        filter: Optional[SearchFilter] = None,
+        version: str = "",
+    ) -> List[SearchHit]:
+        """Top-k chunks by similarity to `vector` among those matching `filter`, best first."""
+
+    def search_many(
+        self,
+        user_id: int,
+        vectors: Sequence[Sequence[float]],
+        k: int,
+        with_vectors: bool = False,
+        filter: Optional[SearchFilter] = None,
+        version: str = "",
+    ) -> List[List[SearchHit]]:
+        """
+        One result list per query vector, in order.  Backends override this
+        with a single multi-vector request; the default just loops.
+        """
+        return [self.search(user_id, vector, k, with_vectors, filter, version) for vector in vectors]
+
+    @abstractmethod
+    def get_by_file(self, user_id: int, file_id: str, version: str = "") -> List[Document]:
+        """
+        Every stored chunk of `file_id`, without vectors, pk in metadata.
+        Compact rows (CHUNK_TEXT_STORE=local) come back without text.
+        """
+
+    @abstractmethod
+    def delete_by_file(self, user_id: int, file_id: str, version: str = "") -> int:
+        """Remove every chunk of `file_id`.  Returns the number deleted."""
+
+    @abstractmethod
+    def count(self, user_id: int, version: str = "") -> int:
+        """Number of chunks stored for the user (0 if nothing was ever indexed)."""
+
+    @abstractmethod
+    def drop(self, user_id: int, version: str = "") -> None:
+        """Remove the whole collection (a retired embedding version)."""
+
+    def unsupported_metadata(self, user_id: int, keys: Sequence[str], version: str = "") -> Set[str]:
+        """
+        The subset of `keys` the user's collection cannot store or filter
+        on.  Only fixed-schema collections (created before dynamic fields)
+        have any; a collection that doesn't exist yet has none.
+        """
+        return set()
+
+    # ── Enumeration (reconciliation) ─────────────────────────────────────────
+
+    @abstractmethod
+    def list_users(self) -> List[int]:
+        """Ids of every user that has a collection (in any version)."""
+
+    @abstractmethod
+    def iter_file_ids(self, user_id: int, batch_size: int = 1000, version: str = "") -> Iterator[List[str]]:
+        """
+        Stream the file_ids present in the user's collection, one batch at a
+        time, without loading all rows.  A file_id may appear in more than
+        one batch; callers de-duplicate.
+        """
+
+    def close(self) -> None:
+        """Release connections / file handles.  Optional."""
@@ -0,0 +1,515 @@
+"""
+Embedded FAISS backend — no Milvus cluster needed.
+
+Layout on disk (one directory per user under FAISS_INDEX_DIR):
+
+  user_{id}/segments.json manifest: the live segment files, each with the
+                          contiguous int64 id range it covers and its size
+  user_{id}/seg_*.faiss   IndexIDMap2(IndexFlatIP) segments over
+                          unit-normalised vectors, so inner product ==
+                          cosine similarity
+  user_{id}/meta.sqlite   one row per vector: int64 id, pk, file_id,
+                          chunk_idx, text and JSON metadata
+  user_{id}/.lock         inter-process write lock
+
+Non-base embedding versions use user_{id}__{version}/ with the same files.
+A directory from before segments holds a single index.faiss; it is read
+as one segment and folded into the manifest on the next write.
+
+The index is an append-only segment log.  add() writes its batch as a new
+segment instead of rewriting everything stored so far, and adjacent
+segments are merged binary-counter style (the newest into its neighbour
+while it is at least as large), so there are O(log n) segments and
+indexing a file costs O(n log n) vector writes, not O(n²).  A segment is
+never modified in place: removals (upserts, deletes) write a new copy of
+just the segments holding those ids, then the manifest is atomically
+replaced and the old files deleted.
+
+meta.sqlite is committed before the segments change.  A vector whose row
+is gone is skipped by search, and a row whose vector was never written is
+never found; a retried add() of the same pks replaces both.
+
+Reads memory-map the segments (IO_FLAG_MMAP_IFC where the installed FAISS
+supports mmap for flat codes), so many workers share one copy of the
+vectors through the page cache and an idle user's index costs no heap.
+Readers notice a replaced manifest and re-map.
+
+SearchFilters are resolved against meta.sqlite into the matching int64 ids
+and handed to FAISS as an IDSelectorBatch, so the flat scan only scores
+those vectors.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import threading
+import uuid
+from dataclasses import asdict, dataclass
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import faiss
+import numpy as np
+from dotenv import load_dotenv
+from filelock import FileLock
+from langchain_core.documents import Document
+
+from src.vectorstore.base import SearchFilter, SearchHit, VectorStore, collection_name, parse_collection_name
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+FAISS_INDEX_DIR = os.getenv("FAISS_INDEX_DIR", "./faiss_indexes")
+
+_MMAP_FLAGS = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+
+# SQLite's default host-parameter limit is 999 on older builds.
+_LOOKUP_BATCH = 500
+
+# Metadata keys kept in their own sqlite columns rather than the JSON blob.
+_COLUMNS = {"pk", "file_id", "chunk_idx"}
+
+_MANIFEST = "segments.json"
+_LEGACY   = "index.faiss"
+
+# Highest int64 id: the id range of a legacy index.faiss is unknown to readers.
+_MAX_ID = 2**63 - 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS chunks (
+    id        INTEGER PRIMARY KEY AUTOINCREMENT,
+    pk        TEXT UNIQUE NOT NULL,
+    file_id   TEXT NOT NULL,
+    chunk_idx INTEGER NOT NULL,
+    text      TEXT NOT NULL,
+    metadata  TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_chunks_file_id ON chunks (file_id);
+"""
+
+
+def _normalise(vectors: Sequence[Sequence[float]]) -> np.ndarray:
+    # Always copy: normalize_L2 works in place on a C-contiguous buffer.
+    array = np.array(vectors, dtype=np.float32, order="C", copy=True)
+    if array.ndim == 1:
+        array = array[None, :]
+    faiss.normalize_L2(array)
+    return array
+
+
+@dataclass(slots=True)
+class _Segment:
+    file:  str
+    lo:    int      # id range covered (inclusive); ids are never reused
+    hi:    int
+    count: int
+
+
+def _flat_vectors(index: faiss.Index) -> Tuple[np.ndarray, np.ndarray]:
+    """(vectors, ids) held by an IndexIDMap2(IndexFlatIP)."""
+    ids = faiss.vector_to_array(index.id_map).astype(np.int64)
+    return faiss.downcast_index(index.index).reconstruct_n(0, index.ntotal), ids
+
+
+class FaissVectorStore(VectorStore):
+    name = "faiss"
+
+    def __init__(self, root: str = FAISS_INDEX_DIR) -> None:
+        self.root   = root
+        self._lock  = threading.Lock()
+        # collection → (manifest stamp, [(segment, read-only mmapped index)])
+        self._readers: Dict[str, Tuple[tuple, List[Tuple[_Segment, faiss.Index]]]] = {}
+
+    # ── Paths & handles ──────────────────────────────────────────────────────
+
+    # Helpers take the collection name (collection_name(user_id, version)).
+
+    def _dir(self, name: str) -> str:
+        return os.path.join(self.root, name)
+
+    def _path(self, name: str, file: str) -> str:
+        return os.path.join(self._dir(name), file)
+
+    def _db(self, name: str) -> sqlite3.Connection:
+        conn = sqlite3.connect(os.path.join(self._dir(name), "meta.sqlite"))
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(_SCHEMA)
+        return conn
+
+    def _write_lock(self, name: str) -> FileLock:
+        os.makedirs(self._dir(name), exist_ok=True)
+        return FileLock(os.path.join(self._dir(name), ".lock"))
+
+    def _stamp(self, name: str) -> tuple | None:
+        """Identity of the current manifest (a replace changes the inode)."""
+        for file in (_MANIFEST, _LEGACY):
+            try:
+                st = os.stat(self._path(name, file))
+            except FileNotFoundError:
+                continue
+            return (file, st.st_ino, st.st_mtime_ns)
+        return None
+
+    def _segments(self, name: str) -> List[_Segment]:
+        try:
+            with open(self._path(name, _MANIFEST)) as f:
+                return [_Segment(**seg) for seg in json.load(f)["segments"]]
+        except FileNotFoundError:
+            pass
+        if not os.path.exists(self._path(name, _LEGACY)):
+            return []
+        return [_Segment(_LEGACY, 0, _MAX_ID, -1)]
+
+    def _reader(self, name: str) -> List[Tuple[_Segment, faiss.Index]]:
+        """Memory-mapped, read-only segments; re-mapped whenever the manifest changes."""
+        error: Exception | None = None
+        for _ in range(3):
+            stamp = self._stamp(name)
+            if stamp is None:
+                return []
+            cached = self._readers.get(name)
+            if cached and cached[0] == stamp:
+                return cached[1]
+
+            with self._lock:
+                cached = self._readers.get(name)
+                if cached and cached[0] == stamp:
+                    return cached[1]
+                try:
+                    opened = [
+                        (seg, faiss.read_index(self._path(name, seg.file), _MMAP_FLAGS))
+                        for seg in self._segments(name)
+                    ]
+                except RuntimeError as exc:
+                    # A writer replaced the manifest and deleted a segment
+                    # between our reads — look again.
+                    error = exc
+                    continue
+                self._readers[name] = (stamp, opened)
+                return opened
+        raise error
+
+    def _write_segment(self, name: str, index: faiss.Index, lo: int, hi: int) -> _Segment:
+        file = f"seg_{lo}_{hi}_{uuid.uuid4().hex[:8]}.faiss"
+        tmp  = self._path(name, f"{file}.tmp")
+        faiss.write_index(index, tmp)
+        os.replace(tmp, self._path(name, file))
+        return _Segment(file, lo, hi, int(index.ntotal))
+
+    def _write_manifest(self, name: str, segments: List[_Segment]) -> None:
+        path = self._path(name, _MANIFEST)
+        tmp  = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"segments": [asdict(seg) for seg in segments]}, f)
+        os.replace(tmp, path)
+
+    def _update_vectors(
+        self,
+        name: str,
+        removed: Sequence[int] = (),
+        array: Optional[np.ndarray] = None,
+        ids: Sequence[int] = (),
+    ) -> None:
+        """
+        Remove `removed` ids and append (`array`, `ids`) as a new segment,
+        then merge.  Call with the write lock held.
+        """
+        old      = self._segments(name)
+        removed  = np.asarray(sorted(removed), dtype=np.int64)
+        segments: List[_Segment] = []
+        # Segments written by this call, loaded writable, by file name.
+        loaded: Dict[str, faiss.Index] = {}
+
+        def writable(seg: _Segment) -> faiss.Index:
+            if seg.file in loaded:
+                return loaded[seg.file]
+            return faiss.read_index(self._path(name, seg.file))
+
+        for seg in old:
+            if seg.file == _LEGACY:
+                # Fold the pre-segment index into the manifest with its real range.
+                index = writable(seg)
+                held  = faiss.vector_to_array(index.id_map)
+                seg   = _Segment(_LEGACY, 0, int(held.max()) if held.size else 0, int(index.ntotal))
+                loaded[_LEGACY] = index
+            hit = removed[(removed >= seg.lo) & (removed <= seg.hi)]
+            if hit.size:
+                index = writable(seg)
+                if index.remove_ids(hit) > 0:
+                    if index.ntotal == 0:
+                        continue
+                    seg = self._write_segment(name, index, seg.lo, seg.hi)
+                    loaded[seg.file] = index
+            if seg.count:
+                segments.append(seg)
+
+        if array is not None and len(ids):
+            tail = faiss.IndexIDMap2(faiss.IndexFlatIP(array.shape[1]))
+            tail.add_with_ids(array, np.asarray(ids, dtype=np.int64))
+            lo, hi = int(min(ids)), int(max(ids))
+            # Merge into the neighbour while the tail is at least as large;
+            # only the final result is written.
+            while segments and tail.ntotal >= segments[-1].count:
+                left   = segments.pop()
+                merged = faiss.IndexIDMap2(faiss.IndexFlatIP(array.shape[1]))
+                for part in (writable(left), tail):
+                    merged.add_with_ids(*_flat_vectors(part))
+                tail, lo = merged, left.lo
+            seg = self._write_segment(name, tail, lo, hi)
+            loaded[seg.file] = tail
+            segments.append(seg)
+
+        live = {seg.file for seg in segments}
+        if [seg.file for seg in segments] == [seg.file for seg in old]:
+            return
+        self._write_manifest(name, segments)
+        for file in {seg.file for seg in old} | set(loaded):
+            if file not in live:
+                try:
+                    os.remove(self._path(name, file))
+                except FileNotFoundError:
+                    pass
+
+    def _filtered_ids(self, name: str, filter: SearchFilter) -> np.ndarray:
+        clauses, params = [], []
+        if filter.file_ids is not None:
+            clauses.append(f"file_id IN ({','.join('?' * len(filter.file_ids))})")
+            params.extend(filter.file_ids)
+        for key, value in filter.metadata.items():
+            column = key if key in _COLUMNS else f"json_extract(metadata, '$.{key}')"
+            values = value if isinstance(value, list) else [value]
+            clauses.append(f"{column} IN ({','.join('?' * len(values))})")
+            params.extend(values)
+
+        conn = self._db(name)
+        try:
+            rows = conn.execute(f"SELECT id FROM chunks WHERE {' AND '.join(clauses)}", params).fetchall()
+        finally:
+            conn.close()
+        return np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows))
+
+    # ── VectorStore API ──────────────────────────────────────────────────────
+
+    def add(
+        self,
+        user_id: int,
+        chunks: Sequence[Document],
+        vectors: Sequence[Sequence[float]],
+        version: str = "",
+    ) -> int:
+        if not chunks:
+            return 0
+        name  = collection_name(user_id, version)
+        array = _normalise(vectors)
+
+        pks = [chunk.metadata.get("pk") or str(uuid.uuid4()) for chunk in chunks]
+
+        with self._write_lock(name):
+            conn = self._db(name)
+            try:
+                # Upsert: drop rows (and below, vectors) already stored under these pks.
+                replaced = []
+                for start in range(0, len(pks), _LOOKUP_BATCH):
+                    batch = pks[start:start + _LOOKUP_BATCH]
+                    marks = ",".join("?" * len(batch))
+                    replaced += [r[0] for r in conn.execute(f"SELECT id FROM chunks WHERE pk IN ({marks})", batch)]
+                if replaced:
+                    conn.executemany("DELETE FROM chunks WHERE id = ?", ((i,) for i in replaced))
+
+                ids = []
+                for chunk, pk in zip(chunks, pks):
+                    meta = chunk.metadata
+                    cur  = conn.execute(
+                        "INSERT INTO chunks (pk, file_id, chunk_idx, text, metadata) VALUES (?, ?, ?, ?, ?)",
+                        (
+                            pk,
+                            meta.get("file_id", ""),
+                            int(meta.get("chunk_idx", 0)),
+                            chunk.page_content,
+                            json.dumps({k: v for k, v in meta.items() if k not in _COLUMNS}),
+                        ),
+                    )
+                    ids.append(cur.lastrowid)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                conn.close()
+
+            self._update_vectors(name, replaced, array, ids)
+
+        return len(ids)
+
+    def search(
+        self,
+        user_id: int,
+        vector: Sequence[float],
+        k: int,
+        with_vectors: bool = False,
+        filter: Optional[SearchFilter] = None,
+        version: str = "",
+    ) -> List[SearchHit]:
+        return self.search_many(user_id, [vector], k, with_vectors, filter, version)[0]
+
+    def search_many(
+        self,
+        user_id: int,
+        vectors: Sequence[Sequence[float]],
+        k: int,
+        with_vectors: bool = False,
+        filter: Optional[SearchFilter] = None,
+        version: str = "",
+    ) -> List[List[SearchHit]]:
+        name     = collection_name(user_id, version)
+        empty    = [[] for _ in vectors]
+        segments = [(seg, index) for seg, index in self._reader(name) if index.ntotal]
+        if not segments:
+            return empty
+
+        params = None
+        if filter:
+            allowed = self._filtered_ids(name, filter)
+            if allowed.size == 0:
+                return empty
+            k      = min(k, int(allowed.size))
+            params = faiss.SearchParameters(sel=faiss.IDSelectorBatch(allowed))
+
+        # One BLAS-backed search over the whole query matrix per segment,
+        # then each query's best k across segments.
+        queries = _normalise(vectors)
+        found: List[List[Tuple[int, float, faiss.Index]]] = [[] for _ in vectors]
+        for _, index in segments:
+            scores, ids = index.search(queries, min(k, int(index.ntotal)), params=params)
+            for row, id_row, score_row in zip(found, ids, scores):
+                row.extend((int(i), float(s), index) for i, s in zip(id_row, score_row) if i >= 0)
+        if len(segments) > 1:
+            found = [sorted(row, key=lambda hit: hit[1], reverse=True)[:k] for row in found]
+        unique = sorted({i for row in found for i, _, _ in row})
+        if not unique:
+            return empty
+
+        rows = {}
+        conn = self._db(name)
+        try:
+            # One metadata lookup for every query's hits.
+            for offset in range(0, len(unique), 500):
+                batch = unique[offset:offset + 500]
+                marks = ",".join("?" * len(batch))
+                rows.update(
+                    (row[0], row[1:])
+                    for row in conn.execute(
+                        f"SELECT id, pk, file_id, chunk_idx, text, metadata FROM chunks WHERE id IN ({marks})",
+                        batch,
+                    )
+                )
+        finally:
+            conn.close()
+
+        batches = []
+        for row_hits in found:
+            hits = []
+            for int_id, score, index in row_hits:
+                row = rows.get(int_id)
+                if row is None:
+                    continue        # vector written but its metadata rolled back
+                pk, file_id, chunk_idx, text, metadata = row
+                meta = json.loads(metadata)
+                meta.update({"file_id": file_id, "chunk_idx": chunk_idx})
+                hits.append(SearchHit(
+                    id=pk,
+                    score=score,
+                    document=Document(page_content=text, metadata=meta),
+                    vector=index.reconstruct(int_id) if with_vectors else None,
+                ))
+            batches.append(hits)
+        return batches
+
+    def get_by_file(self, user_id: int, file_id: str, version: str = "") -> List[Document]:
+        name = collection_name(user_id, version)
+        if not os.path.exists(os.path.join(self._dir(name), "meta.sqlite")):
+            return []
+        conn = self._db(name)
+        try:
+            rows = conn.execute(
+                "SELECT pk, chunk_idx, text, metadata FROM chunks WHERE file_id = ? ORDER BY chunk_idx", (file_id,),
+            ).fetchall()
+        finally:
+            conn.close()
+        docs = []
+        for pk, chunk_idx, text, metadata in rows:
+            meta = json.loads(metadata)
+            meta.update({"pk": pk, "file_id": file_id, "chunk_idx": chunk_idx})
+            docs.append(Document(page_content=text, metadata=meta))
+        return docs
+
+    def delete_by_file(self, user_id: int, file_id: str, version: str = "") -> int:
+        name = collection_name(user_id, version)
+        if not os.path.exists(os.path.join(self._dir(name), "meta.sqlite")):
+            return 0
+
+        with self._write_lock(name):
+            conn = self._db(name)
+            try:
+                ids = [r[0] for r in conn.execute("SELECT id FROM chunks WHERE file_id = ?", (file_id,))]
+                if not ids:
+                    return 0
+                conn.execute("DELETE FROM chunks WHERE file_id = ?", (file_id,))
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                conn.close()
+
+            self._update_vectors(name, ids)
+
+        return len(ids)
+
+    def count(self, user_id: int, version: str = "") -> int:
+        return sum(int(index.ntotal) for _, index in self._reader(collection_name(user_id, version)))
+
+    def drop(self, user_id: int, version: str = "") -> None:
+        name = collection_name(user_id, version)
+        if not os.path.isdir(self._dir(name)):
+            return
+        with self._write_lock(name):
+            with self._lock:
+                self._readers.pop(name, None)
+            for entry in os.listdir(self._dir(name)):
+                if entry != ".lock":
+                    os.remove(os.path.join(self._dir(name), entry))
+        shutil.rmtree(self._dir(name), ignore_errors=True)
+        logger.info("Dropped FAISS index '%s'", name)
+
+    def list_users(self) -> List[int]:
+        try:
+            with os.scandir(self.root) as entries:
+                parsed = [parse_collection_name(e.name) for e in entries if e.is_dir()]
+        except FileNotFoundError:
+            return []
+        return sorted({p[0] for p in parsed if p is not None})
+
+    def iter_file_ids(self, user_id: int, batch_size: int = 1000, version: str = "") -> Iterator[List[str]]:
+        name = collection_name(user_id, version)
+        if not os.path.exists(os.path.join(self._dir(name), "meta.sqlite")):
+            return
+        conn = self._db(name)
+        try:
+            # DISTINCT is answered from ix_chunks_file_id; fetchmany keeps the
+            # result set on the sqlite side.
+            cursor = conn.execute("SELECT DISTINCT file_id FROM chunks")
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield [r[0] for r in rows]
+        finally:
+            conn.close()
+
+    def close(self) -> None:
+        self._readers.clear()
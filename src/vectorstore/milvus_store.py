@@ -0,0 +1,300 @@
+"""
+Milvus backend.
+
+Talks to Milvus through pymilvus' MilvusClient for every operation, so
+search can return stored vectors and deletes can use scalar expressions.
+
+Collections created here use the same field names langchain-milvus used
+(pk / text / vector + metadata), so collections indexed before this
+backend existed keep working.  New collections enable dynamic fields so
+extra metadata needs no schema change; for older, fixed-schema collections
+rows are trimmed to the fields the collection actually has.
+
+SearchFilters are compiled into a boolean expression passed to the search
+call, so Milvus filters during the ANN search.  file_id carries an INVERTED
+scalar index (added on first use to collections created without one).
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import uuid
+from typing import Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+from dotenv import load_dotenv
+from langchain_core.documents import Document
+from pymilvus import DataType, MilvusClient
+
+from src.vectorstore.base import SearchFilter, SearchHit, VectorStore, collection_name, parse_collection_name
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+MILVUS_URI         = os.getenv("MILVUS_URI", "http://localhost:19530")
+MILVUS_METRIC_TYPE = os.getenv("MILVUS_METRIC_TYPE", "L2")
+
+# Fields that are part of the row itself rather than chunk metadata.
+_RESERVED   = {"pk", "vector", "text"}
+_MAX_TEXT   = 65_535
+
+
+class MilvusVectorStore(VectorStore):
+    name = "milvus"
+
+    def __init__(self, uri: str = MILVUS_URI) -> None:
+        self.client  = MilvusClient(uri=uri)
+        self._lock   = threading.Lock()
+        # collection → (field names, dynamic enabled, metric type)
+        self._schema: Dict[str, Tuple[Set[str], bool, str]] = {}
+
+    # ── Collection handling ──────────────────────────────────────────────────
+
+    def _create(self, name: str, dim: int) -> None:
+        schema = MilvusClient.create_schema(auto_id=False, enable_dynamic_field=True)
+        schema.add_field("pk",        DataType.VARCHAR, is_primary=True, max_length=128)
+        schema.add_field("vector",    DataType.FLOAT_VECTOR, dim=dim)
+        schema.add_field("text",      DataType.VARCHAR, max_length=_MAX_TEXT)
+        schema.add_field("file_id",   DataType.VARCHAR, max_length=64)
+        schema.add_field("chunk_idx", DataType.INT64)
+
+        index_params = self.client.prepare_index_params()
+        index_params.add_index(field_name="vector", index_type="AUTOINDEX", metric_type=MILVUS_METRIC_TYPE)
+        index_params.add_index(field_name="file_id", index_type="INVERTED")
+        self.client.create_collection(name, schema=schema, index_params=index_params)
+        logger.info("Created Milvus collection '%s' (dim=%d, metric=%s)", name, dim, MILVUS_METRIC_TYPE)
+
+    def _describe(self, name: str) -> Tuple[Set[str], bool, str]:
+        cached = self._schema.get(name)
+        if cached:
+            return cached
+
+        info    = self.client.describe_collection(name)
+        fields  = {f["name"] for f in info["fields"]}
+        dynamic = bool(info.get("enable_dynamic_field"))
+
+        metric = MILVUS_METRIC_TYPE
+        for index_name in self.client.list_indexes(name, field_name="vector"):
+            metric = self.client.describe_index(name, index_name).get("metric_type", metric)
+
+        if "file_id" in fields and not self.client.list_indexes(name, field_name="file_id"):
+            self._index_file_id(name)
+
+        self.client.load_collection(name)
+        self._schema[name] = (fields, dynamic, metric)
+        return self._schema[name]
+
+    def _index_file_id(self, name: str) -> None:
+        """Older collections predate the scalar index; add it (best effort)."""
+        try:
+            index_params = self.client.prepare_index_params()
+            index_params.add_index(field_name="file_id", index_type="INVERTED")
+            self.client.create_index(name, index_params)
+            logger.info("Created INVERTED index on '%s'.file_id", name)
+        except Exception as exc:
+            logger.warning("Could not index '%s'.file_id (filters still work, unindexed): %s", name, exc)
+
+    def _ensure(self, name: str, dim: int) -> Tuple[Set[str], bool, str]:
+        with self._lock:
+            if name not in self._schema and not self.client.has_collection(name):
+                self._create(name, dim)
+            return self._describe(name)
+
+    def _existing(self, name: str) -> Optional[Tuple[Set[str], bool, str]]:
+        if name in self._schema:
+            return self._schema[name]
+        if not self.client.has_collection(name):
+            return None
+        with self._lock:
+            return self._describe(name)
+
+    @staticmethod
+    def _expression(filter: Optional[SearchFilter], fields: Set[str], dynamic: bool) -> str:
+        """Compile a SearchFilter into a Milvus boolean expression."""
+        if not filter:
+            return ""
+        clauses = []
+        if filter.file_ids is not None:
+            clauses.append(f"file_id in {json.dumps(list(filter.file_ids))}")
+        for key, value in filter.metadata.items():
+            if not dynamic and key not in fields:
+                return "false"          # the key can't exist on any row
+            ref = key if key in fields else f'$meta["{key}"]'
+            if isinstance(value, list):
+                clauses.append(f"{ref} in {json.dumps(value)}")
+            else:
+                clauses.append(f"{ref} == {json.dumps(value)}")
+        return " and ".join(f"({c})" for c in clauses)
+
+    @staticmethod
+    def _similarity(distance: float, metric: str) -> float:
+        # Embeddings are unit-normalised, so squared L2 = 2 - 2·cos.
+        if metric == "L2":
+            return 1.0 - distance / 2.0
+        return distance
+
+    # ── VectorStore API ──────────────────────────────────────────────────────
+
+    def add(
+        self,
+        user_id: int,
+        chunks: Sequence[Document],
+        vectors: Sequence[Sequence[float]],
+        version: str = "",
+    ) -> int:
+        if not chunks:
+            return 0
+        name = collection_name(user_id, version)
+        fields, dynamic, _ = self._ensure(name, len(vectors[0]))
+
+        rows = []
+        for chunk, vector in zip(chunks, vectors):
+            row = {
+                "pk":     chunk.metadata.get("pk") or str(uuid.uuid4()),
+                "vector": [float(x) for x in vector],
+                "text":   chunk.page_content[:_MAX_TEXT],
+            }
+            for key, value in chunk.metadata.items():
+                if key not in _RESERVED and (dynamic or key in fields):
+                    row[key] = value
+            rows.append(row)
+
+        # Upsert: pks are deterministic, so a retried batch replaces its rows.
+        result = self.client.upsert(name, data=rows)
+        return int(result.get("upsert_count", len(rows)))
+
+    def unsupported_metadata(self, user_id: int, keys: Sequence[str], version: str = "") -> Set[str]:
+        existing = self._existing(collection_name(user_id, version))
+        if existing is None:
+            return set()
+        fields, dynamic, _ = existing
+        return set() if dynamic else {key for key in keys if key not in fields}
+
+    def search(
+        self,
+        user_id: int,
+        vector: Sequence[float],
+        k: int,
+        with_vectors: bool = False,
+        filter: Optional[SearchFilter] = None,
+        version: str = "",
+    ) -> List[SearchHit]:
+        return self.search_many(user_id, [vector], k, with_vectors, filter, version)[0]
+
+    def search_many(
+        self,
+        user_id: int,
+        vectors: Sequence[Sequence[float]],
+        k: int,
+        with_vectors: bool = False,
+        filter: Optional[SearchFilter] = None,
+        version: str = "",
+    ) -> List[List[SearchHit]]:
+        name   = collection_name(user_id, version)
+        schema = self._existing(name)
+        if schema is None:
+            return [[] for _ in vectors]
+        fields, dynamic, metric = schema
+        expression = self._expression(filter, fields, dynamic)
+        if expression == "false":
+            return [[] for _ in vectors]
+
+        # One request carries every query vector (nq = len(vectors)).
+        output_fields = ["*", "vector"] if with_vectors else ["*"]
+        results = self.client.search(
+            name,
+            data=[[float(x) for x in vector] for vector in vectors],
+            filter=expression,
+            limit=k,
+            output_fields=output_fields,
+            search_params={"metric_type": metric},
+        ) or []
+
+        batches = []
+        for row in results:
+            hits = []
+            for hit in row:
+                entity   = dict(hit.get("entity", {}))
+                text     = entity.pop("text", "")
+                stored   = entity.pop("vector", None)
+                entity.pop("pk", None)
+                hits.append(SearchHit(
+                    id=str(hit["id"]),
+                    score=self._similarity(float(hit["distance"]), metric),
+                    document=Document(page_content=text, metadata=entity),
+                    vector=np.asarray(stored, dtype=np.float32) if stored is not None else None,
+                ))
+            batches.append(hits)
+        batches.extend([] for _ in range(len(vectors) - len(batches)))
+        return batches
+
+    def get_by_file(self, user_id: int, file_id: str, version: str = "") -> List[Document]:
+        name = collection_name(user_id, version)
+        if self._existing(name) is None:
+            return []
+        docs: List[Document] = []
+        iterator = self.client.query_iterator(
+            name, batch_size=1000, filter=f'file_id == "{file_id}"', output_fields=["*"],
+        )
+        try:
+            while True:
+                rows = iterator.next()
+                if not rows:
+                    break
+                for row in rows:
+                    row  = dict(row)
+                    text = row.pop("text", "")
+                    row.pop("vector", None)
+                    row["pk"] = str(row["pk"])
+                    docs.append(Document(page_content=text, metadata=row))
+        finally:
+            iterator.close()
+        return docs
+
+    def delete_by_file(self, user_id: int, file_id: str, version: str = "") -> int:
+        name = collection_name(user_id, version)
+        if self._existing(name) is None:
+            logger.info("Collection '%s' does not exist — nothing to delete.", name)
+            return 0
+        result = self.client.delete(name, filter=f'file_id == "{file_id}"')
+        return int(result.get("delete_count", 0)) if isinstance(result, dict) else len(result)
+
+    def count(self, user_id: int, version: str = "") -> int:
+        name = collection_name(user_id, version)
+        if self._existing(name) is None:
+            return 0
+        rows = self.client.query(name, filter="", output_fields=["count(*)"])
+        return int(rows[0]["count(*)"]) if rows else 0
+
+    def drop(self, user_id: int, version: str = "") -> None:
+        name = collection_name(user_id, version)
+        with self._lock:
+            self._schema.pop(name, None)
+            if self.client.has_collection(name):
+                self.client.drop_collection(name)
+                logger.info("Dropped Milvus collection '%s'", name)
+
+    def list_users(self) -> List[int]:
+        parsed = (parse_collection_name(name) for name in self.client.list_collections())
+        return sorted({p[0] for p in parsed if p is not None})
+
+    def iter_file_ids(self, user_id: int, batch_size: int = 1000, version: str = "") -> Iterator[List[str]]:
+        name = collection_name(user_id, version)
+        if self._existing(name) is None:
+            return
+        iterator = self.client.query_iterator(name, batch_size=batch_size, filter="", output_fields=["file_id"])
+        try:
+            while True:
+                rows = iterator.next()
+                if not rows:
+                    break
+                yield list({row.get("file_id") for row in rows if row.get("file_id")})
+        finally:
+            iterator.close()
+
+    def close(self) -> None:
+        self.client.close()
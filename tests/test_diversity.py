@@ -0,0 +1,39 @@
+import numpy as np
+from langchain_core.documents import Document
+
+from src.utils.diversity import select_diverse
+from src.vectorstore.base import SearchHit
+
+
+def _hit(pk: str, vector, file_id: str = "f", chunk_idx: int = 0, score: float = 0.0) -> SearchHit:
+    return SearchHit(
+        id=pk,
+        score=score,
+        document=Document(page_content=pk, metadata={"file_id": file_id, "chunk_idx": chunk_idx}),
+        vector=np.asarray(vector, dtype=np.float32),
+    )
+
+
+def test_near_duplicates_are_dropped_and_top_hit_survives():
+    hits = [
+        _hit("best", [1.0, 0.0, 0.0], chunk_idx=0),
+        _hit("copy", [0.999, 0.01, 0.0], file_id="g", chunk_idx=0),
+        _hit("other", [0.6, 0.8, 0.0], file_id="h", chunk_idx=0),
+    ]
+    kept = select_diverse([1.0, 0.0, 0.0], hits, k=3, neighbour_window=0)
+    assert [h.id for h in kept] == ["best", "other"]
+
+
+def test_neighbouring_chunks_of_one_file_are_dropped():
+    hits = [
+        _hit("c5", [1.0, 0.0, 0.0], chunk_idx=5),
+        _hit("c6", [0.7, 0.7, 0.0], chunk_idx=6),
+        _hit("c9", [0.7, 0.0, 0.7], chunk_idx=9),
+    ]
+    kept = select_diverse([1.0, 0.0, 0.0], hits, k=3, neighbour_window=1)
+    assert [h.id for h in kept] == ["c5", "c9"]
+
+
+def test_hits_without_vectors_pass_through_truncated():
+    hits = [SearchHit(id=str(i), score=0.0, document=Document(page_content="")) for i in range(5)]
+    assert [h.id for h in select_diverse([1.0], hits, k=2)] == ["0", "1"]
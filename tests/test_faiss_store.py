@@ -0,0 +1,139 @@
+import json
+import os
+import zlib
+
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+
+from src.vectorstore import SearchFilter
+from src.vectorstore.faiss_store import FaissVectorStore
+
+DIM = 8
+
+
+def _vector(seed) -> list:
+    if isinstance(seed, str):
+        seed = zlib.crc32(seed.encode())
+    return np.random.default_rng(seed).standard_normal(DIM).tolist()
+
+
+def _chunk(pk: str, file_id: str = "f1", chunk_idx: int = 0, **metadata) -> Document:
+    return Document(
+        page_content=f"text of {pk}",
+        metadata={"pk": pk, "file_id": file_id, "chunk_idx": chunk_idx, **metadata},
+    )
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = FaissVectorStore(str(tmp_path))
+    yield store
+    store.close()
+
+
+def _add(store, pks, file_id="f1", version="", **metadata):
+    chunks  = [_chunk(pk, file_id, i, **metadata) for i, pk in enumerate(pks)]
+    vectors = [_vector(pk) for pk in pks]
+    return store.add(1, chunks, vectors, version=version)
+
+
+def test_add_then_search_finds_the_exact_vector(store):
+    _add(store, ["a", "b", "c"])
+    hits = store.search(1, _vector("b"), k=2, with_vectors=True)
+
+    assert hits[0].id == "b"
+    assert hits[0].score == pytest.approx(1.0, abs=1e-5)
+    assert hits[0].document.page_content == "text of b"
+    assert hits[0].document.metadata["file_id"] == "f1"
+    assert np.linalg.norm(hits[0].vector) == pytest.approx(1.0, abs=1e-5)
+    assert len(hits) == 2
+    assert store.count(1) == 3
+
+
+def test_search_many_returns_one_list_per_query(store):
+    _add(store, ["a", "b"])
+    found = store.search_many(1, [_vector("a"), _vector("b")], k=1)
+    assert [hits[0].id for hits in found] == ["a", "b"]
+
+
+def test_filters_restrict_by_file_and_metadata(store):
+    _add(store, ["a1", "a2"], file_id="fa", kind="table")
+    _add(store, ["b1", "b2"], file_id="fb", kind="text")
+    query = _vector("a1")
+
+    by_file = store.search(1, query, k=10, filter=SearchFilter(file_ids=["fb"]))
+    assert {hit.id for hit in by_file} == {"b1", "b2"}
+
+    by_meta = store.search(1, query, k=10, filter=SearchFilter(metadata={"kind": "table"}))
+    assert {hit.id for hit in by_meta} == {"a1", "a2"}
+
+    assert store.search(1, query, k=10, filter=SearchFilter(file_ids=["missing"])) == []
+
+
+def test_add_upserts_by_pk(store):
+    _add(store, ["a", "b"])
+    moved = _vector(999)
+    store.add(1, [_chunk("a", chunk_idx=5)], [moved])
+
+    assert store.count(1) == 2
+    hits = store.search(1, moved, k=1)
+    assert hits[0].id == "a"
+    assert hits[0].document.metadata["chunk_idx"] == 5
+    assert hits[0].score == pytest.approx(1.0, abs=1e-5)
+
+
+def test_delete_by_file_removes_vectors_and_rows(store):
+    _add(store, ["a1", "a2"], file_id="fa")
+    _add(store, ["b1"], file_id="fb")
+
+    assert store.delete_by_file(1, "fa") == 2
+    assert store.count(1) == 1
+    assert store.get_by_file(1, "fa") == []
+    assert [hit.id for hit in store.search(1, _vector("a1"), k=5)] == ["b1"]
+    assert store.delete_by_file(1, "fa") == 0
+
+
+def test_versions_are_separate_collections(store):
+    _add(store, ["a"])
+    _add(store, ["z"], version="v2")
+    assert store.count(1) == 1
+    assert store.count(1, version="v2") == 1
+    assert [hit.id for hit in store.search(1, _vector("a"), k=5, version="v2")] == ["z"]
+
+
+def test_batches_are_appended_as_a_logarithmic_number_of_segments(store, tmp_path):
+    for batch in range(16):
+        _add(store, [f"p{batch}_{i}" for i in range(4)])
+
+    with open(tmp_path / "user_1" / "segments.json") as f:
+        segments = json.load(f)["segments"]
+    # 16 equal batches merge binary-counter style into one segment.
+    assert [seg["count"] for seg in segments] == [64]
+    assert store.count(1) == 64
+    files = [name for name in os.listdir(tmp_path / "user_1") if name.endswith(".faiss")]
+    assert files == [segments[0]["file"]]
+
+    _add(store, ["tail"])
+    with open(tmp_path / "user_1" / "segments.json") as f:
+        assert [seg["count"] for seg in json.load(f)["segments"]] == [64, 1]
+    assert store.search(1, _vector("tail"), k=1)[0].id == "tail"
+
+
+def test_legacy_single_index_file_is_read_and_folded_in(store, tmp_path):
+    _add(store, ["a", "b"])
+    directory = tmp_path / "user_1"
+    with open(directory / "segments.json") as f:
+        segment = json.load(f)["segments"][0]["file"]
+    # Recreate a pre-segment layout: one index.faiss, no manifest.
+    os.replace(directory / segment, directory / "index.faiss")
+    os.remove(directory / "segments.json")
+    store.close()
+
+    assert store.count(1) == 2
+    _add(store, ["c"])
+    assert store.count(1) == 3
+    assert {hit.id for hit in store.search(1, _vector("a"), k=3)} == {"a", "b", "c"}
+    with open(directory / "segments.json") as f:
+        segments = json.load(f)["segments"]
+    assert [(seg["file"], seg["count"]) for seg in segments][0] == ("index.faiss", 2)
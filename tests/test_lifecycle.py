@@ -0,0 +1,52 @@
+import asyncio
+import time
+
+from src.utils import lifecycle as lifecycle_module
+from src.utils.lifecycle import Lifecycle
+from src.utils.sse import DONE, ERROR
+
+
+def test_stream_passes_events_through():
+    async def events():
+        for i in range(3):
+            yield i
+
+    async def main():
+        return [event async for event in Lifecycle().track_stream(events())]
+
+    assert asyncio.run(main()) == [0, 1, 2]
+
+
+def test_stalled_stream_ends_at_drain_deadline(monkeypatch):
+    monkeypatch.setattr(lifecycle_module, "STREAM_DRAIN_SECONDS", 0.2)
+    closed = []
+
+    async def events():
+        try:
+            yield "first"
+            await asyncio.sleep(60)
+            yield "never"
+        finally:
+            closed.append(True)
+
+    async def main():
+        lifecycle = Lifecycle()
+        received  = []
+
+        async def consume():
+            async for event in lifecycle.track_stream(events()):
+                received.append(event)
+
+        consumer = asyncio.create_task(consume())
+        await asyncio.sleep(0.05)
+        lifecycle.begin_drain()
+        started = time.monotonic()
+        await asyncio.wait_for(consumer, 5)
+        return received, time.monotonic() - started, lifecycle.active_streams
+
+    received, waited, active = asyncio.run(main())
+    assert received[0] == "first"
+    assert [event.event for event in received[1:]] == [ERROR, DONE]
+    assert waited < 2
+    assert active == 0
+    assert closed == [True]
@@ -0,0 +1,79 @@
+import asyncio
+import time
+
+import pytest
+
+from src.utils.llm_gateway import LLMRateLimitedError, TokenBucket
+
+
+def test_burst_is_served_at_once():
+    async def main():
+        bucket = TokenBucket(rate_per_sec=1, capacity=3)
+        deadline = time.monotonic() + 0.05
+        for _ in range(3):
+            await bucket.acquire(deadline)
+
+    asyncio.run(main())
+
+
+def test_waiters_that_cannot_make_their_deadline_fail_at_once():
+    async def main():
+        bucket = TokenBucket(rate_per_sec=10, capacity=1)
+        await bucket.acquire(time.monotonic() + 1)
+
+        # The next token is 0.1 s away: a 20 ms deadline can't be met.
+        started = time.monotonic()
+        with pytest.raises(LLMRateLimitedError) as exc:
+            await bucket.acquire(started + 0.02)
+        assert time.monotonic() - started < 0.01
+        assert exc.value.retry_after == pytest.approx(0.1, abs=0.01)
+
+    asyncio.run(main())
+
+
+def test_queued_callers_do_not_block_each_other():
+    async def main():
+        bucket = TokenBucket(rate_per_sec=20, capacity=1)
+        await bucket.acquire(time.monotonic() + 1)
+
+        # Two reservations queue up (50 ms and 100 ms out); a third caller
+        # whose deadline falls before its turn must fail immediately rather
+        # than wait behind them.
+        first  = asyncio.create_task(bucket.acquire(time.monotonic() + 1))
+        second = asyncio.create_task(bucket.acquire(time.monotonic() + 1))
+        await asyncio.sleep(0)
+        started = time.monotonic()
+        with pytest.raises(LLMRateLimitedError):
+            await bucket.acquire(started + 0.12)
+        assert time.monotonic() - started < 0.01
+        await asyncio.gather(first, second)
+
+    asyncio.run(main())
+
+
+def test_cancelled_waiter_gives_its_token_back():
+    async def main():
+        bucket = TokenBucket(rate_per_sec=10, capacity=1)
+        await bucket.acquire(time.monotonic() + 1)
+        waiter = asyncio.create_task(bucket.acquire(time.monotonic() + 1))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+
+        # Only the first token is owed again, not the cancelled one too.
+        started = time.monotonic()
+        await bucket.acquire(started + 1)
+        assert time.monotonic() - started < 0.15
+
+    asyncio.run(main())
+
+
+def test_penalize_pushes_every_caller_back():
+    async def main():
+        bucket = TokenBucket(rate_per_sec=10, capacity=5)
+        bucket.penalize(2.0)
+        with pytest.raises(LLMRateLimitedError) as exc:
+            await bucket.acquire(time.monotonic() + 1)
+        assert exc.value.retry_after > 1.9
+
+    asyncio.run(main())
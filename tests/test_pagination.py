@@ -0,0 +1,81 @@
+import asyncio
+from datetime import datetime, timezone
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+import src.models.embedding  # noqa: F401  (register every table on Base.metadata)
+import src.models.sections  # noqa: F401
+import src.models.users  # noqa: F401
+from src.database import _backfill_session_updated_at
+from src.database.config import Base
+from src.models.chat import ChatSession
+from src.models.files import FileInputModel
+from src.utils.pagination import (
+    files_count_stmt,
+    files_page_stmt,
+    file_key,
+    session_key,
+    sessions_page_stmt,
+    split_page,
+)
+
+
+def _run(tmp_path, body):
+    engine  = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'db.sqlite'}")
+    session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def main():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        try:
+            return await body(engine, session)
+        finally:
+            await engine.dispose()
+
+    return asyncio.run(main())
+
+
+def test_file_pages_report_the_users_total(tmp_path):
+    async def body(engine, session):
+        async with session() as db:
+            for i in range(5):
+                db.add(FileInputModel(file_name=f"{i}.pdf", file_id=f"f{i}", user_id=1, storage_key=f"f{i}.pdf"))
+            db.add(FileInputModel(file_name="x.pdf", file_id="x", user_id=2, storage_key="x.pdf"))
+            await db.commit()
+
+            rows = (await db.execute(files_page_stmt(1, None, 2))).scalars().all()
+            page, cursor = split_page(rows, 2, file_key)
+            total = (await db.execute(files_count_stmt(1))).scalar_one()
+            return [f.file_id for f in page], cursor, total
+
+    page, cursor, total = _run(tmp_path, body)
+    assert page == ["f4", "f3"]
+    assert cursor is not None
+    assert total == 5
+
+
+def test_sessions_with_null_updated_at_are_backfilled_and_paginate(tmp_path):
+    created = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+    async def body(engine, session):
+        async with session() as db:
+            for i in range(3):
+                db.add(ChatSession(user_id=1, title=f"s{i}", created_at=created))
+            await db.commit()
+        # Sessions written before updated_at existed.
+        async with engine.begin() as conn:
+            await conn.execute(text("UPDATE chat_sessions SET updated_at = NULL"))
+            await conn.run_sync(_backfill_session_updated_at)
+
+        titles, cursor = [], None
+        async with session() as db:
+            while True:
+                rows = (await db.execute(sessions_page_stmt(1, cursor, 2))).scalars().all()
+                page, cursor = split_page(rows, 2, session_key)
+                titles += [s.title for s in page]
+                if cursor is None:
+                    return titles
+
+    assert _run(tmp_path, body) == ["s2", "s1", "s0"]
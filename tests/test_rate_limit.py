@@ -0,0 +1,61 @@
+import pytest
+from fastapi import HTTPException
+
+from src.utils import rate_limit as rate_limit_module
+from src.utils.rate_limit import RateLimiter, RouteLimit
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(rate_limit_module.time, "monotonic", clock)
+    monkeypatch.setattr(rate_limit_module, "RATE_LIMIT_ENABLED", True)
+    return clock
+
+
+def test_burst_then_429_with_retry_after(clock):
+    limiter = RateLimiter({"query": RouteLimit(per_min=60, burst=2)})
+    limiter.check(1, "query")
+    limiter.check(1, "query")
+
+    with pytest.raises(HTTPException) as exc:
+        limiter.check(1, "query")
+    assert exc.value.status_code == 429
+    assert exc.value.headers["Retry-After"] == "1"
+
+    clock.now += 1.0
+    limiter.check(1, "query")
+
+
+def test_users_and_route_classes_have_separate_buckets(clock):
+    limiter = RateLimiter({"query": RouteLimit(per_min=60, burst=1), "batch": RouteLimit(per_min=60, burst=1)})
+    limiter.check(1, "query")
+    limiter.check(2, "query")
+    limiter.check(1, "batch")
+    with pytest.raises(HTTPException):
+        limiter.check(1, "query")
+
+
+def test_cost_above_burst_is_admitted_when_full_and_leaves_debt(clock):
+    limiter = RateLimiter({"upload": RouteLimit(per_min=60, burst=5)})
+    limiter.check(1, "upload", cost=8)
+
+    clock.now += 2.0
+    with pytest.raises(HTTPException) as exc:
+        limiter.check(1, "upload")
+    # 5 - 8 + 2 = -1 tokens: two more seconds until one is available.
+    assert exc.value.headers["Retry-After"] == "2"
+
+
+def test_zero_rate_disables_the_class(clock):
+    limiter = RateLimiter({"query": RouteLimit(per_min=0, burst=0)})
+    for _ in range(100):
+        limiter.check(1, "query")
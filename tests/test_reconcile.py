@@ -0,0 +1,61 @@
+import asyncio
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+import src.models.chat  # noqa: F401  (register every table on Base.metadata)
+import src.models.embedding  # noqa: F401
+import src.models.sections  # noqa: F401
+import src.models.users  # noqa: F401
+from src.database.config import Base
+from src.models.files import FileInputModel, IndexingStatus
+from src.utils import reconcile as reconcile_module
+from src.utils.reconcile import ReconcileReport
+
+
+class _EmptyStore:
+    """A vector / chunk store holding nothing for anyone."""
+
+    def iter_file_ids(self, user_id, batch_size=1000, version=""):
+        return iter(())
+
+
+def test_repair_clears_the_checkpoint_of_indexed_files_without_vectors(tmp_path, monkeypatch):
+    engine  = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'db.sqlite'}")
+    session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def stored_versions(user_id):
+        return [""]
+
+    monkeypatch.setattr(reconcile_module, "AsyncSessionLocal", session)
+    monkeypatch.setattr(reconcile_module, "stored_versions", stored_versions)
+    monkeypatch.setattr(reconcile_module, "get_vector_store", _EmptyStore)
+    monkeypatch.setattr(reconcile_module, "get_chunk_store", _EmptyStore)
+
+    async def main():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with session() as db:
+            db.add(FileInputModel(
+                file_name="a.pdf", file_id="f1", user_id=1, storage_key="f1.pdf",
+                indexing_status=IndexingStatus.INDEXED, indexed_chunks=40, chunks_digest="d" * 32,
+            ))
+            await db.commit()
+
+        report = ReconcileReport(repaired=True)
+        await reconcile_module._scan_user(1, {"f1.pdf"}, {"f1"}, 1, report, 100, repair=True)
+
+        async with session() as db:
+            row = (await db.execute(select(FileInputModel).where(FileInputModel.file_id == "f1"))).scalar_one()
+        await engine.dispose()
+        return report, row
+
+    report, row = asyncio.run(main())
+    assert report.indexed_without_vectors == ["f1"]
+    assert row.indexing_status == IndexingStatus.PENDING
+    # index_file_task resumes only when the stored digest matches the new
+    # split; with the checkpoint kept it would skip every chunk and mark the
+    # file INDEXED again with nothing in the store.
+    assert row.indexed_chunks == 0
+    assert row.chunks_digest is None
@@ -0,0 +1,25 @@
+from langchain_core.documents import Document
+
+from src.utils.retrieved import DENSE, RERANK, RetrievedChunks
+from src.vectorstore import SearchHit
+
+
+def _hit(pk: str, section_id: int) -> SearchHit:
+    return SearchHit(
+        id=pk,
+        score=0.0,
+        document=Document(page_content=pk, metadata={"file_id": "f1", "chunk_idx": 0, "section_id": section_id}),
+    )
+
+
+def test_scorer_survives_section_expansion():
+    chunks = RetrievedChunks.from_hits([_hit("a", 7), _hit("b", 7), _hit("c", 8)], [4.5, 2.0, -1.0], RERANK)
+    expanded = chunks.with_sections({7: "section seven"})
+
+    assert expanded.scorer == RERANK
+    assert expanded.texts == ["section seven", "c"]
+    assert list(expanded.scores) == [4.5, -1.0]
+
+
+def test_empty_result_defaults_to_dense():
+    assert RetrievedChunks().scorer == DENSE
@@ -0,0 +1,99 @@
+import asyncio
+import contextlib
+import contextvars
+import threading
+
+from src.utils.scheduler import FairScheduler
+
+
+@contextlib.contextmanager
+def _pool(workers: int):
+    """A scheduler plus a gate for blocking jobs, always released on exit."""
+    scheduler = FairScheduler("test", workers=workers)
+    gate      = threading.Event()
+    try:
+        yield scheduler, gate
+    finally:
+        gate.set()
+        scheduler.shutdown()
+
+
+async def _settle() -> None:
+    # Let queued callbacks (slot hand-offs, thread completions) run.
+    for _ in range(5):
+        await asyncio.sleep(0.01)
+
+
+def test_users_take_turns():
+    async def main():
+        with _pool(workers=1) as (scheduler, gate):
+            order   = []
+            blocker = asyncio.create_task(scheduler.run(0, gate.wait))
+            await _settle()
+            jobs = [asyncio.create_task(scheduler.run(1, order.append, f"a{i}")) for i in range(3)]
+            await _settle()
+            jobs.append(asyncio.create_task(scheduler.run(2, order.append, "b0")))
+            await _settle()
+
+            gate.set()
+            await asyncio.gather(blocker, *jobs)
+            return order
+
+    assert asyncio.run(main()) == ["a0", "b0", "a1", "a2"]
+
+
+def test_cancelled_while_queued_never_runs():
+    async def main():
+        with _pool(workers=1) as (scheduler, gate):
+            ran     = []
+            blocker = asyncio.create_task(scheduler.run(0, gate.wait))
+            await _settle()
+            doomed = asyncio.create_task(scheduler.run(1, ran.append, "doomed"))
+            later  = asyncio.create_task(scheduler.run(2, ran.append, "later"))
+            await _settle()
+            doomed.cancel()
+
+            gate.set()
+            await asyncio.gather(blocker, later)
+            await _settle()
+            assert doomed.cancelled()
+            assert scheduler._busy == 0
+            return ran
+
+    assert asyncio.run(main()) == ["later"]
+
+
+def test_cancelled_caller_keeps_slot_until_thread_finishes():
+    async def main():
+        with _pool(workers=1) as (scheduler, gate):
+            ran     = []
+            running = asyncio.create_task(scheduler.run(0, gate.wait))
+            await _settle()
+            waiting = asyncio.create_task(scheduler.run(1, ran.append, "next"))
+            await _settle()
+
+            running.cancel()
+            await _settle()
+            # The thread is still blocked: the slot must not be handed on.
+            assert scheduler._busy == 1
+            assert len(scheduler._queue) == 1
+            assert ran == []
+
+            gate.set()
+            await waiting
+            await _settle()
+            assert scheduler._busy == 0
+            return ran
+
+    assert asyncio.run(main()) == ["next"]
+
+
+def test_jobs_see_the_callers_context():
+    request_id = contextvars.ContextVar("request_id", default=None)
+
+    async def main():
+        with _pool(workers=2) as (scheduler, _):
+            request_id.set("req-1")
+            return await scheduler.run(1, request_id.get)
+
+    assert asyncio.run(main()) == "req-1"
@@ -0,0 +1,48 @@
+import asyncio
+import json
+
+from src.utils.sse import DONE, SOURCES, TOKEN, StreamEvent, coalesce_tokens, format_sse
+
+
+async def _events(*items, delay: float = 0.0):
+    for item in items:
+        if delay:
+            await asyncio.sleep(delay)
+        yield item
+
+
+async def _collect(stream):
+    return [item async for item in stream]
+
+
+def test_format_sse_splits_lines_and_encodes_json():
+    assert format_sse("a\nb", event=TOKEN, id=3) == "id: 3\nevent: token\ndata: a\ndata: b\n\n"
+    frame = format_sse({"k": 1})
+    assert frame.startswith("data: ") and frame.endswith("\n\n")
+    assert json.loads(frame[len("data: "):-2]) == {"k": 1}
+
+
+def test_tokens_within_the_window_are_merged():
+    stream = _events(*(StreamEvent(TOKEN, c) for c in "hello"), StreamEvent(DONE, "[DONE]"))
+    out    = asyncio.run(_collect(coalesce_tokens(stream, window=1.0)))
+    assert out == [StreamEvent(TOKEN, "hello"), StreamEvent(DONE, "[DONE]")]
+
+
+def test_other_events_flush_first_and_keep_order():
+    stream = _events(
+        StreamEvent(TOKEN, "a"), StreamEvent(SOURCES, []), StreamEvent(TOKEN, "b"), StreamEvent(TOKEN, "c"),
+    )
+    out = asyncio.run(_collect(coalesce_tokens(stream, window=1.0)))
+    assert out == [StreamEvent(TOKEN, "a"), StreamEvent(SOURCES, []), StreamEvent(TOKEN, "bc")]
+
+
+def test_size_limit_flushes_early():
+    stream = _events(*(StreamEvent(TOKEN, "xx") for _ in range(3)))
+    out    = asyncio.run(_collect(coalesce_tokens(stream, window=1.0, max_chars=4)))
+    assert out == [StreamEvent(TOKEN, "xxxx"), StreamEvent(TOKEN, "xx")]
+
+
+def test_slow_tokens_are_not_held_back():
+    stream = _events(StreamEvent(TOKEN, "a"), StreamEvent(TOKEN, "b"), delay=0.05)
+    out    = asyncio.run(_collect(coalesce_tokens(stream, window=0.01)))
+    assert out == [StreamEvent(TOKEN, "a"), StreamEvent(TOKEN, "b")]
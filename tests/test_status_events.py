@@ -0,0 +1,60 @@
+import asyncio
+import json
+
+from src.utils.status_events import STATUS_CHANNEL, StatusBroker
+
+
+class _NotifyConn:
+    """Stands in for the asyncpg LISTEN connection."""
+
+    def __init__(self, fail: bool = False) -> None:
+        self.fail     = fail
+        self.payloads = []
+
+    def is_closed(self) -> bool:
+        return False
+
+    async def execute(self, query, channel, payload):
+        if self.fail:
+            raise ConnectionError("connection lost")
+        assert channel == STATUS_CHANNEL
+        self.payloads.append(json.loads(payload))
+
+
+def _publish(broker: StatusBroker, user_id: int = 1, status: str = "indexed"):
+    async def main():
+        with broker.subscribe(user_id) as queue:
+            await broker.publish(user_id, "f1", status, file_name="a.pdf", progress=1.0)
+            return [queue.get_nowait() for _ in range(queue.qsize())]
+
+    return asyncio.run(main())
+
+
+def test_local_subscribers_get_events_without_a_listener():
+    events = _publish(StatusBroker())
+    assert [(e["file_id"], e["status"]) for e in events] == [("f1", "indexed")]
+
+
+def test_local_delivery_does_not_depend_on_notify():
+    broker = StatusBroker()
+    broker._conn = _NotifyConn(fail=True)
+    assert [e["status"] for e in _publish(broker)] == ["indexed"]
+
+
+def test_notify_is_tagged_and_own_notifications_are_skipped():
+    broker = StatusBroker()
+    conn   = broker._conn = _NotifyConn()
+    events = _publish(broker)
+    assert len(events) == 1
+    assert conn.payloads[0]["origin"] == broker._origin
+
+    async def main():
+        with broker.subscribe(1) as queue:
+            broker._on_notify(None, 0, STATUS_CHANNEL, json.dumps(conn.payloads[0]))
+            other = {**conn.payloads[0], "origin": "another-worker", "status": "failed"}
+            broker._on_notify(None, 0, STATUS_CHANNEL, json.dumps(other))
+            return [queue.get_nowait() for _ in range(queue.qsize())]
+
+    received = asyncio.run(main())
+    assert [e["status"] for e in received] == ["failed"]
+    assert "origin" not in received[0]